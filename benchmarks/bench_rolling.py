@@ -0,0 +1,88 @@
+"""
+滚动窗口算子基准测试: pandas vs numpy vs numba
+
+用法:
+    python benchmarks/bench_rolling.py
+    python benchmarks/bench_rolling.py --symbols 5000 --bars 1000 --repeat 3
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.analysis.rolling import HAS_NUMBA, rolling_max, rolling_mean_var, rolling_min
+
+
+def make_panel(n_bars: int, n_symbols: int, seed: int = 0):
+    """生成 (日期 × 股票) 的合成 OHLC 价格矩阵"""
+    rng = np.random.default_rng(seed)
+    close = np.round(10 + np.cumsum(rng.normal(0, 0.1, (n_bars, n_symbols)), axis=0), 2)
+    high = close + np.round(rng.random((n_bars, n_symbols)) * 0.2, 2)
+    low = close - np.round(rng.random((n_bars, n_symbols)) * 0.2, 2)
+    return close, high, low
+
+
+def best_of(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def kdj_window(high, low, backend, n=9):
+    if backend == 'pandas':
+        return pd.DataFrame(low).rolling(n).min().to_numpy(), pd.DataFrame(high).rolling(n).max().to_numpy()
+    return rolling_min(low, n, backend), rolling_max(high, n, backend)
+
+
+def boll_window(close, backend, period=20):
+    if backend == 'pandas':
+        rolling = pd.DataFrame(close).rolling(period)
+        return rolling.mean().to_numpy(), rolling.std().to_numpy()
+    mean, var = rolling_mean_var(close, period, backend=backend)
+    return mean, np.sqrt(var)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Rolling-window primitive benchmark')
+    parser.add_argument('--symbols', type=int, default=5000)
+    parser.add_argument('--bars', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    close, high, low = make_panel(args.bars, args.symbols)
+    backends = ['pandas', 'numpy'] + (['numba'] if HAS_NUMBA else [])
+    if not HAS_NUMBA:
+        print("numba not installed, skipping numba backend")
+
+    if HAS_NUMBA:
+        # Trigger JIT compilation outside the timed region
+        kdj_window(high[:30, :2], low[:30, :2], 'numba')
+        boll_window(close[:30, :2], 'numba')
+
+    ref_low, ref_high = kdj_window(high, low, 'pandas')
+    ref_mean, ref_std = boll_window(close, 'pandas')
+
+    print(f"Panel: {args.bars} bars x {args.symbols} symbols, best of {args.repeat}")
+    print(f"{'backend':<8} {'KDJ min/max (s)':>16} {'BOLL mean/std (s)':>18} {'max |std diff|':>15}")
+    for backend in backends:
+        kdj_t = best_of(lambda: kdj_window(high, low, backend), args.repeat)
+        boll_t = best_of(lambda: boll_window(close, backend), args.repeat)
+
+        lo, hi = kdj_window(high, low, backend)
+        assert np.array_equal(lo, ref_low, equal_nan=True) and np.array_equal(hi, ref_high, equal_nan=True)
+        _, std = boll_window(close, backend)
+        diff = np.nanmax(np.abs(std - ref_std))
+        print(f"{backend:<8} {kdj_t:>16.3f} {boll_t:>18.3f} {diff:>15.2e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+生成基准测试用的合成数据 (固定随机种子, 结果写入 benchmarks/fixtures/)
+
+格式与线上接口一致, 基准测试全程离线:
+- tencent_quotes.txt: qt.gtimg.cn 批量行情响应 (每行一只股票, 含少量异常行)
+- minute_query.json: 腾讯分时接口 (minute/query) 响应, tencent_code -> JSON
+- sina_daily.csv: akshare stock_zh_a_daily (新浪源) 原始日线列
+- lhb_detail.csv: stock_lhb_stock_detail_em 买入/卖出明细, 营业部名称取自 data/lhb_config.xml 并混入未配置的营业部
+
+用法:
+    python benchmarks/make_fixtures.py
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from src.analysis.intraday import SESSIONS
+from src.utils.lhb_config_loader import load_lhb_config
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+QUOTE_ROWS = 200
+MINUTE_STOCKS = 10
+DAILY_BARS = 1000
+LHB_ROWS = 400
+TRADE_DATE = '20260105'
+
+
+def make_codes(n, rng):
+    codes = []
+    for i in range(n):
+        if i % 3 == 0:
+            codes.append(f"sh{600000 + int(rng.integers(0, 4000)):06d}")
+        elif i % 3 == 1:
+            codes.append(f"sz{int(rng.integers(1, 3000)):06d}")
+        else:
+            codes.append(f"sz{300000 + int(rng.integers(0, 1000)):06d}")
+    return list(dict.fromkeys(codes))
+
+
+def quote_fields(code, rng):
+    """一只股票的腾讯行情字段 (88个字段, 与线上一致)"""
+    fields = [f"{x:.2f}" for x in rng.random(88) * 100]
+    prev = round(float(rng.uniform(3, 200)), 2)
+    price = round(prev * (1 + float(rng.normal(0, 0.02))), 2)
+    fields[0] = '1'
+    fields[1] = f"股票{code[2:]}"
+    fields[2] = code[2:]
+    fields[3] = f"{price:.2f}"
+    fields[4] = f"{prev:.2f}"
+    fields[5] = f"{prev * (1 + float(rng.normal(0, 0.005))):.2f}"
+    fields[6] = str(int(rng.integers(1000, 2_000_000)))
+    fields[30] = f"{TRADE_DATE}150003"
+    fields[32] = f"{(price / prev - 1) * 100:.2f}"
+    fields[33] = f"{max(price, prev) * 1.01:.2f}"
+    fields[34] = f"{min(price, prev) * 0.99:.2f}"
+    fields[37] = f"{float(rng.uniform(1e3, 5e5)):.4f}"
+    fields[38] = f"{float(rng.uniform(0.1, 15)):.2f}"
+    fields[45] = f"{float(rng.uniform(20, 5000)):.2f}"
+    return fields
+
+
+def make_quotes(rng):
+    codes = make_codes(QUOTE_ROWS, rng)
+    lines = []
+    for i, code in enumerate(codes):
+        fields = quote_fields(code, rng)
+        if i % 97 == 5:
+            fields[3] = ''          # 停牌: 价格为空
+        if i % 131 == 7:
+            fields = fields[:20]    # 截断的异常行
+        lines.append(f'v_{code}="{"~".join(fields)}";')
+    lines.append('v_pv_none_match="1";')
+    return '\n'.join(lines) + '\n'
+
+
+def session_minutes():
+    minutes = []
+    for start, end in SESSIONS:
+        t = start // 100 * 60 + start % 100
+        stop = end // 100 * 60 + end % 100
+        while t <= stop:
+            minutes.append(t // 60 * 100 + t % 60)
+            t += 1
+    return minutes
+
+
+def make_minute_queries(rng):
+    payloads = {}
+    minutes = session_minutes()
+    for code in make_codes(MINUTE_STOCKS, rng)[:MINUTE_STOCKS]:
+        prev = round(float(rng.uniform(5, 100)), 2)
+        price = np.round(prev * np.exp(np.cumsum(rng.normal(0, 0.001, len(minutes)))), 2)
+        volume = np.cumsum(rng.integers(100, 5000, len(minutes)))
+        amount = np.cumsum(rng.uniform(1e5, 5e6, len(minutes)))
+        rows = [f"{m:04d} {p:.2f} {v} {a:.2f}" for m, p, v, a in zip(minutes, price, volume, amount)]
+        payloads[code] = {
+            'code': 0,
+            'msg': '',
+            'data': {
+                code: {
+                    'data': {'data': rows, 'date': TRADE_DATE},
+                    'qt': {code: quote_fields(code, rng)[:50]},
+                }
+            },
+        }
+        payloads[code]['data'][code]['qt'][code][4] = f"{prev:.2f}"
+    return payloads
+
+
+def make_sina_daily(rng):
+    dates = pd.bdate_range(end='2026-01-05', periods=DAILY_BARS)
+    close = np.round(20 * np.exp(np.cumsum(rng.normal(0, 0.02, DAILY_BARS))), 2)
+    open_ = np.round(close * (1 + rng.normal(0, 0.005, DAILY_BARS)), 2)
+    high = np.round(np.maximum(open_, close) * (1 + rng.random(DAILY_BARS) * 0.02), 2)
+    low = np.round(np.minimum(open_, close) * (1 - rng.random(DAILY_BARS) * 0.02), 2)
+    volume = rng.integers(1_000_000, 50_000_000, DAILY_BARS).astype(float)
+    return pd.DataFrame({
+        'date': dates.strftime('%Y-%m-%d'),
+        'open': open_,
+        'high': high,
+        'low': low,
+        'close': close,
+        'volume': volume,
+        'amount': np.round(volume * close, 2),
+        'outstanding_share': 1e9,
+        'turnover': np.round(volume / 1e9, 6),
+    })
+
+
+def make_lhb_detail(rng):
+    branch_map, fuzzy_rules = load_lhb_config(os.path.join(PROJECT_ROOT, 'data', 'lhb_config.xml'))
+    configured = list(branch_map)
+    configured += [''.join(rule['pattern'].split()) + '证券营业部' for rule in fuzzy_rules]
+    unknown = [f"某某证券股份有限公司{city}第{i}营业部" for i, city in enumerate(['杭州', '深圳', '成都', '武汉', '西安'] * 8)]
+    names = configured + unknown
+
+    rows = []
+    for i in range(LHB_ROWS):
+        side = 'buy' if i % 2 == 0 else 'sell'
+        buy = round(float(rng.uniform(1e6, 2e8)), 2)
+        sell = round(float(rng.uniform(0, 5e7)), 2)
+        if side == 'sell':
+            buy, sell = sell, buy
+        rows.append({
+            '序号': i % 5 + 1,
+            '交易营业部名称': names[int(rng.integers(0, len(names)))],
+            '买入金额': buy,
+            '买入金额-占总成交比例': round(float(rng.uniform(0, 10)), 4),
+            '卖出金额': sell,
+            '卖出金额-占总成交比例': round(float(rng.uniform(0, 10)), 4),
+            '净额': round(buy - sell, 2),
+            '类型': '日涨幅偏离值达到7%的前5只证券',
+            'side': side,
+            'stock_code': f"{600000 + i // 10:06d}",
+        })
+    return pd.DataFrame(rows)
+
+
+def main():
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    rng = np.random.default_rng(20260105)
+
+    with open(os.path.join(FIXTURE_DIR, 'tencent_quotes.txt'), 'w', encoding='utf-8') as f:
+        f.write(make_quotes(rng))
+    with open(os.path.join(FIXTURE_DIR, 'minute_query.json'), 'w', encoding='utf-8') as f:
+        json.dump(make_minute_queries(rng), f, ensure_ascii=False)
+    make_sina_daily(rng).to_csv(os.path.join(FIXTURE_DIR, 'sina_daily.csv'), index=False)
+    make_lhb_detail(rng).to_csv(os.path.join(FIXTURE_DIR, 'lhb_detail.csv'), index=False, encoding='utf-8-sig')
+
+    for name in sorted(os.listdir(FIXTURE_DIR)):
+        size = os.path.getsize(os.path.join(FIXTURE_DIR, name))
+        print(f"{name:<22} {size / 1024:8.1f} KB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+"""
+离线基准测试: 分析与数据获取的热点路径
+
+所有用例只读取 benchmarks/fixtures/ 下的合成数据 (由 make_fixtures.py 生成), 不访问网络。
+结果写入 JSON (默认 benchmarks/results/<commit>.json), 可用 --compare 与之前的结果对比。
+
+用法:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --filter indicators --repeat 7
+    python benchmarks/run_benchmarks.py --compare benchmarks/results/abc1234.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import timeit
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+PROJECT_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.append(PROJECT_ROOT)
+
+from src.analysis.intraday import parse_minute_payload
+from src.analysis.sector import SectorAnalyzer
+from src.analysis.technical import TechnicalAnalyzer
+from src.data_fetch.quote_parser import parse_quotes
+from src.utils.lhb_config_loader import load_lhb_config
+from service.Intraday_Analyse.analyze_intraday import build_bar_table, build_block_payload
+from service.LHB_Analyse.lhb_detailed_analyzer import classify_branch
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), 'fixtures')
+RESULT_DIR = os.path.join(os.path.dirname(__file__), 'results')
+
+# 批量行情每个请求 80 只股票 (同 get_market_snapshot 的默认 batch_size)
+QUOTE_BATCH = 80
+QUOTE_COPIES = 25       # 200 行 × 25 ≈ 全市场 5000 只
+MINUTE_COPIES = 20      # 10 只 × 20 = 200 只 (约等于自选股票池)
+BLOCK_SIZE = 10
+SECTOR_STOCKS = 50
+
+
+def fixture_path(name):
+    return os.path.join(FIXTURE_DIR, name)
+
+
+def sina_to_frame(raw):
+    """按 StockDataFetcher._fetch_stock_hist 的方式规范新浪日线列"""
+    df = raw.rename(columns={
+        'date': '日期', 'open': '开盘', 'high': '最高', 'low': '最低', 'close': '收盘', 'volume': '成交量'
+    })
+    df['成交量'] = df['成交量'] / 100
+    df['日期'] = pd.to_datetime(df['日期'])
+    return df.sort_values('日期')
+
+
+# ---- 用例: 每个函数完成准备工作, 返回被计时的无参函数 ----
+
+def case_quote_parse():
+    """get_stock_realtime_batch / get_market_snapshot 的响应解析"""
+    with open(fixture_path('tencent_quotes.txt'), encoding='utf-8') as f:
+        lines = f.read().splitlines() * QUOTE_COPIES
+    bodies = ['\n'.join(lines[i:i + QUOTE_BATCH]) for i in range(0, len(lines), QUOTE_BATCH)]
+    return lambda: parse_quotes(bodies)
+
+
+def load_minute_payloads():
+    """分时响应复制为 MINUTE_COPIES 份, 每份换成不同的代码"""
+    with open(fixture_path('minute_query.json'), encoding='utf-8') as f:
+        text = f.read()
+    base = json.loads(text)
+    payloads = {}
+    for k in range(MINUTE_COPIES):
+        copy = text
+        for code in base:
+            copy = copy.replace(code, f"{code[:2]}{(int(code[2:]) + 1000 * k) % 1000000:06d}")
+        payloads.update(json.loads(copy))
+    return payloads
+
+
+def case_minute_aggregate():
+    """分时解析 + 5分钟K线分桶 (原 fetch_5min_data 的聚合部分)"""
+    payloads = load_minute_payloads()
+
+    def run():
+        series = {}
+        for code, payload in payloads.items():
+            parsed = parse_minute_payload(code, payload)
+            if parsed is not None:
+                series[code[2:]] = parsed
+        return build_bar_table(series, 5)
+    return run
+
+
+def case_block_index():
+    """板块指数计算 (process_block_data, 全部板块)"""
+    payloads = load_minute_payloads()
+    series = {code[2:]: parse_minute_payload(code, payload) for code, payload in payloads.items()}
+    table = build_bar_table(series, 5)
+    codes = sorted(series)
+    block_codes = {f"板块{i}": codes[i:i + BLOCK_SIZE] for i in range(0, len(codes), BLOCK_SIZE // 2)}
+    return lambda: build_block_payload(block_codes, table)
+
+
+def case_indicators():
+    """calculate_all_indicators (新浪日线)"""
+    df = sina_to_frame(pd.read_csv(fixture_path('sina_daily.csv')))
+    return lambda: TechnicalAnalyzer.calculate_all_indicators(df)
+
+
+def case_sector():
+    """SectorAnalyzer: 对齐 + 相关性 + 板块指数 + 区间涨幅排名"""
+    base = sina_to_frame(pd.read_csv(fixture_path('sina_daily.csv')))
+    rng = np.random.default_rng(0)
+    stocks = {}
+    for i in range(SECTOR_STOCKS):
+        df = base[['日期', '收盘']].copy()
+        df['收盘'] = np.round(df['收盘'].to_numpy() * np.exp(np.cumsum(rng.normal(0, 0.01, len(df)))), 2)
+        stocks[f"{600000 + i:06d}"] = df
+
+    def run():
+        analyzer = SectorAnalyzer(stocks)
+        analyzer.calculate_correlation()
+        analyzer.calculate_sector_index()
+        return analyzer.get_top_performers()
+    return run
+
+
+def case_lhb_classify():
+    """龙虎榜营业部分类 (data/lhb_config.xml)"""
+    branch_map, fuzzy_rules = load_lhb_config(os.path.join(PROJECT_ROOT, 'data', 'lhb_config.xml'))
+    branches = pd.read_csv(fixture_path('lhb_detail.csv'))['交易营业部名称'].astype(str).str.strip().tolist()
+    return lambda: [classify_branch(b, branch_map, fuzzy_rules) for b in branches]
+
+
+CASES = {
+    'quote_parse': case_quote_parse,
+    'minute_aggregate': case_minute_aggregate,
+    'block_index': case_block_index,
+    'indicators': case_indicators,
+    'sector': case_sector,
+    'lhb_classify': case_lhb_classify,
+}
+
+
+def git_commit():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=PROJECT_ROOT,
+                                capture_output=True, text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=PROJECT_ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+        return commit + ('-dirty' if dirty else '')
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run_case(func, repeat):
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    timings = [t / number for t in timer.repeat(repeat=repeat, number=number)]
+    return {
+        'min_s': min(timings),
+        'median_s': float(np.median(timings)),
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Offline benchmarks for the analysis and fetch hot paths')
+    parser.add_argument('--filter', default='', help='Only run cases whose name contains this text')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--output', help='Result JSON path (default: benchmarks/results/<commit>.json)')
+    parser.add_argument('--compare', help='Previous result JSON to compare against')
+    args = parser.parse_args()
+
+    commit = git_commit()
+    results = {}
+    print(f"Commit {commit}, best of {args.repeat}")
+    for name, case in CASES.items():
+        if args.filter not in name:
+            continue
+        results[name] = run_case(case(), args.repeat)
+        print(f"  {name:<18} {results[name]['min_s'] * 1e3:10.3f} ms")
+
+    report = {
+        'meta': {
+            'commit': commit,
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'pandas': pd.__version__,
+            'machine': platform.machine(),
+        },
+        'results': results,
+    }
+    output = args.output or os.path.join(RESULT_DIR, f"{commit}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"Results saved to: {output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        print(f"\nCompared with {baseline['meta']['commit']} (ratio < 1 is faster):")
+        for name, res in results.items():
+            old = baseline['results'].get(name)
+            if old:
+                print(f"  {name:<18} {res['min_s'] / old['min_s']:6.2f}x")
+
+
+if __name__ == "__main__":
+    main()
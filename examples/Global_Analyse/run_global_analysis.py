@@ -4,7 +4,6 @@
 import sys
 import os
 from pathlib import Path
-import time
 from datetime import datetime
 import pandas as pd
 import numpy as np
@@ -18,6 +17,7 @@ project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
 from src.data_fetch.stock_data import StockDataFetcher
+from src.data_fetch.symbol_master import strip_market_prefix
 from examples.Global_Analyse.report_generator import generate_report
 
 # 配置输出目录
@@ -61,51 +61,6 @@ def load_stock_config(xml_path):
             
     return config
 
-def get_name_code_map(fetcher: StockDataFetcher) -> dict:
-    """
-    获取 股票名称 -> 股票代码 的映射
-    支持本地缓存以加快速度
-    """
-    cache_file = os.path.join(project_root, "data", "stock_list_cache.csv")
-    df = None
-    
-    # 1. 尝试读取缓存
-    if os.path.exists(cache_file):
-        try:
-            # 检查缓存文件的修改时间，如果太旧(例如超过24小时)则重新获取
-            mtime = os.path.getmtime(cache_file)
-            if time.time() - mtime < 86400: # 24小时
-                print(f"读取本地股票列表缓存: {cache_file}")
-                df = pd.read_csv(cache_file, dtype={'代码': str})
-            else:
-                print("本地缓存已过期，准备重新获取...")
-        except Exception as e:
-            print(f"读取缓存失败: {e}")
-            
-    # 2. 如果没有缓存或读取失败，则在线获取
-    if df is None or df.empty:
-        print("正在获取全市场股票列表以匹配代码 (首次运行可能需要1-2分钟，请耐心等待)...")
-        df = fetcher.get_stock_list()
-        
-        if df is not None and not df.empty:
-            # 保存缓存
-            try:
-                # 确保目录存在
-                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-                df.to_csv(cache_file, index=False, encoding='utf-8-sig')
-                print(f"股票列表已缓存至: {cache_file}")
-            except Exception as e:
-                print(f"保存缓存失败: {e}")
-    
-    if df is None or df.empty:
-        print("❌ 无法获取全市场股票列表")
-        return {}
-    
-    # 建立映射: 名称 -> 代码
-    # 注意：可能有重名，这里简单处理，取第一个匹配的
-    name_code_map = df.set_index('名称')['代码'].to_dict()
-    return name_code_map
-
 def calculate_historical_metrics(df: pd.DataFrame) -> dict:
     """
     计算基于历史数据的指标 (如5日均量)
@@ -182,13 +137,12 @@ def main():
     # 如果有股票没有代码，尝试在线获取
     if stocks_without_code:
         print(f"⚠️ 有 {len(stocks_without_code)} 个股票在XML中未配置代码，尝试在线匹配...")
-        name_code_map = get_name_code_map(fetcher)
-        
         for name in stocks_without_code:
-            if name in name_code_map:
-                code = name_code_map[name]
+            # 通过共享的股票代码主表按名称匹配 (支持改名前的旧名称)
+            code = fetcher.symbol_master.code_of(name)
+            if code:
                 # 确保带前缀
-                code = fetcher._add_market_prefix(code)
+                code = fetcher.symbol_master.symbol(code)
                 valid_stocks[name] = code
                 print(f"  ✅ 匹配成功: {name} -> {code}")
             else:
@@ -214,7 +168,7 @@ def main():
     realtime_df['代码'] = realtime_df['代码'].astype(str)
     
     # 统一处理：去掉前缀进行匹配
-    realtime_df['简码'] = realtime_df['代码'].apply(lambda x: x[2:] if x.startswith(('sh', 'sz', 'bj')) else x)
+    realtime_df['简码'] = realtime_df['代码'].apply(strip_market_prefix)
     
     # 重新建立映射，使用简码作为key
     realtime_map = realtime_df.set_index('简码').to_dict('index')
@@ -260,7 +214,7 @@ def main():
                 
             full_code = valid_stocks[name]
             # 获取简码用于查找
-            simple_code = full_code[2:] if full_code.startswith(('sh', 'sz', 'bj')) else full_code
+            simple_code = strip_market_prefix(full_code)
             
             processed += 1
             # 简单的进度显示
@@ -7,19 +7,20 @@ Advanced Global Block Analysis Service
 import sys
 import os
 from pathlib import Path
-import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import pandas as pd
 import numpy as np
 import xml.etree.ElementTree as ET
-import concurrent.futures
 import traceback
 
 # Add project root to path
 project_root = str(Path(__file__).parent.parent.parent)
 sys.path.append(project_root)
 
+from src.data_fetch.rate_limit import run_batch
 from src.data_fetch.stock_data import StockDataFetcher
+from src.data_fetch.symbol_master import strip_market_prefix
+from src.utils import metrics
 from service.Block_Analyse.chart_generator import generate_advanced_charts
 from service.Block_Analyse.generate_html_report import generate_html_report
 
@@ -44,39 +45,14 @@ def load_stock_config(xml_path):
             config['all_stocks'].append(stock_info)
     return config
 
-def get_name_code_map(fetcher: StockDataFetcher) -> dict:
-    cache_file = os.path.join(project_root, "data", "stock_list_cache.csv")
-    df = None
-    if os.path.exists(cache_file):
-        try:
-            mtime = os.path.getmtime(cache_file)
-            if time.time() - mtime < 86400:
-                df = pd.read_csv(cache_file, dtype={'代码': str})
-        except Exception:
-            pass
-            
-    if df is None or df.empty:
-        print("Fetching stock list online...")
-        df = fetcher.get_stock_list()
-        if df is not None and not df.empty:
-            try:
-                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
-                df.to_csv(cache_file, index=False, encoding='utf-8-sig')
-            except Exception:
-                pass
-    
-    if df is None or df.empty:
-        return {}
-    return df.set_index('名称')['代码'].to_dict()
-
 def fetch_stock_history(code, fetcher):
-    try:
-        # Fetch enough history for 10-day calculation
-        end_date = (datetime.now() + timedelta(days=1)).strftime("%Y%m%d")
-        return fetcher.get_stock_hist(code, start_date="20240101", end_date=end_date)
-    except Exception as e:
-        print(f"Failed to fetch history for {code}: {e}")
-        return None
+    # Fetch enough history for 10-day calculation
+    end_date = (datetime.now() + timedelta(days=1)).strftime("%Y%m%d")
+    df = fetcher.get_stock_hist(code, start_date="20240101", end_date=end_date)
+    # The fetcher returns an empty frame when both sources fail; raise so run_batch retries the stock
+    if df is None or df.empty:
+        raise ValueError(f"no history for {code}")
+    return df
 
 def calculate_stock_period_returns(df: pd.DataFrame) -> dict:
     """
@@ -153,31 +129,39 @@ def calculate_historical_metrics(df: pd.DataFrame) -> dict:
         'RedDays': red_days
     }
 
-def main():
+def main(config=None, fetcher=None):
+    """
+    config: parsed stock_list.xml (load_stock_config layout); read from data/ when omitted.
+    fetcher: StockDataFetcher to use, so an in-process orchestrator can share one instance.
+    """
     print("Starting Advanced Block Analysis Service...")
     
-    xml_path = os.path.join(project_root, "data", "stock_list.xml")
-    if not os.path.exists(xml_path):
-        print(f"Config not found: {xml_path}")
-        return
-        
-    config = load_stock_config(xml_path)
-    fetcher = StockDataFetcher()
+    if config is None:
+        xml_path = os.path.join(project_root, "data", "stock_list.xml")
+        if not os.path.exists(xml_path):
+            print(f"Config not found: {xml_path}")
+            return
+        config = load_stock_config(xml_path)
+    if fetcher is None:
+        fetcher = StockDataFetcher()
     
     # Prepare stocks
     valid_stocks = {}
     all_stocks = config['all_stocks']
     
-    # Simple mapping logic (assuming cache exists or online fetch works)
-    name_code_map = get_name_code_map(fetcher)
+    # One market-wide snapshot (universe from the shared symbol master)
+    # serves the realtime quotes of all configured stocks
+    print("Fetching market snapshot...")
+    snapshot = fetcher.get_market_snapshot()
     
+    # Stocks without a code in the XML are resolved by name via the symbol master
     for s in all_stocks:
         if s.get('code'):
             valid_stocks[s['name']] = s['code']
-        elif s['name'] in name_code_map:
-            code = name_code_map[s['name']]
-            code = fetcher._add_market_prefix(code)
-            valid_stocks[s['name']] = code
+        else:
+            code = fetcher.symbol_master.code_of(s['name'])
+            if code:
+                valid_stocks[s['name']] = fetcher.symbol_master.symbol(code)
             
     if not valid_stocks:
         print("No valid stocks found.")
@@ -185,40 +169,36 @@ def main():
 
     # Fetch Realtime
     print(f"Fetching realtime data for {len(valid_stocks)} stocks...")
-    realtime_df = fetcher.get_stock_realtime_batch(list(valid_stocks.values()))
+    simple_codes = [strip_market_prefix(c) for c in valid_stocks.values()]
+    if not snapshot.empty:
+        realtime_df = snapshot[snapshot['代码'].isin(simple_codes)].copy()
+        found = set(realtime_df['代码'])
+        missing = [code for code, simple in zip(valid_stocks.values(), simple_codes) if simple not in found]
+        if missing:
+            realtime_df = pd.concat([realtime_df, fetcher.get_stock_realtime_batch(missing)], ignore_index=True)
+    else:
+        realtime_df = fetcher.get_stock_realtime_batch(list(valid_stocks.values()))
     if realtime_df.empty:
         print("Failed to fetch realtime data.")
         return
         
     realtime_df['代码'] = realtime_df['代码'].astype(str)
-    realtime_df['简码'] = realtime_df['代码'].apply(lambda x: x[2:] if x.startswith(('sh', 'sz', 'bj')) else x)
+    realtime_df['简码'] = realtime_df['代码'].apply(strip_market_prefix)
     realtime_map = realtime_df.set_index('简码').to_dict('index')
     
-    # Fetch History (Multi-threaded)
-    print("Fetching historical data (8 threads)...")
-    history_data_map = {}
+    # Fetch History (Multi-threaded; concurrency adapts to the sina/tencent rate limiters)
+    print("Fetching historical data...")
     
-    with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
-        future_to_code = {executor.submit(fetch_stock_history, code, fetcher): code for code in valid_stocks.values()}
-        
-        completed = 0
-        total = len(future_to_code)
-        
-        for future in concurrent.futures.as_completed(future_to_code):
-            code = future_to_code[future]
-            completed += 1
-            if completed % 5 == 0:
-                print(f"Progress: {completed}/{total}", end="\r")
-            
-            try:
-                # 15s timeout per task to prevent hanging
-                res = future.result(timeout=15)
-                if res is not None and not res.empty:
-                    history_data_map[code] = res
-            except concurrent.futures.TimeoutError:
-                print(f"\nTimeout fetching {code}")
-            except Exception as e:
-                print(f"\nError fetching {code}: {e}")
+    def progress(completed, total):
+        if completed % 5 == 0:
+            print(f"Progress: {completed}/{total}", end="\r")
+    
+    with metrics.timer("stage.history"):
+        results, failed = run_batch(lambda code: fetch_stock_history(code, fetcher), list(valid_stocks.values()), 'sina', progress=progress)
+    history_data_map = results
+    if failed:
+        metrics.incr("errors.history", len(failed))
+        print(f"\nFailed to fetch history for: {', '.join(failed)}")
             
     print(f"\nFetched history for {len(history_data_map)} stocks.")
                 
@@ -235,7 +215,7 @@ def main():
             name = stock_info['name']
             if name not in valid_stocks: continue
             full_code = valid_stocks[name]
-            simple_code = full_code[2:] if full_code.startswith(('sh', 'sz', 'bj')) else full_code
+            simple_code = strip_market_prefix(full_code)
             
             # Get Realtime info for weight
             if simple_code not in realtime_map and full_code in realtime_map:
@@ -407,13 +387,15 @@ def main():
     
     # Generate Charts
     print("Generating charts...")
-    chart_path = generate_advanced_charts(df_block, OUTPUT_DIR, date_str)
+    with metrics.timer("stage.charts"):
+        chart_path = generate_advanced_charts(df_block, OUTPUT_DIR, date_str)
     print(f"Chart saved to {chart_path}")
     
     # Generate HTML Report
     print("Generating HTML report...")
     html_path = os.path.join(OUTPUT_DIR, "global_analysis_report.html")
-    generate_html_report(block_csv_path, html_path)
+    with metrics.timer("stage.report"):
+        generate_html_report(block_csv_path, html_path)
     
     # Open chart and report
     if os.name == 'nt':
@@ -423,6 +405,7 @@ def main():
 import traceback
 
 if __name__ == "__main__":
+    metrics.start_run("block")
     try:
         main()
     except Exception:
@@ -3,29 +3,44 @@ import pandas as pd
 from datetime import datetime, timedelta
 import time
 import os
-import concurrent.futures
+import sys
+from pathlib import Path
 
-def fetch_margin_data(stock_list):
+# Add project root to path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
+from src.data_fetch.symbol_master import strip_market_prefix, strip_market_prefixes, market_of
+from src.data_fetch.daily_cache import get_daily_cache
+from src.data_fetch.margin_store import get_margin_store
+from src.data_fetch.rate_limit import limited_call, run_batch
+from src.data_fetch.trading_calendar import get_trading_calendar
+from src.utils import metrics
+
+def fetch_margin_data(stock_list, full_market=False):
     """
     Fetch margin data for the latest available date.
     Returns a DataFrame with margin details for stocks in stock_list.
+    full_market: return every margin-eligible stock instead, with an 'in_watchlist' column.
     """
     print("Fetching Margin Data...")
     # Margin data is usually T-1
-    today = datetime.now()
+    calendar = get_trading_calendar()
     
-    # Try last 5 days to find data
+    # Try the last 3 trading days to find data
     df_sz = pd.DataFrame()
     df_sh = pd.DataFrame()
     last_date_str = ""
     
-    for i in range(0, 5):
-        date_str = (today - timedelta(days=i)).strftime("%Y%m%d")
+    for i, date_str in enumerate(calendar.recent_trading_days(3)):
+        if i > 0:
+            metrics.incr('retry.margin.date_fallback')
         try:
             # SZSE
             if df_sz.empty:
                 print(f"Trying SZSE margin for {date_str}...")
-                temp = ak.stock_margin_detail_szse(date=date_str)
+                temp = limited_call('szse', ak.stock_margin_detail_szse, date=date_str, missing_ok=True)
                 if temp is not None and not temp.empty:
                     df_sz = temp
                     df_sz['date'] = date_str
@@ -34,7 +49,7 @@ def fetch_margin_data(stock_list):
             # SSE
             if df_sh.empty:
                 print(f"Trying SSE margin for {date_str}...")
-                temp = ak.stock_margin_detail_sse(date=date_str)
+                temp = limited_call('sse', ak.stock_margin_detail_sse, date=date_str, missing_ok=True)
                 if temp is not None and not temp.empty:
                     df_sh = temp
                     df_sh['date'] = date_str
@@ -49,12 +64,23 @@ def fetch_margin_data(stock_list):
     df_sz_prev = pd.DataFrame()
     if not df_sz.empty:
         # Try to find previous trading day data for SZSE
-        found_date = datetime.strptime(df_sz['date'].iloc[0], "%Y%m%d")
-        for i in range(1, 10):
-            prev_date_str = (found_date - timedelta(days=i)).strftime("%Y%m%d")
+        found_date = df_sz['date'].iloc[0]
+        prev_dates = calendar.recent_trading_days(3, calendar.previous_trading_day(found_date))
+        store = get_margin_store()
+        for i, prev_date_str in enumerate(prev_dates, start=1):
+            if i > 1:
+                metrics.incr('retry.margin.date_fallback')
+            # Archived by the previous run's full-market margin analytics
+            archived = store.read_detail(prev_date_str)
+            if not archived.empty and (archived['market'] == 'sz').any():
+                archived = archived[archived['market'] == 'sz']
+                df_sz_prev = pd.DataFrame({'证券代码': archived['code'], '融资余额': archived['margin_balance']})
+                metrics.incr('cache.margin_detail.hit')
+                print(f"Found SZSE previous data for {prev_date_str} in margin archive")
+                break
             try:
                 print(f"Trying SZSE margin (prev) for {prev_date_str}...")
-                temp = ak.stock_margin_detail_szse(date=prev_date_str)
+                temp = limited_call('szse', ak.stock_margin_detail_szse, date=prev_date_str, missing_ok=True)
                 if temp is not None and not temp.empty:
                     df_sz_prev = temp
                     print(f"Found SZSE previous data for {prev_date_str}")
@@ -62,157 +88,184 @@ def fetch_margin_data(stock_list):
             except:
                 pass
 
-    # Combine
-    results = []
-    # Strip prefixes from target codes for comparison if margin data uses pure codes
-    target_codes_pure = {s['code'][2:] if s['code'].startswith(('sh', 'sz', 'bj')) else s['code'] for s in stock_list}
-    target_codes_full = {s['code'] for s in stock_list}
+    # Combine (columnar: normalize codes once, join T-1 by code, concat both exchanges)
+    frames = []
     
     # Process SZSE
+    # Columns: 证券代码, 证券简称, 融资买入额, 融资余额, 融券卖出量, 融券余量, 融券余额, 融资融券余额
     if not df_sz.empty:
-        # Optimize prev lookup
-        sz_prev_map = {}
+        sz = pd.DataFrame({
+            'code': strip_market_prefixes(df_sz['证券代码']),
+            'name': df_sz['证券简称'],
+            'margin_buy': df_sz['融资买入额'],
+            'margin_balance': df_sz['融资余额'],
+            'margin_total': df_sz['融资融券余额'],
+            'date': df_sz['date'],
+            'market': 'sz',
+        })
+        # Net Buy = Balance_T - Balance_T-1 (SZSE has no repay column); 0 when T-1 is missing to avoid huge spikes
         if not df_sz_prev.empty:
-            # Create dict: code -> margin_balance
-            for _, row in df_sz_prev.iterrows():
-                code = str(row['证券代码']).zfill(6)
-                sz_prev_map[code] = row['融资余额']
-
-        # Columns: 证券代码, 证券简称, 融资买入额, 融资余额, 融券卖出量, 融券余量, 融券余额, 融资融券余额
-        for _, row in df_sz.iterrows():
-            code = str(row['证券代码']).zfill(6) # Ensure 6 digits
-            if code in target_codes_pure:
-                balance = row['融资余额']
-                buy = row['融资买入额']
-                
-                # Calculate Net Buy: Balance_T - Balance_T-1
-                net_buy = 0
-                if code in sz_prev_map:
-                    net_buy = balance - sz_prev_map[code]
-                else:
-                    # Fallback if no prev data? Maybe just use Buy? Or 0?
-                    # Using Buy is wrong as it ignores repay.
-                    # Best effort: use Buy if we really have to, typically repay exists.
-                    # But actually without repay, net_buy is unknown.
-                    # Let's set to 0 or leave it empty? User wants chart.
-                    # Let's assume 0 if missing to avoid huge spikes.
-                    net_buy = 0 
-                
-                results.append({
-                    'code': code,
-                    'name': row['证券简称'],
-                    'margin_buy': buy,
-                    'margin_balance': balance,
-                    'margin_net_buy': net_buy, # Added
-                    'margin_total': row['融资融券余额'],
-                    'date': row['date'],
-                    'market': 'sz'
-                })
+            prev_balance = df_sz_prev.set_index(strip_market_prefixes(df_sz_prev['证券代码']))['融资余额']
+            prev_balance = prev_balance[~prev_balance.index.duplicated()]
+            sz['margin_net_buy'] = (sz['margin_balance'] - sz['code'].map(prev_balance)).fillna(0)
+        else:
+            sz['margin_net_buy'] = 0
+        frames.append(sz)
 
     # Process SSE
+    # Columns: 信用交易日期, 标的证券代码, 标的证券简称, 融资余额, 融资买入额, 融资偿还额, 融券余量, 融券卖出量, 融券偿还量
     if not df_sh.empty:
-        # Columns: 信用交易日期, 标的证券代码, 标的证券简称, 融资余额, 融资买入额, 融资偿还额, 融券余量, 融券卖出量, 融券偿还量
-        for _, row in df_sh.iterrows():
-            code = str(row['标的证券代码']).zfill(6)
-            if code in target_codes_pure:
-                buy = row['融资买入额']
-                repay = row['融资偿还额']
-                net_buy = buy - repay
-                
-                results.append({
-                    'code': code,
-                    'name': row['标的证券简称'],
-                    'margin_buy': buy,
-                    'margin_balance': row['融资余额'],
-                    'margin_net_buy': net_buy, # Added
-                    'margin_total': row['融资余额'], # SSE might not have total column directly named same
-                    'date': row['date'],
-                    'market': 'sh'
-                })
-                
-    return pd.DataFrame(results)
+        frames.append(pd.DataFrame({
+            'code': strip_market_prefixes(df_sh['标的证券代码']),
+            'name': df_sh['标的证券简称'],
+            'margin_buy': df_sh['融资买入额'],
+            'margin_balance': df_sh['融资余额'],
+            'margin_net_buy': df_sh['融资买入额'] - df_sh['融资偿还额'],
+            'margin_total': df_sh['融资余额'], # SSE might not have total column directly named same
+            'date': df_sh['date'],
+            'market': 'sh',
+        }))
 
-def fetch_foreign_flows(stock_list):
-    """
-    Fetch foreign holdings and fund flows.
-    """
-    print("Fetching Foreign Flows...")
-    results = []
-    
-    # 1. Get Top Foreign Holdings (Market Wide) to check if our stocks are heavy
-    # This might be slow to check one by one.
-    # Let's check individual fund flow for all target stocks.
+    if not frames:
+        return pd.DataFrame()
+    columns = ['code', 'name', 'margin_buy', 'margin_balance', 'margin_net_buy', 'margin_total', 'date', 'market']
+    df = pd.concat(frames, ignore_index=True)[columns]
     
-import concurrent.futures
+    # Strip prefixes from target codes for comparison, margin data uses pure codes
+    target_codes_pure = {strip_market_prefix(s['code']) for s in stock_list}
+    in_watchlist = df['code'].isin(target_codes_pure)
+    if full_market:
+        df['in_watchlist'] = in_watchlist
+        return df
+    return df[in_watchlist].reset_index(drop=True)
+
+# stock_hsgt_hold_stock_em reports holdings in units of 10k shares
+HSGT_SHARES_UNIT = 10000
 
-def fetch_single_stock_flow(stock):
+def fetch_single_stock_flow(stock, need_flow=True, need_holding=True):
+    """
+    Per-stock fund flow and northbound holding (each call downloads the stock's full history).
+    Only used for symbols the market-wide tables do not cover. Raises on failure so run_batch can retry it.
+    """
     code = stock['code']
     name = stock['name']
     
     # Strip prefix for akshare functions that don't want it
-    code_pure = code[2:] if code.startswith(('sh', 'sz', 'bj')) else code
+    code_pure = strip_market_prefix(code)
+    
+    result = {'code': code, 'name': name}
     
-    try:
+    if need_flow:
         # Fund Flow (Realtime/Daily)
-        market = "sh" if code.startswith("sh") or code.startswith("6") else "sz"
-        if code.startswith("bj") or code.startswith("4") or code.startswith("8"): market = "bj"
+        market = market_of(code) or "sz"
         
-        df_flow = ak.stock_individual_fund_flow(stock=code_pure, market=market)
-        
-        latest_flow = 0
-        latest_date = ""
+        with metrics.timer('fetch.fund_flow'):
+            df_flow = limited_call('eastmoney', ak.stock_individual_fund_flow, stock=code_pure, market=market)
         
+        result['net_inflow'] = 0
+        result['flow_date'] = ""
         if df_flow is not None and not df_flow.empty:
             last_row = df_flow.iloc[-1]
-            latest_flow = last_row['主力净流入-净额'] # Main force net inflow
-            latest_date = last_row['日期']
-            
+            result['net_inflow'] = last_row['主力净流入-净额'] # Main force net inflow
+            # Same 'YYYY-MM-DD' format as the market-wide path
+            result['flow_date'] = pd.Timestamp(last_row['日期']).strftime('%Y-%m-%d')
+    
+    if need_holding:
         # Foreign Holding (Northbound)
-        df_hold = ak.stock_hsgt_individual_em(symbol=code_pure)
-        latest_holding = 0
-        latest_holding_ratio = 0
+        with metrics.timer('fetch.hsgt_holding'):
+            df_hold = limited_call('eastmoney', ak.stock_hsgt_individual_em, symbol=code_pure)
         
+        result['foreign_holding'] = 0
+        result['foreign_ratio'] = 0
         if df_hold is not None and not df_hold.empty:
             last_row = df_hold.iloc[-1]
-            latest_holding = last_row['持股数量']
-            latest_holding_ratio = last_row['持股数量占A股百分比']
-            
-        return {
-            'code': code,
-            'name': name,
-            'flow_date': latest_date,
-            'net_inflow': latest_flow,
-            'foreign_holding': latest_holding,
-            'foreign_ratio': latest_holding_ratio
-        }
-        
-    except Exception as e:
-        # print(f"Error fetching foreign/flow for {code}: {e}")
-        return None
+            result['foreign_holding'] = last_row['持股数量']
+            result['foreign_ratio'] = last_row['持股数量占A股百分比']
+    
+    return result
+
+def fetch_market_fund_flow(trade_date, settled):
+    """
+    Main-force net inflow of every A share for one trading day (market-wide ranking, paged by 100).
+    Cached per trading day once the session has closed.
+    """
+    def load():
+        with metrics.timer('fetch.fund_flow_bulk'):
+            df = limited_call('eastmoney', ak.stock_individual_fund_flow_rank, indicator="今日")
+        return pd.DataFrame({
+            'code': strip_market_prefixes(df['代码']),
+            'net_inflow': pd.to_numeric(df['今日主力净流入-净额'], errors='coerce'),
+        }).dropna()
+    return get_daily_cache().get('fund_flow', trade_date, load, persist=settled)
+
+def fetch_market_hsgt_holdings(trade_date, settled):
+    """
+    Northbound holdings of every Stock Connect eligible A share (one table for the whole market).
+    Cached per trading day once the session has closed.
+    """
+    def load():
+        with metrics.timer('fetch.hsgt_holding_bulk'):
+            df = limited_call('eastmoney', ak.stock_hsgt_hold_stock_em, market="北向", indicator="今日排行")
+        return pd.DataFrame({
+            'code': strip_market_prefixes(df['代码']),
+            'foreign_holding': pd.to_numeric(df['今日持股-股数'], errors='coerce') * HSGT_SHARES_UNIT,
+            'foreign_ratio': pd.to_numeric(df['今日持股-占总股本比'], errors='coerce'),
+        })
+    return get_daily_cache().get('hsgt_holdings', trade_date, load, persist=settled)
 
 def fetch_foreign_flows(stock_list):
     """
     Fetch foreign holdings and fund flows.
+    Market-wide tables (cached per trading day) are joined to the watchlist in one merge;
+    per-stock calls are only made for symbols the tables are missing.
     """
     print("Fetching Foreign Flows...")
-    results = []
-    total = len(stock_list)
-    completed = 0
+    if not stock_list:
+        return pd.DataFrame()
     
-    # Increased workers to 20 for speed
-    with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-        futures = [executor.submit(fetch_single_stock_flow, stock) for stock in stock_list]
-        for future in concurrent.futures.as_completed(futures):
-            res = future.result()
-            if res:
-                results.append(res)
-            
-            completed += 1
-            if completed % 10 == 0 or completed == total:
-                print(f"Foreign/Flow Progress: {completed}/{total} stocks processed...", end='\r')
+    calendar = get_trading_calendar()
+    trade_date = calendar.previous_trading_day(inclusive=True)
+    # Today's numbers keep changing until the close
+    settled = trade_date < datetime.now().strftime("%Y%m%d") or datetime.now().strftime("%H%M") >= "1500"
     
-    print(f"\nForeign Flows Done. Got {len(results)} valid records.")        
-    return pd.DataFrame(results)
+    df_flow = fetch_market_fund_flow(trade_date, settled)
+    df_hold = fetch_market_hsgt_holdings(trade_date, settled)
+    
+    df = pd.DataFrame([{'code': s['code'], 'name': s['name']} for s in stock_list])
+    df['code_pure'] = strip_market_prefixes(df['code'])
+    if not df_flow.empty:
+        df = df.merge(df_flow.drop_duplicates('code').rename(columns={'code': 'code_pure'}), on='code_pure', how='left')
+    else:
+        df['net_inflow'] = float('nan')
+    df['flow_date'] = datetime.strptime(trade_date, "%Y%m%d").strftime("%Y-%m-%d")
+    if not df_hold.empty:
+        df = df.merge(df_hold.drop_duplicates('code').rename(columns={'code': 'code_pure'}), on='code_pure', how='left')
+        # Not in the northbound table: not Stock Connect eligible, nothing held
+        df[['foreign_holding', 'foreign_ratio']] = df[['foreign_holding', 'foreign_ratio']].fillna(0)
+    else:
+        df['foreign_holding'] = float('nan')
+        df['foreign_ratio'] = float('nan')
+    
+    # Per-stock fallback for whatever the market-wide tables did not cover
+    missing_flow = df['net_inflow'].isna()
+    missing_hold = df['foreign_holding'].isna()
+    fallback = df.index[missing_flow | missing_hold]
+    if len(fallback):
+        print(f"Per-stock fallback for {len(fallback)} stocks (flow missing: {int(missing_flow.sum())}, holding missing: {int(missing_hold.sum())})...")
+        metrics.incr('retry.foreign_flow.per_stock', len(fallback))
+        results, failed = run_batch(
+            lambda i: fetch_single_stock_flow(stock_list[i], bool(missing_flow[i]), bool(missing_hold[i])),
+            fallback, 'eastmoney')
+        metrics.incr('errors.foreign_flow', len(failed))
+        if results:
+            df_fallback = pd.DataFrame.from_dict(results, orient='index').drop(columns=['code', 'name'])
+            df.update(df_fallback)
+    
+    # Same as before: stocks whose data could not be fetched are left out
+    df = df.dropna(subset=['net_inflow', 'foreign_holding'])
+    columns = ['code', 'name', 'flow_date', 'net_inflow', 'foreign_holding', 'foreign_ratio']
+    print(f"Foreign Flows Done. Got {len(df)} valid records.")
+    return df[columns].reset_index(drop=True)
 
 def fetch_lhb_data(stock_list):
     """
@@ -233,6 +286,7 @@ def fetch_lhb_data(stock_list):
             # Check file age (ensure it's fresh, e.g. < 12 hours)
             mtime = os.path.getmtime(local_summary_path)
             if time.time() - mtime < 43200: 
+                metrics.incr('cache.lhb_summary.hit')
                 print(f"Loading LHB data from local analysis: {local_summary_path}")
                 df = pd.read_csv(local_summary_path, dtype={'代码': str, '股票代码': str})
                 
@@ -247,26 +301,28 @@ def fetch_lhb_data(stock_list):
 
     # 2. Network Fallback
     if df is None or df.empty:
+        metrics.incr('cache.lhb_summary.miss')
         today = datetime.now().strftime("%Y%m%d")
         
         # Try EM first
         try:
-            df = ak.stock_lhb_detail_em(start_date=today, end_date=today)
+            df = limited_call('eastmoney', ak.stock_lhb_detail_em, start_date=today, end_date=today)
         except Exception as e:
             print(f"LHB EM Error: {e}")
             
         # Try Sina if EM fails or empty
         if df is None or df.empty:
+            metrics.incr('retry.lhb.sina')
             try:
                 print("Trying Sina LHB...")
-                df = ak.stock_lhb_detail_daily_sina(date=today)
+                df = limited_call('sina', ak.stock_lhb_detail_daily_sina, date=today)
             except Exception as e:
                 print(f"LHB Sina Error: {e}")
             
     if df is None or df.empty:
         return pd.DataFrame()
         
-    target_codes_pure = {s['code'][2:] if s['code'].startswith(('sh', 'sz', 'bj')) else s['code'] for s in stock_list}
+    target_codes_pure = {strip_market_prefix(s['code']) for s in stock_list}
     results = []
     
     # Normalize columns
@@ -284,7 +340,7 @@ def fetch_lhb_data(stock_list):
         if '代码' in row: code = str(row['代码'])
         elif '股票代码' in row: code = str(row['股票代码'])
         
-        code = code.zfill(6)
+        code = strip_market_prefix(code)
         
         if code in target_codes_pure:
             if '名称' in row: name = row['名称']
@@ -316,57 +372,52 @@ def fetch_market_margin_history(days=10):
     """
     print(f"Fetching Market Margin History ({days} days)...")
     
-    today = datetime.now()
-    # Look back 30 days to ensure we get enough trading days
-    start_date = today - timedelta(days=days*3)
-    
-    start_str = start_date.strftime("%Y%m%d")
-    end_str = today.strftime("%Y%m%d")
+    # Two spare trading days: today's (and on Monday mornings possibly the last) summary is not out yet
+    dates_to_check = get_trading_calendar().recent_trading_days(days + 2)
+    # Published summaries never change: only dates missing from the local store are requested
+    store = get_margin_store()
     
     # 1. Fetch SSE History (Batch)
-    df_sh = pd.DataFrame()
-    try:
-        # SSE returns history in one call
-        # Unit: Yuan (needs / 1e8)
-        # Column: 融资余额
-        df_sh = ak.stock_margin_sse(start_date=start_str, end_date=end_str)
-        if df_sh is not None and not df_sh.empty:
-             # Standardize Date column
-             # Usually '信用交易日期' is int or str like 20240115
-             df_sh['date'] = df_sh['信用交易日期'].astype(str)
-             df_sh['sh_balance_yi'] = df_sh['融资余额'] / 100000000
-    except Exception as e:
-        print(f"SSE Valid History Check Error: {e}")
-        # If batch fails, maybe fall back? But sse usually works.
+    missing_sh = store.missing_summary_dates('sh', dates_to_check)
+    if missing_sh:
+        try:
+            # SSE returns history in one call
+            # Unit: Yuan (needs / 1e8)
+            # Column: 融资余额
+            with metrics.timer('fetch.margin_sse_summary'):
+                temp = limited_call('sse', ak.stock_margin_sse, start_date=min(missing_sh), end_date=max(missing_sh))
+            if temp is not None and not temp.empty:
+                 # Usually '信用交易日期' is int or str like 20240115
+                 store.write_summary('sh', dict(zip(temp['信用交易日期'].astype(str), temp['融资余额'] / 100000000)))
+        except Exception as e:
+            print(f"SSE Valid History Check Error: {e}")
+    metrics.incr('cache.margin_summary.hit', len(dates_to_check) - len(missing_sh))
+    metrics.incr('cache.margin_summary.miss', len(missing_sh))
+    df_sh = pd.DataFrame(list(store.summary('sh', dates_to_check).items()), columns=['date', 'sh_balance_yi'])
     
     # 2. Fetch SZSE History (Loop)
     # SZSE summary by date
     # Unit: 100 Million (Yi)
-    sz_history = []
-    
-    # We loop dates present in SSE or just loop calendar if SSE failed
-    # Better to loop calendar range to be safe
-    current_date = today
-    dates_to_check = []
+    missing_sz = store.missing_summary_dates('sz', dates_to_check)
+    sz_history = {}
     
-    # Generate dates backwards
-    for i in range((today - start_date).days + 1):
-        d = today - timedelta(days=i)
-        dates_to_check.append(d.strftime("%Y%m%d"))
-        
-    for d_str in dates_to_check:
+    # One request per missing trading day (from the trading calendar; weekends and holidays are skipped)
+    for d_str in missing_sz:
         try:
              # ak.stock_margin_szse returns summary for that date
-             temp = ak.stock_margin_szse(date=d_str)
+             with metrics.timer('fetch.margin_szse_summary'):
+                 temp = limited_call('szse', ak.stock_margin_szse, date=d_str, missing_ok=True)
              if temp is not None and not temp.empty:
                  if '融资余额' in temp.columns:
-                     val = temp['融资余额'].iloc[0] # Unit: Yi
-                     sz_history.append({'date': d_str, 'sz_balance_yi': float(val)})
+                     sz_history[d_str] = float(temp['融资余额'].iloc[0]) # Unit: Yi
         except:
-             # Date might be weekend or no data
+             # No data yet for this date
              pass
+    store.write_summary('sz', sz_history)
+    metrics.incr('cache.margin_summary.hit', len(dates_to_check) - len(missing_sz))
+    metrics.incr('cache.margin_summary.miss', len(missing_sz))
              
-    df_sz = pd.DataFrame(sz_history)
+    df_sz = pd.DataFrame(list(store.summary('sz', dates_to_check).items()), columns=['date', 'sz_balance_yi'])
     
     # 3. Merge
     if df_sz.empty and df_sh.empty:
@@ -433,12 +484,13 @@ def fetch_index_turnover_history(days=10):
     for name, code in indices_map.items():
         try:
             # print(f"-> Fetching {name} ({code})...")
-            df = ak.stock_zh_index_daily_em(symbol=code, start_date=start_str, end_date=end_str)
+            df = limited_call('eastmoney', ak.stock_zh_index_daily_em, symbol=code, start_date=start_str, end_date=end_str)
             
             # Fallback for CSI 2000
             if df.empty and "932000" in code:
                 # print(f"   (Trying backup code sh932000...)")
-                df = ak.stock_zh_index_daily_em(symbol="sh932000", start_date=start_str, end_date=end_str)
+                metrics.incr('retry.index_turnover.csi2000')
+                df = limited_call('eastmoney', ak.stock_zh_index_daily_em, symbol="sh932000", start_date=start_str, end_date=end_str)
             
             if not df.empty:
                 # Keep last N rows
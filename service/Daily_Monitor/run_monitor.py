@@ -1,15 +1,58 @@
 import os
+import sys
 import pandas as pd
 from datetime import datetime
+from pathlib import Path
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent.parent)
+if project_root not in sys.path:
+    sys.path.append(project_root)
+
 from config import load_stock_list
 from data_fetcher import fetch_margin_data, fetch_foreign_flows, fetch_lhb_data, fetch_market_margin_history, fetch_index_turnover_history
 from generate_daily_report import generate_daily_report
+from src.analysis.margin import margin_analytics, margin_rollup
+from src.data_fetch.margin_store import get_margin_store
+from src.data_fetch.symbol_master import strip_market_prefix, board_of
+from src.utils import metrics
+
+# Trading days of archived margin detail used for the balance-change z-scores
+MARGIN_ZSCORE_WINDOW = 20
+
+def analyze_market_margin(df_margin_full, code_block_map):
+    """
+    Archive the full-market margin detail (one columnar file per trading day) and
+    compute net-buy rankings, balance-change z-scores and board rollups for every
+    margin-eligible stock. Writes market_margin.csv and board_margin.csv.
+    Returns the full-market frame with analytics, 'block' and 'board' columns.
+    """
+    store = get_margin_store()
+    for date, group in df_margin_full.groupby('date'):
+        store.write_detail(date, group.drop(columns='in_watchlist'))
+    history = store.read_details(store.detail_dates()[-(MARGIN_ZSCORE_WINDOW + 2):])
+    
+    df = margin_analytics(df_margin_full, history, window=MARGIN_ZSCORE_WINDOW)
+    df['block'] = df['code'].map(code_block_map)
+    df['board'] = df['code'].map(board_of)
+    df_board = margin_rollup(df, 'board')
+    
+    output_dir = os.path.join(os.path.dirname(__file__), "output")
+    os.makedirs(output_dir, exist_ok=True)
+    df.sort_values('net_buy_rank').to_csv(os.path.join(output_dir, "market_margin.csv"), index=False, encoding='utf-8-sig')
+    df_board.to_csv(os.path.join(output_dir, "board_margin.csv"), index=False, encoding='utf-8-sig')
+    print(f"Market margin analytics: {len(df)} stocks, {len(store.detail_dates())} archived trading days")
+    return df
 
-def run_daily_monitor():
+def run_daily_monitor(stocks=None):
+    """
+    stocks: [{'code', 'name', 'block'}] as returned by load_stock_list; read from data/ when omitted.
+    """
     print(f"Starting Daily Monitor at {datetime.now()}")
     
     # 1. Load Stock List
-    stocks = load_stock_list()
+    if stocks is None:
+        stocks = load_stock_list()
     if not stocks:
         print("No stocks found.")
         return
@@ -17,36 +60,32 @@ def run_daily_monitor():
     print(f"Monitoring {len(stocks)} stocks.")
     
     # 2. Fetch Data
-    # Margin
-    df_margin = fetch_margin_data(stocks)
+    # Margin: the exchanges publish the whole market in one table, keep every row
+    with metrics.timer("stage.margin"):
+        df_margin_full = fetch_margin_data(stocks, full_market=True)
     
-    if not df_margin.empty:
-        latest_date = df_margin['date'].max()
+    df_margin = pd.DataFrame()
+    if not df_margin_full.empty:
+        latest_date = df_margin_full['date'].max()
         print(f"Latest Margin Data Date: {latest_date}")
+        df_margin = df_margin_full[df_margin_full['in_watchlist']].drop(columns='in_watchlist').reset_index(drop=True)
     
-    # Process Margin by Block
-    if not df_margin.empty:
+        # Process Margin: full-market analytics, block view is a filter over it
         # Create a map of code to block
         code_block_map = {}
         for s in stocks:
             # Map simple code to block
-            simple_code = s['code'][2:] if s['code'].startswith(('sh', 'sz', 'bj')) else s['code']
+            simple_code = strip_market_prefix(s['code'])
             code_block_map[simple_code] = s['block']
-            
+
         df_margin['block'] = df_margin['code'].map(code_block_map)
+
+        with metrics.timer("stage.margin_analytics"):
+            df_market_analytics = analyze_market_margin(df_margin_full, code_block_map)
         
-        # Group by block and sum margin_net_buy and margin_balance
-        df_block_margin = df_margin.groupby('block')[['margin_net_buy', 'margin_balance']].sum().reset_index()
-        df_block_margin.columns = ['block_name', 'margin_net_buy_sum', 'margin_balance_sum']
-        
-        # Calculate Ratio
-        # Prev Balance = Current Balance - Net Buy
-        df_block_margin['margin_balance_prev_sum'] = df_block_margin['margin_balance_sum'] - df_block_margin['margin_net_buy_sum']
-        # Ratio = Net Buy / Prev Balance * 100
-        df_block_margin['net_buy_ratio'] = df_block_margin.apply(
-            lambda row: (row['margin_net_buy_sum'] / row['margin_balance_prev_sum'] * 100) if row['margin_balance_prev_sum'] != 0 else 0, 
-            axis=1
-        )
+        # Group by block and sum margin_net_buy and margin_balance; Ratio = Net Buy / Prev Balance * 100
+        df_block_margin = margin_rollup(df_market_analytics[df_market_analytics['in_watchlist']], 'block')
+        df_block_margin = df_block_margin.rename(columns={'block': 'block_name'}).drop(columns='stock_count')
         
         # Load Ranking from Block Analysis if available
         # service/Daily_Monitor -> service -> AIQuant
@@ -74,16 +113,20 @@ def run_daily_monitor():
         print(f"Saved Block Margin Data to {block_margin_path}")
 
     # Foreign & Flows
-    df_foreign = fetch_foreign_flows(stocks)
+    with metrics.timer("stage.foreign_flows"):
+        df_foreign = fetch_foreign_flows(stocks)
     
     # LHB
-    df_lhb = fetch_lhb_data(stocks)
+    with metrics.timer("stage.lhb"):
+        df_lhb = fetch_lhb_data(stocks)
     
     # Market Margin History (Total Balance for last 10 days)
-    df_market_margin = fetch_market_margin_history(days=10)
+    with metrics.timer("stage.market_margin_history"):
+        df_market_margin = fetch_market_margin_history(days=10)
 
     # Index Turnover History (Last 10 days)
-    df_index_turnover = fetch_index_turnover_history(days=10)
+    with metrics.timer("stage.index_turnover_history"):
+        df_index_turnover = fetch_index_turnover_history(days=10)
     
     # 3. Save Results
     output_dir = os.path.join(os.path.dirname(__file__), "output")
@@ -119,9 +162,11 @@ def run_daily_monitor():
         
     # 4. Generate Report
     print("Generating HTML Report...")
-    generate_daily_report(output_dir, date_str)
+    with metrics.timer("stage.report"):
+        generate_daily_report(output_dir, date_str)
         
     print("Daily Monitor Completed.")
 
 if __name__ == "__main__":
+    metrics.start_run("daily_monitor")
     run_daily_monitor()
@@ -0,0 +1,363 @@
+import sys
+import os
+import time
+import argparse
+import importlib
+from pathlib import Path
+from datetime import datetime
+import xml.etree.ElementTree as ET
+import json
+import numpy as np
+
+# Add project root to path
+project_root = str(Path(__file__).parent.parent.parent)
+sys.path.append(project_root)
+
+from src.data_fetch.async_engine import AsyncFetchEngine
+from src.data_fetch.quote_parser import QuoteParser
+from src.data_fetch.symbol_master import add_market_prefix
+from src.utils import metrics
+from src.analysis.intraday import (
+    IntradayBarTable, BlockIndexState, parse_minute_payload, block_index, format_bar_times,
+    quote_minute, merge_minutes
+)
+
+# Configure Output Directory
+OUTPUT_DIR = os.path.join(os.path.dirname(__file__), "output")
+if not os.path.exists(OUTPUT_DIR):
+    os.makedirs(OUTPUT_DIR)
+
+SERVICE_ROOT = os.path.join(project_root, "service")
+
+# Bar width (minutes) -> bar settings.
+# 5min and 30min keep writing into their legacy service folders so the report
+# generators and the report packager find the files where they always were.
+RESOLUTIONS = {
+    1: {'open_bar': False, 'output_dir': OUTPUT_DIR, 'report': False},
+    5: {'open_bar': False, 'output_dir': os.path.join(SERVICE_ROOT, "5min_Analyse", "output"), 'report': True},
+    15: {'open_bar': False, 'output_dir': OUTPUT_DIR, 'report': False},
+    30: {'open_bar': True, 'output_dir': os.path.join(SERVICE_ROOT, "30min_Analyse", "output"), 'report': True},
+    60: {'open_bar': False, 'output_dir': OUTPUT_DIR, 'report': False},
+}
+
+# Polling mode: refresh interval (seconds) and the time after which polling stops
+POLL_INTERVAL = 30
+POLL_STOP_HHMM = 1505
+
+# Quote fields needed to turn a batch quote into a minute point
+QUOTE_POINT_PARSER = QuoteParser({
+    '时间': (30, None, None),
+    '最新价': (3, 1, None),
+    '昨收': (4, 1, None),
+    '成交额': (37, 10000, None),  # 万 -> 元
+}, symbol_column='symbol')
+
+def load_stock_config(xml_path):
+    tree = ET.parse(xml_path)
+    root = tree.getroot()
+    config = {'blocks': {}, 'all_stocks': []}
+    for block in root.findall('Block'):
+        block_name = block.get('name')
+        if block_name not in config['blocks']:
+            config['blocks'][block_name] = []
+        for stock in block.findall('Stock'):
+            stock_name = stock.text.strip()
+            stock_code = stock.get('code')
+            stock_info = {'name': stock_name, 'code': stock_code}
+            config['blocks'][block_name].append(stock_info)
+            config['all_stocks'].append(stock_info)
+    return config
+
+def resolve_block_codes(config):
+    """
+    Map every block to the codes of its stocks (stocks without a code in the
+    XML are skipped).
+    """
+    valid_stocks = {}
+    for s in config['all_stocks']:
+        if s.get('code'):
+            valid_stocks[s['name']] = s['code']
+
+    block_codes = {}
+    for block_name, stock_list in config['blocks'].items():
+        block_codes[block_name] = [valid_stocks[s['name']] for s in stock_list if s['name'] in valid_stocks]
+    return block_codes
+
+def fetch_minute_series(codes, engine=None):
+    """
+    Fetch minute data for all codes concurrently in a single event loop.
+    Returns {code: parsed minute arrays} for every code that succeeded;
+    the arrays are shared by all bar widths.
+    """
+    tencent_codes = {code: add_market_prefix(code) for code in codes}
+    engine = engine if engine is not None else AsyncFetchEngine()
+    payloads = engine.fetch_minute_queries(list(set(tencent_codes.values())))
+
+    series = {}
+    for code, tencent_code in tencent_codes.items():
+        if tencent_code not in payloads:
+            continue
+        parsed = parse_minute_payload(tencent_code, payloads[tencent_code])
+        if parsed is not None:
+            series[code] = parsed
+    return series
+
+def build_bar_table(series, width):
+    """
+    Bucket the parsed minute series into one IntradayBarTable of the given width.
+    """
+    minute_table = IntradayBarTable(width, open_bar=RESOLUTIONS[width]['open_bar'])
+    for code, parsed in series.items():
+        minute_table.add(code, parsed)
+    return minute_table
+
+def process_block_data(block_name, block_codes, minute_table, state=None, start=0):
+    """
+    Calculate aggregated bar data for a block.
+    block_codes: codes of the block's stocks.
+    minute_table: universe IntradayBarTable from build_bar_table.
+    state: optional BlockIndexState kept between polling ticks; only bars
+           from column `start` onwards are recomputed.
+    """
+    # Join block membership against the prefetched table (no network access)
+    joined = minute_table.join(block_codes)
+    if joined is None:
+        return None
+
+    res = state.update(*joined, start=start) if state is not None else block_index(*joined)
+    if res is None:
+        return None
+
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    times = format_bar_times(minute_table.labels[res['mask']], today_str)
+
+    return {
+        'name': block_name,
+        'times': times,
+        'values': [round(v, 2) for v in res['values'].tolist()],
+        'dynamic_values': [round(v, 2) for v in res['dynamic_values'].tolist()],
+        'volumes': [round(v, 2) for v in res['volumes'].tolist()],
+        'cum_volumes': [round(v, 2) for v in res['cum_volumes'].tolist()]
+    }
+
+def build_block_payload(block_codes, minute_table, states=None, start=0):
+    """
+    Block name -> series map in the layout the report generators consume.
+    states: optional {block name: BlockIndexState} for incremental updates.
+    """
+    data_map = {}
+    for block_name, codes in block_codes.items():
+        state = states[block_name] if states is not None else None
+        res = process_block_data(block_name, codes, minute_table, state, start)
+        if not res:
+            continue
+        data_map[res['name']] = {
+            'times': res['times'],
+            'values': res['values'],
+            'dynamic_values': res['dynamic_values'],
+            'volumes': res['volumes'],
+            'cum_volumes': res['cum_volumes']
+        }
+    return data_map
+
+def generate_report(width, json_path, html_path):
+    """
+    Run the legacy {width}min report generator living in service/{width}min_Analyse.
+    """
+    report_dir = os.path.join(SERVICE_ROOT, f"{width}min_Analyse")
+    if report_dir not in sys.path:
+        sys.path.append(report_dir)
+    module = importlib.import_module(f"generate_{width}min_report")
+    getattr(module, f"generate_{width}min_report")(json_path, html_path)
+
+def save_resolution(width, data_map, open_report=True):
+    """
+    Write {width}min_data.json (and the HTML report where a generator exists).
+    """
+    settings = RESOLUTIONS[width]
+    output_dir = settings['output_dir']
+    os.makedirs(output_dir, exist_ok=True)
+
+    json_path = os.path.join(output_dir, f"{width}min_data.json")
+    print(f"Saving data to {json_path}...")
+    with open(json_path, 'w', encoding='utf-8') as f:
+        json.dump(data_map, f, ensure_ascii=False, indent=4)
+
+    if not settings['report']:
+        return
+
+    html_path = os.path.join(output_dir, f"{width}min_analysis.html")
+    print(f"Generating {width}min HTML report...")
+    generate_report(width, json_path, html_path)
+
+    if open_report and os.name == 'nt':
+        os.startfile(html_path)
+
+def load_block_codes(config=None):
+    if config is not None:
+        return resolve_block_codes(config)
+    xml_path = os.path.join(project_root, "data", "stock_list.xml")
+    if not os.path.exists(xml_path):
+        print(f"Config not found: {xml_path}")
+        return None
+    return resolve_block_codes(load_stock_config(xml_path))
+
+def check_resolutions(resolutions):
+    for width in resolutions:
+        if width not in RESOLUTIONS:
+            print(f"Unsupported resolution: {width}min (supported: {sorted(RESOLUTIONS)})")
+            return False
+    return True
+
+def prefetch_universe(block_codes, engine=None):
+    """
+    Universe-level prefetch: every unique code is fetched exactly once,
+    even if the stock is listed under several blocks, and the same minute
+    series feed every resolution.
+    """
+    requested = sum(len(codes) for codes in block_codes.values())
+    codes = list(dict.fromkeys(code for codes in block_codes.values() for code in codes))
+    print(f"Fetching minute data for {len(codes)} unique stocks ({requested - len(codes)} duplicate fetches avoided)...")
+    with metrics.timer("stage.prefetch"):
+        series = fetch_minute_series(codes, engine)
+    print(f"Fetched minute data for {len(series)} stocks.")
+    return codes, series
+
+def main(resolutions=None, config=None, engine=None):
+    """
+    config: parsed stock_list.xml (load_stock_config layout); read from data/ when omitted.
+    engine: AsyncFetchEngine to use, so an in-process orchestrator can share one instance.
+    """
+    resolutions = sorted(resolutions or RESOLUTIONS)
+    if not check_resolutions(resolutions):
+        return
+
+    print(f"Starting Intraday Analysis ({', '.join(f'{w}min' for w in resolutions)})...")
+
+    block_codes = load_block_codes(config)
+    if block_codes is None:
+        return
+    _, series = prefetch_universe(block_codes, engine)
+
+    for width in resolutions:
+        print(f"Aggregating {width}min bars for {len(block_codes)} blocks...")
+        with metrics.timer(f"stage.aggregate.{width}min"):
+            minute_table = build_bar_table(series, width)
+            data_map = build_block_payload(block_codes, minute_table)
+        if not data_map:
+            print(f"No {width}min data generated.")
+            continue
+        with metrics.timer(f"stage.report.{width}min"):
+            save_resolution(width, data_map)
+
+def parse_quote_points(bodies):
+    """
+    Parse qt.gtimg.cn batch responses into
+    {tencent_code: (minute HHMM, price, cumulative amount, prev close)},
+    keeping only quotes stamped today.
+    """
+    df, _ = QUOTE_POINT_PARSER.parse(bodies)
+    today = datetime.now().strftime("%Y%m%d")
+    points = {}
+    for symbol, stamp, price, amount, prev_close in zip(
+        df['symbol'], df['时间'], df['最新价'], df['成交额'], df['昨收']
+    ):
+        if not stamp.startswith(today) or price <= 0:
+            continue
+        hhmm = quote_minute(stamp)
+        if hhmm is None:
+            continue
+        points[symbol] = (hhmm, price, amount, prev_close if prev_close > 0 else np.nan)
+    return points
+
+def poll(resolutions=None, interval=POLL_INTERVAL):
+    """
+    Long-running mode for market hours.
+    The full minute series are fetched once; afterwards every tick pulls one
+    batch quote per 80 stocks, merges the new minute into the in-memory
+    arrays, recomputes only the bars that changed and rewrites the JSON only
+    when the payload differs from the last one written.
+    """
+    resolutions = sorted(resolutions or [5])
+    if not check_resolutions(resolutions):
+        return
+
+    print(f"Starting Intraday Polling ({', '.join(f'{w}min' for w in resolutions)}, every {interval}s)...")
+
+    block_codes = load_block_codes()
+    if block_codes is None:
+        return
+    codes, series = prefetch_universe(block_codes)
+
+    tables = {w: build_bar_table(series, w) for w in resolutions}
+    states = {w: {block_name: BlockIndexState() for block_name in block_codes} for w in resolutions}
+    dirty = {w: 0 for w in resolutions}
+    written = {}
+
+    engine = AsyncFetchEngine()
+    tencent_codes = {code: add_market_prefix(code) for code in codes}
+    quote_symbols = list(dict.fromkeys(tencent_codes.values()))
+
+    while True:
+        for width in resolutions:
+            if dirty[width] is None:
+                continue
+            data_map = build_block_payload(block_codes, tables[width], states[width], dirty[width])
+            if data_map and data_map != written.get(width):
+                save_resolution(width, data_map, open_report=False)
+                written[width] = data_map
+
+        if int(datetime.now().strftime("%H%M")) >= POLL_STOP_HHMM:
+            print("Market closed, polling stopped.")
+            return
+
+        time.sleep(interval)
+
+        with metrics.timer("stage.poll_quotes"):
+            points = parse_quote_points(engine.fetch_quote_batches(quote_symbols))
+        dirty = {w: None for w in resolutions}
+        updated = 0
+        for code, tencent_code in tencent_codes.items():
+            if tencent_code not in points:
+                continue
+            hhmm, price, amount, prev_close = points[tencent_code]
+            new_points = (np.array([hhmm]), np.array([price]), np.array([amount]))
+
+            if code not in series:
+                # Minute fetch failed at startup: start this stock from the quote
+                series[code] = (*new_points, prev_close)
+                for width, table in tables.items():
+                    table.add(code, series[code])
+                    # Blocks holding the new stock are rebuilt from scratch by their state
+                    dirty[width] = len(table.labels) if dirty[width] is None else dirty[width]
+                updated += 1
+                continue
+
+            series[code], fresh = merge_minutes(series[code], *new_points)
+            if not len(fresh):
+                continue
+            updated += 1
+            for width, table in tables.items():
+                col = table.update(code, *(a[fresh] for a in new_points))
+                if col is not None:
+                    dirty[width] = col if dirty[width] is None else min(dirty[width], col)
+
+        print(f"[{datetime.now().strftime('%H:%M:%S')}] {len(points)} quotes, {updated} stocks updated.")
+
+def parse_resolutions(text):
+    return [int(w.strip().lower().rstrip('min')) for w in text.split(',') if w.strip()]
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Intraday block index analysis (one fetch pass for all bar widths)")
+    parser.add_argument("--resolutions", type=parse_resolutions, default=None,
+                        help="Comma separated bar widths in minutes, e.g. 5,30 (default: 1,5,15,30,60; 5 when polling)")
+    parser.add_argument("--poll", action="store_true",
+                        help="Keep running and refresh incrementally until the market closes")
+    parser.add_argument("--interval", type=float, default=POLL_INTERVAL,
+                        help=f"Polling interval in seconds (default: {POLL_INTERVAL})")
+    args = parser.parse_args()
+    metrics.start_run("intraday")
+    if args.poll:
+        poll(args.resolutions, args.interval)
+    else:
+        main(args.resolutions)
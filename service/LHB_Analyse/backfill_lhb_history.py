@@ -11,21 +11,20 @@
 
 注意：
   - 已存在于历史文件中的日期自动跳过，安全重复执行
-  - 周六/周日自动跳过
-  - 遇到节假日（接口返回空）自动跳过，不中断
-  - 请求间隔 1 秒，避免被限速
+  - 按交易日历只请求交易日（周末、节假日不请求）
+  - 接口返回空的日期自动跳过，不中断
+  - 请求频率由 src/data_fetch/rate_limit 按数据源统一限流，失败的请求自动退避重试
 """
 
 import os
 import sys
-import time
 import pandas as pd
-from datetime import datetime, timedelta
 
 # ── 路径设置 ──────────────────────────────────────────────────────────────
 THIS_DIR = os.path.dirname(os.path.abspath(__file__))
 sys.path.append(os.path.abspath(os.path.join(THIS_DIR, '../../')))
 
+from src.data_fetch.trading_calendar import get_trading_calendar
 from lhb_detailed_analyzer import analyze_daily_lhb
 from seat_winrate_analyzer import analyze_win_rates, generate_winrate_html
 
@@ -38,17 +37,9 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 
 def get_trading_days(start_date: str, end_date: str) -> list[str]:
     """
-    返回 [start_date, end_date] 之间所有非周末日期（YYYYMMDD 格式）。
-    节假日无法在本地判断，会在请求时因接口返回空而自动跳过。
+    返回 [start_date, end_date] 之间的所有交易日（YYYYMMDD 格式）。
     """
-    days = []
-    cur = datetime.strptime(start_date, "%Y%m%d")
-    end = datetime.strptime(end_date, "%Y%m%d")
-    while cur <= end:
-        if cur.weekday() < 5:   # 0=Mon … 4=Fri
-            days.append(cur.strftime("%Y%m%d"))
-        cur += timedelta(days=1)
-    return days
+    return get_trading_calendar().trading_days(start_date, end_date)
 
 
 def already_done_dates() -> set:
@@ -62,7 +53,7 @@ def already_done_dates() -> set:
         return set()
 
 
-def run_backfill(trading_days: list[str], request_interval: float = 1.0):
+def run_backfill(trading_days: list[str]):
     done = already_done_dates()
     to_run = [d for d in trading_days if d not in done]
 
@@ -91,15 +82,14 @@ def run_backfill(trading_days: list[str], request_interval: float = 1.0):
             failed += 1
             print(f"  ✗ {date_str} 失败: {e}")
 
-        if i < len(to_run):
-            time.sleep(request_interval)
-
     print(f"\n{'='*50}")
     print(f"回填完成：成功 {success} 天 | 跳过(无数据) {skipped} 天 | 失败 {failed} 天")
 
 
 def main():
-    today = datetime.now()
+    calendar = get_trading_calendar()
+    # 截止到上一个交易日
+    end_str = calendar.previous_trading_day()
 
     if len(sys.argv) == 3:
         # 指定起止日期
@@ -109,19 +99,15 @@ def main():
     elif len(sys.argv) == 2:
         # 指定天数
         n_days = int(sys.argv[1])
-        start_dt = today - timedelta(days=n_days * 2)  # 粗估，含周末
-        start_str = start_dt.strftime("%Y%m%d")
-        end_str = (today - timedelta(days=1)).strftime("%Y%m%d")
+        start_str = calendar.trading_days_ago(n_days - 1, end_str)
         print(f"回填模式：过去 {n_days} 个交易日（{start_str} → {end_str}）")
     else:
         # 默认：过去 30 个交易日
-        start_dt = today - timedelta(days=60)   # 60 日历天 ≈ 30 交易日
-        start_str = start_dt.strftime("%Y%m%d")
-        end_str = (today - timedelta(days=1)).strftime("%Y%m%d")
-        print(f"回填模式：默认过去 ~30 交易日（{start_str} → {end_str}）")
+        start_str = calendar.trading_days_ago(29, end_str)
+        print(f"回填模式：默认过去 30 个交易日（{start_str} → {end_str}）")
 
     trading_days = get_trading_days(start_str, end_str)
-    print(f"候选交易日（非周末）：{len(trading_days)} 天\n")
+    print(f"候选交易日：{len(trading_days)} 天\n")
 
     run_backfill(trading_days)
 
@@ -3,13 +3,15 @@ import os
 import pandas as pd
 import akshare as ak
 from datetime import datetime, timedelta
-import concurrent.futures
 import time
 
 # Add project root to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
+from src.data_fetch.rate_limit import limited_call, run_batch
+from src.data_fetch.trading_calendar import get_trading_calendar
 from src.utils.lhb_config_loader import load_lhb_config
+from src.utils import metrics
 try:
     from generate_lhb_report import generate_html
 except ImportError:
@@ -24,24 +26,19 @@ def fetch_lhb_stock_list(date_str):
     """Fetch the list of stocks on LHB for a given date."""
     print(f"Fetching LHB summary for {date_str}...")
     try:
-        df = ak.stock_lhb_detail_em(start_date=date_str, end_date=date_str)
+        df = limited_call('eastmoney', ak.stock_lhb_detail_em, start_date=date_str, end_date=date_str)
         return df
     except Exception as e:
         print(f"Error fetching LHB summary: {e}")
         return pd.DataFrame()
 
 def fetch_stock_details(symbol, date_str):
-    """Fetch detailed buyer/seller for a stock."""
-    # print(f"Fetching details for {symbol}...")
-    try:
-        # Fetch Top 5 Buyers
-        df_buy = ak.stock_lhb_stock_detail_em(symbol=symbol, date=date_str, flag="买入")
-        # Fetch Top 5 Sellers
-        df_sell = ak.stock_lhb_stock_detail_em(symbol=symbol, date=date_str, flag="卖出")
-        return df_buy, df_sell
-    except Exception as e:
-        # print(f"Error fetching details for {symbol}: {e}")
-        return None, None
+    """Fetch detailed buyer/seller for a stock. Raises on failure so that run_batch retries it."""
+    # Fetch Top 5 Buyers
+    df_buy = limited_call('eastmoney', ak.stock_lhb_stock_detail_em, symbol=symbol, date=date_str, flag="买入")
+    # Fetch Top 5 Sellers
+    df_sell = limited_call('eastmoney', ak.stock_lhb_stock_detail_em, symbol=symbol, date=date_str, flag="卖出")
+    return df_buy, df_sell
 
 def fetch_total_market_turnover(date_str):
     """
@@ -61,7 +58,7 @@ def fetch_total_market_turnover(date_str):
                 start_dt = datetime.strptime(date_str, "%Y%m%d") - timedelta(days=10)
                 start_s = start_dt.strftime("%Y%m%d")
                 
-                df = ak.stock_zh_index_daily_em(symbol=code, start_date=start_s, end_date=date_str)
+                df = limited_call('eastmoney', ak.stock_zh_index_daily_em, symbol=code, start_date=start_s, end_date=date_str)
                 if not df.empty:
                     # Try to match the exact date
                     # Ensure date column is string
@@ -85,6 +82,34 @@ def fetch_total_market_turnover(date_str):
         
     return 0.0
 
+def classify_branch(branch, branch_map, fuzzy_rules):
+    """
+    Classify one LHB branch name.
+    Priority: exact match > fuzzy rules from the XML ('contains', all
+    space-separated keywords must appear) > implicit substring match against
+    the exact-match keys.
+    Returns (category, alias, rule_type); unmatched branches are "其他游资".
+    """
+    # 1. Exact Match
+    if branch in branch_map:
+        return branch_map[branch]['category'], branch_map[branch].get('alias'), "Exact"
+
+    # 2. Fuzzy Match (XML Configured - Explicit 'contains')
+    for rule in fuzzy_rules:
+        if rule['match'] == 'contains':
+            # Support multi-keyword matching (space separated)
+            # e.g. Pattern "中信证券 上海分公司" -> matches "中信证券股份有限公司上海分公司"
+            keywords = rule['pattern'].split()
+            if all(k in branch for k in keywords):
+                return rule['category'], rule.get('alias'), "Fuzzy(XML)"
+
+    # 3. Implicit Substring Match (Try to match keys from exact_map as substrings)
+    for k, v in branch_map.items():
+        if k in branch:
+            return v['category'], v.get('alias'), "ImplicitSubstring"
+
+    return "其他游资", None, "Unmatched"
+
 def analyze_daily_lhb(date_str, config_path):
     """
     Main analysis function.
@@ -102,7 +127,8 @@ def analyze_daily_lhb(date_str, config_path):
         fuzzy_rules = []
     
     # 2. Get Stock List
-    df_summary = fetch_lhb_stock_list(date_str)
+    with metrics.timer("stage.lhb_summary"):
+        df_summary = fetch_lhb_stock_list(date_str)
     if df_summary is None or df_summary.empty:
         print("No LHB data found for this date.")
         return
@@ -131,26 +157,22 @@ def analyze_daily_lhb(date_str, config_path):
     lhb_details = []
     
     print("Fetching detailed seat data...")
-    with concurrent.futures.ThreadPoolExecutor(max_workers=10) as executor:
-        future_to_stock = {executor.submit(fetch_stock_details, s, date_str): s for s in stocks}
-        
-        for future in concurrent.futures.as_completed(future_to_stock):
-            stock = future_to_stock[future]
-            try:
-                df_buy, df_sell = future.result()
-                
-                if df_buy is not None and not df_buy.empty:
-                    df_buy['side'] = 'buy'
-                    df_buy['stock_code'] = stock
-                    lhb_details.append(df_buy)
-                    
-                if df_sell is not None and not df_sell.empty:
-                    df_sell['side'] = 'sell'
-                    df_sell['stock_code'] = stock
-                    lhb_details.append(df_sell)
-                    
-            except Exception as e:
-                print(f"Failed to process {stock}: {e}")
+    with metrics.timer("stage.seat_details"):
+        results, failed = run_batch(lambda s: fetch_stock_details(s, date_str), stocks, 'eastmoney')
+    for stock in failed:
+        metrics.incr("errors.seat_details")
+        print(f"Failed to process {stock}")
+    
+    for stock, (df_buy, df_sell) in results.items():
+        if df_buy is not None and not df_buy.empty:
+            df_buy['side'] = 'buy'
+            df_buy['stock_code'] = stock
+            lhb_details.append(df_buy)
+            
+        if df_sell is not None and not df_sell.empty:
+            df_sell['side'] = 'sell'
+            df_sell['stock_code'] = stock
+            lhb_details.append(df_sell)
                 
     if not lhb_details:
         print("No detailed data retrieved.")
@@ -296,47 +318,7 @@ def analyze_daily_lhb(date_str, config_path):
         net = buy_amt - sell_amt
         total_net_buy_analyzed += net
         
-        # Classification Logic
-        category = "其他游资" # Default
-        alias = None
-        rule_type = "Unmatched"
-        
-        # 1. Exact Match
-        if branch in branch_map:
-            category = branch_map[branch]['category']
-            alias = branch_map[branch].get('alias')
-            rule_type = "Exact"
-        else:
-            # Smart Matching: Check if Config string is contained in Actual Branch string
-            # Priority: Fuzzy Rules (Explicit) > Substring Match > Exact
-            
-            # 2. Fuzzy Match (XML Configured - Explicit 'contains')
-            found = False
-            for rule in fuzzy_rules:
-                if rule['match'] == 'contains':
-                    # Support multi-keyword matching (space separated)
-                    # e.g. Pattern "中信证券 上海分公司" -> matches "中信证券股份有限公司上海分公司"
-                    keywords = rule['pattern'].split()
-                    if all(k in branch for k in keywords):
-                        category = rule['category']
-                        alias = rule.get('alias')
-                        found = True
-                        rule_type = "Fuzzy(XML)"
-                        break
-            
-            if not found:
-                 # 3. Implicit Substring Match (Try to match keys from exact_map as substrings)
-                 for k, v in branch_map.items():
-                     if k in branch:
-                         category = v['category']
-                         alias = v.get('alias')
-                         found = True
-                         rule_type = "ImplicitSubstring"
-                         # print(f"Implicit Match: {k} in {branch}")
-                         break
-            
-            if not found:
-                pass
+        category, alias, rule_type = classify_branch(branch, branch_map, fuzzy_rules)
         
         # Add to enriched list
         all_enriched_rows.append({
@@ -478,7 +460,8 @@ def analyze_daily_lhb(date_str, config_path):
     stats['其他游资'] = total_net_buy_analyzed - known_net_buy
 
     # Fetch Total Market Turnover
-    market_turnover = fetch_total_market_turnover(date_str)
+    with metrics.timer("stage.market_turnover"):
+        market_turnover = fetch_total_market_turnover(date_str)
 
     # Format for output
     final_row = {
@@ -538,14 +521,17 @@ def analyze_daily_lhb(date_str, config_path):
     print("Analysis saved to", history_file)
     print(df_new.T)
 
-if __name__ == "__main__":
+def main(target_date=None, fetcher=None):
+    """
+    Daily entry point: backfill when the history is missing, analyse
+    target_date (default today), then regenerate the HTML and win-rate reports.
+    fetcher: StockDataFetcher for the win-rate price windows, so an in-process orchestrator can share one instance.
+    """
     # Check for history file
     history_file = os.path.join(OUTPUT_DIR, 'lhb_analysis_history.csv')
     
     # default target is today
-    if len(sys.argv) > 1:
-        target_date = sys.argv[1]
-    else:
+    if target_date is None:
         target_date = datetime.now().strftime("%Y%m%d")
 
     config_path = os.path.join(os.path.dirname(__file__), '../../data/lhb_config.xml')
@@ -553,36 +539,34 @@ if __name__ == "__main__":
     # If history is missing, we perform a backfill for the last N days (e.g., 5 days) to provide some trend context
     # This allows stateless runs (GitHub Actions) without needing to commit history back to repo.
     if not os.path.exists(history_file):
-        print("History file not found. Starting backfill for trend context (last 5 days)...")
-        # Generate dates
+        print("History file not found. Starting backfill for trend context (last 5 trading days)...")
+        # The 5 trading days before the target date, oldest first
         backfill_days = 5
-        curr = datetime.strptime(target_date, "%Y%m%d")
-        
-        # Simple loop backwards
-        dates_to_run = []
-        for i in range(backfill_days, 0, -1):
-            d = curr - timedelta(days=i)
-            dates_to_run.append(d.strftime("%Y%m%d"))
+        calendar = get_trading_calendar()
+        dates_to_run = calendar.recent_trading_days(backfill_days, calendar.previous_trading_day(target_date))[::-1]
         
         # Run backfill
         for d in dates_to_run:
             print(f"--- Backfill Analysis for {d} ---")
             try:
                 # We catch errors here so one missing day doesn't stop the flow
-                analyze_daily_lhb(d, config_path)
+                with metrics.timer("stage.backfill"):
+                    analyze_daily_lhb(d, config_path)
             except Exception as e:
                 print(f"Skipping backfill for {d}: {e}")
 
     # Always run for the target date (Detailed analysis)
     print(f"--- Running Main Analysis for {target_date} ---")
-    analyze_daily_lhb(target_date, config_path)
+    with metrics.timer("stage.analysis"):
+        analyze_daily_lhb(target_date, config_path)
     
     # Generate HTML Report
     if os.path.exists(history_file):
         print("Generating HTML report...")
         try:
-            df_hist = pd.read_csv(history_file)
-            generate_html(df_hist)
+            with metrics.timer("stage.report"):
+                df_hist = pd.read_csv(history_file)
+                generate_html(df_hist)
         except Exception as e:
             print(f"Error generating HTML report: {e}")
 
@@ -590,9 +574,14 @@ if __name__ == "__main__":
     print("\nRunning seat win rate analysis...")
     try:
         from seat_winrate_analyzer import analyze_win_rates, generate_winrate_html
-        result = analyze_win_rates()
-        if result:
-            df_stats, df_detail = result
-            generate_winrate_html(df_stats, df_detail)
+        with metrics.timer("stage.seat_winrate"):
+            result = analyze_win_rates(fetcher=fetcher)
+            if result:
+                df_stats, df_detail = result
+                generate_winrate_html(df_stats, df_detail)
     except Exception as e:
         print(f"Win rate analysis failed (non-critical): {e}")
+
+if __name__ == "__main__":
+    metrics.start_run("lhb")
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -22,6 +22,7 @@ from datetime import datetime, timedelta
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../')))
 
 from src.data_fetch.stock_data import StockDataFetcher
+from src.data_fetch.symbol_master import strip_market_prefix
 
 OUTPUT_DIR = os.path.join(os.path.dirname(__file__), 'output')
 HISTORY_FILE = os.path.join(OUTPUT_DIR, 'lhb_alias_stock_history.csv')
@@ -37,23 +38,30 @@ os.makedirs(OUTPUT_DIR, exist_ok=True)
 # Price fetching helpers
 # ---------------------------------------------------------------------------
 
-def _fetch_price_window(fetcher: StockDataFetcher, code: str, date_str: str) -> pd.DataFrame | None:
+def _fetch_price_windows(fetcher: StockDataFetcher, code: str, dates: list[str]) -> dict:
     """
-    Fetch closing prices starting from date_str for ~14 calendar days
+    Fetch closing prices starting from each date for ~14 calendar days
     (enough to cover T+5 trading days including weekends / holidays).
-    Returns a DataFrame sorted by 日期, or None on failure.
+    Overlapping windows of the same code are fetched as one wider request.
+    Returns {date_str: DataFrame sorted by 日期, or None on failure}.
     """
+    windows = [
+        (d, (datetime.strptime(d, "%Y%m%d") + timedelta(days=14)).strftime("%Y%m%d"))
+        for d in dates
+    ]
     try:
-        dt = datetime.strptime(date_str, "%Y%m%d")
-        end_str = (dt + timedelta(days=14)).strftime("%Y%m%d")
-        df = fetcher.get_stock_hist(code, start_date=date_str, end_date=end_str)
+        frames = fetcher.get_stock_hist_windows(code, windows)
+    except Exception:
+        return {d: None for d in dates}
+    result = {}
+    for d, df in zip(dates, frames):
         if df is None or df.empty:
-            return None
+            result[d] = None
+            continue
         df['日期'] = pd.to_datetime(df['日期'])
         df['收盘'] = pd.to_numeric(df['收盘'], errors='coerce')
-        return df.sort_values('日期').reset_index(drop=True)
-    except Exception:
-        return None
+        result[d] = df.sort_values('日期').reset_index(drop=True)
+    return result
 
 
 def _calc_returns(df: pd.DataFrame) -> dict:
@@ -75,18 +83,19 @@ def _calc_returns(df: pd.DataFrame) -> dict:
 
 
 def _fetch_task(args):
-    """Worker for thread pool: returns (cache_key, df_or_None)."""
-    fetcher, code, date_str, cache_key = args
-    return cache_key, _fetch_price_window(fetcher, code, date_str)
+    """Worker for thread pool: returns {cache_key: df_or_None} for one code."""
+    fetcher, code, dates = args
+    return {f"{code}_{d}": df for d, df in _fetch_price_windows(fetcher, code, dates).items()}
 
 
 # ---------------------------------------------------------------------------
 # Core analysis
 # ---------------------------------------------------------------------------
 
-def analyze_win_rates(max_workers: int = 8):
+def analyze_win_rates(max_workers: int = 8, fetcher: StockDataFetcher | None = None):
     """
     Main function. Returns (df_stats, df_detail) or None on failure.
+    fetcher: StockDataFetcher to use (shared with other in-process services); a new one when omitted.
     """
     if not os.path.exists(HISTORY_FILE):
         print(f"[WinRate] History file not found: {HISTORY_FILE}")
@@ -104,36 +113,33 @@ def analyze_win_rates(max_workers: int = 8):
     df_buy['stock_code'] = df_buy['stock_code'].astype(str)
 
     # Strip market prefix for price fetching
-    def strip_prefix(code):
-        return code[2:] if code.startswith(('sh', 'sz', 'bj')) else code
-
-    df_buy['clean_code'] = df_buy['stock_code'].apply(strip_prefix)
+    df_buy['clean_code'] = df_buy['stock_code'].apply(strip_market_prefix)
     df_buy['cache_key'] = df_buy['clean_code'] + '_' + df_buy['date']
 
     unique_keys = df_buy[['cache_key', 'clean_code', 'date']].drop_duplicates()
     print(f"[WinRate] {len(df_buy)} buy records | {df_buy['alias'].nunique()} seats | "
           f"{len(unique_keys)} unique (stock, date) pairs to fetch")
 
-    fetcher = StockDataFetcher()
+    if fetcher is None:
+        fetcher = StockDataFetcher()
 
-    # Parallel price fetch
+    # Parallel price fetch, one task per code so its windows can be merged
     print(f"[WinRate] Fetching price windows ({max_workers} threads)...")
     price_cache = {}
     tasks = [
-        (fetcher, row['clean_code'], row['date'], row['cache_key'])
-        for _, row in unique_keys.iterrows()
+        (fetcher, code, sorted(grp['date']))
+        for code, grp in unique_keys.groupby('clean_code')
     ]
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
-        futures = {executor.submit(_fetch_task, t): t[3] for t in tasks}
+        futures = {executor.submit(_fetch_task, t): t[1] for t in tasks}
         done = 0
         for future in concurrent.futures.as_completed(futures):
             done += 1
             if done % 10 == 0 or done == len(futures):
-                print(f"  fetched {done}/{len(futures)}", end="\r")
+                print(f"  fetched {done}/{len(futures)} codes", end="\r")
             try:
-                key, df_prices = future.result(timeout=20)
-                price_cache[key] = df_prices
+                price_cache.update(future.result())
             except Exception:
                 pass
 
@@ -0,0 +1,138 @@
+"""
+In-process DAG orchestrator for the AIQuant services.
+
+Services are Tasks with declared inputs and outputs. A task becomes ready
+when every task producing one of its inputs has finished; ready tasks run
+concurrently on one shared thread pool. All tasks receive the same
+TaskContext, which carries the shared fetch objects (StockDataFetcher,
+AsyncFetchEngine, symbol master) and the outputs published by upstream
+tasks. The shared StockDataFetcher and its bar store are the fetch cache:
+history fetched by one task is read from the store by the others.
+
+A failed producer does not block its dependents (same as the old
+subprocess runner): they still run, with the missing inputs set to None.
+"""
+
+import concurrent.futures
+import threading
+import time
+import traceback
+
+
+class TaskContext:
+    """
+    Shared state handed to every task.
+    shared: named objects created once per cycle (fetcher, engine, ...).
+    outputs: values published by finished tasks, keyed by output name.
+    """
+
+    def __init__(self, **shared):
+        self.shared = shared
+        self.outputs = {}
+        self._lock = threading.Lock()
+
+    def __getattr__(self, name):
+        try:
+            return self.__dict__['shared'][name]
+        except KeyError:
+            raise AttributeError(name)
+
+    def input(self, name):
+        with self._lock:
+            return self.outputs.get(name)
+
+    def publish(self, values):
+        with self._lock:
+            self.outputs.update(values)
+
+
+class Task:
+    """
+    One unit of work.
+    func(context) returns a dict holding (at least) the declared outputs, or None.
+    """
+
+    def __init__(self, name, func, inputs=(), outputs=()):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+
+
+class TaskResult:
+    def __init__(self, name, success, wall_s, error=None):
+        self.name = name
+        self.success = success
+        self.wall_s = wall_s
+        self.error = error
+
+
+class Orchestrator:
+    def __init__(self, tasks, max_workers=4):
+        self.tasks = {task.name: task for task in tasks}
+        if len(self.tasks) != len(tasks):
+            raise ValueError("Duplicate task names")
+        self.max_workers = max_workers
+        self.producers = {}
+        for task in tasks:
+            for output in task.outputs:
+                if output in self.producers:
+                    raise ValueError(f"Output '{output}' produced by both {self.producers[output]} and {task.name}")
+                self.producers[output] = task.name
+        self.dependencies = {}
+        for task in tasks:
+            missing = [name for name in task.inputs if name not in self.producers]
+            if missing:
+                raise ValueError(f"Task {task.name} needs inputs nobody produces: {missing}")
+            self.dependencies[task.name] = {self.producers[name] for name in task.inputs}
+        self._check_acyclic()
+
+    def _check_acyclic(self):
+        remaining = {name: set(deps) for name, deps in self.dependencies.items()}
+        while remaining:
+            ready = [name for name, deps in remaining.items() if not deps]
+            if not ready:
+                raise ValueError(f"Dependency cycle between tasks: {sorted(remaining)}")
+            for name in ready:
+                del remaining[name]
+            for deps in remaining.values():
+                deps.difference_update(ready)
+
+    def _run_task(self, task, context):
+        start = time.time()
+        print(f"\n[START] {task.name}")
+        try:
+            values = task.func(context) or {}
+            context.publish({name: values.get(name) for name in task.outputs})
+            duration = time.time() - start
+            print(f"\n[SUCCESS] {task.name} completed in {duration:.2f} seconds.")
+            return TaskResult(task.name, True, duration)
+        except Exception as e:
+            traceback.print_exc()
+            duration = time.time() - start
+            print(f"\n[ERROR] {task.name} failed after {duration:.2f} seconds: {e}")
+            return TaskResult(task.name, False, duration, repr(e))
+
+    def run(self, context):
+        """
+        Run every task once, each as soon as its producers have finished.
+        Returns {task name: TaskResult}.
+        """
+        results = {}
+        pending = dict(self.dependencies)
+        running = {}
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                for name in [n for n, deps in pending.items() if deps <= results.keys()]:
+                    failed = [dep for dep in pending[name] if not results[dep].success]
+                    if failed:
+                        print(f"\n[WARN] {name}: upstream failed ({', '.join(sorted(failed))}), running with incomplete inputs.")
+                    del pending[name]
+                    running[executor.submit(self._run_task, self.tasks[name], context)] = name
+
+                done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    name = running.pop(future)
+                    results[name] = future.result()
+        return results
@@ -0,0 +1,158 @@
+"""
+Content-addressed cache for service outputs.
+
+Each stage (service) gets a key fingerprinting everything its outputs depend on:
+the trading date, the hashes of its config files and the output digests of the
+stages it depends on. After a successful run, the files the stage wrote under
+its output paths are stored as content-addressed blobs and an entry maps the
+key to {relative path: blob hash}. A rerun with the same key restores those
+files instead of running the stage.
+
+Layout (under output/result_cache/):
+    objects/<sha256[:2]>/<sha256>      file contents, shared between entries
+    entries/<stage>/<key>.json         {"files": {path: sha256}, "digest": ..., "created_at": ...}
+
+Stages are not cached while the market is open (their inputs are still moving).
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import threading
+from datetime import datetime
+
+from src.data_fetch.trading_calendar import get_trading_calendar
+
+# Bump to invalidate every entry when the cache layout or the services' output format changes
+CACHE_VERSION = 1
+
+# Outputs produced before this time on a trading day are intraday snapshots and are not cached
+MARKET_CLOSE_HHMM = 1500
+
+
+def file_hash(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def market_closed(now=None):
+    now = now or datetime.now()
+    return not get_trading_calendar().is_trading_day(now) or int(now.strftime("%H%M")) >= MARKET_CLOSE_HHMM
+
+
+class ResultCache:
+    def __init__(self, root, project_root, force=False, invalidate=()):
+        """
+        root: cache directory.
+        project_root: output paths are stored relative to it.
+        force: ignore every existing entry (results are still stored).
+        invalidate: stage names whose existing entries are ignored.
+        """
+        self.root = root
+        self.project_root = project_root
+        self.force = force
+        self.invalidate = set(invalidate)
+        self._digests = {}
+        self._lock = threading.Lock()
+
+    # ---- keys ----
+
+    def key(self, stage, trading_date, config_files=(), upstream=()):
+        """
+        Fingerprint of a stage's inputs, or None when the stage must not be cached
+        (market still open, or an upstream stage failed).
+        upstream: stages whose outputs this stage reads; their digests are part of the key.
+        """
+        upstream_digests = {name: self.digest(name) for name in upstream}
+        if not market_closed() or None in upstream_digests.values():
+            return None
+        parts = {
+            "version": CACHE_VERSION,
+            "stage": stage,
+            "trading_date": trading_date,
+            "config": {os.path.basename(p): file_hash(p) if os.path.exists(p) else None for p in config_files},
+            "upstream": upstream_digests,
+        }
+        return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()[:32]
+
+    def digest(self, stage):
+        """Output digest of a finished stage (None if it failed or has not run)."""
+        with self._lock:
+            return self._digests.get(stage)
+
+    def _set_digest(self, stage, digest):
+        with self._lock:
+            self._digests[stage] = digest
+
+    # ---- storage ----
+
+    def _entry_path(self, stage, key):
+        return os.path.join(self.root, "entries", stage, f"{key}.json")
+
+    def _object_path(self, sha):
+        return os.path.join(self.root, "objects", sha[:2], sha)
+
+    def _load_entry(self, stage, key):
+        path = self._entry_path(stage, key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            entry = json.load(f)
+        if not all(os.path.exists(self._object_path(sha)) for sha in entry["files"].values()):
+            return None
+        return entry
+
+    def restore(self, stage, key):
+        """Copy the cached outputs back into place. Returns False on a miss."""
+        if key is None or self.force or stage in self.invalidate:
+            return False
+        entry = self._load_entry(stage, key)
+        if entry is None:
+            return False
+        for rel_path, sha in entry["files"].items():
+            dest = os.path.join(self.project_root, rel_path)
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            shutil.copyfile(self._object_path(sha), dest)
+        self._set_digest(stage, entry["digest"])
+        return True
+
+    def store(self, stage, key, output_paths, since):
+        """
+        Store every file under output_paths modified at or after `since` (epoch seconds)
+        and record the stage's output digest. With key None only the digest is recorded.
+        """
+        files = {}
+        for base in output_paths:
+            for dirpath, _, filenames in os.walk(base):
+                for name in filenames:
+                    path = os.path.join(dirpath, name)
+                    if os.path.getmtime(path) >= since:
+                        files[os.path.relpath(path, self.project_root).replace(os.sep, "/")] = path
+
+        manifest = {}
+        for rel_path, path in sorted(files.items()):
+            sha = file_hash(path)
+            manifest[rel_path] = sha
+            if key is not None:
+                obj = self._object_path(sha)
+                if not os.path.exists(obj):
+                    os.makedirs(os.path.dirname(obj), exist_ok=True)
+                    tmp = f"{obj}.{os.getpid()}.{threading.get_ident()}.tmp"
+                    shutil.copyfile(path, tmp)
+                    os.replace(tmp, obj)
+
+        digest = hashlib.sha256(json.dumps(manifest, sort_keys=True).encode("utf-8")).hexdigest()
+        self._set_digest(stage, digest)
+        if key is None:
+            return
+        entry_path = self._entry_path(stage, key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp = f"{entry_path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"files": manifest, "digest": digest, "created_at": datetime.now().isoformat(timespec="seconds")},
+                      f, ensure_ascii=False, indent=2)
+        os.replace(tmp, entry_path)
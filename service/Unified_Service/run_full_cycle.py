@@ -1,44 +1,123 @@
+import argparse
+import json
 import os
 import sys
 import subprocess
 import time
 import concurrent.futures
+import importlib
+from datetime import datetime
 from package_utils import package_all_reports
+from orchestrator import Orchestrator, Task, TaskContext
 
 # Configuration
 # service/Unified_Service/run_full_cycle.py -> service/Unified_Service -> service -> AIQuant
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if PROJECT_ROOT not in sys.path:
+    sys.path.insert(0, PROJECT_ROOT)
+
+from src.data_fetch import replay
+from src.data_fetch.async_engine import AsyncFetchEngine
+from src.data_fetch.stock_data import StockDataFetcher
+from src.data_fetch.trading_calendar import get_trading_calendar
+from src.utils import metrics
+from result_cache import ResultCache
 
 # Defined Services
+# Result cache (in-process mode): "config_files" and "upstream" feed the stage key,
+# files written under "output_paths" are what gets cached, and a run is only stored
+# if it (re)wrote "sentinel".
 SERVICES = {
     "Block": {
         "name": "Block Analysis",
         "script": "service/Block_Analyse/block_analysis_service.py",
-        "cwd": "service/Block_Analyse"
+        "module": "service.Block_Analyse.block_analysis_service",
+        "cwd": "service/Block_Analyse",
+        "config_files": ["data/stock_list.xml"],
+        "output_paths": ["service/Block_Analyse/output", "output/block_statistics", "output/global_analysis_details"],
+        "sentinel": "service/Block_Analyse/output/block_statistics.csv"
     },
     "LHB": {
         "name": "LHB Analysis",
         "script": "service/LHB_Analyse/lhb_detailed_analyzer.py",
-        "cwd": "service/LHB_Analyse"
+        "module": "service.LHB_Analyse.lhb_detailed_analyzer",
+        "cwd": "service/LHB_Analyse",
+        "config_files": ["data/lhb_config.xml"],
+        "output_paths": ["service/LHB_Analyse/output", "share_reports"],
+        "sentinel": "service/LHB_Analyse/output/lhb_latest_summary.csv"
     },
     "Daily": {
         "name": "Daily Monitor",
         "script": "service/Daily_Monitor/run_monitor.py",
-        "cwd": "service/Daily_Monitor"
-    },
-    "30min": {
-        "name": "30min Analysis",
-        "script": "service/30min_Analyse/analyze_30min.py",
-        "cwd": "service/30min_Analyse"
+        "module": "service.Daily_Monitor.run_monitor",
+        "cwd": "service/Daily_Monitor",
+        "config_files": ["data/stock_list.xml"],
+        "upstream": ["Block", "LHB"],
+        "output_paths": ["service/Daily_Monitor/output"],
+        "sentinel": "service/Daily_Monitor/output/daily_report.html"
     },
-    "5min": {
-        "name": "5min Analysis",
-        "script": "service/5min_Analyse/analyze_5min.py",
-        "cwd": "service/5min_Analyse"
+    "Intraday": {
+        "name": "Intraday Analysis (1/5/15/30/60min)",
+        "script": "service/Intraday_Analyse/analyze_intraday.py",
+        "module": "service.Intraday_Analyse.analyze_intraday",
+        "cwd": "service/Intraday_Analyse",
+        "config_files": ["data/stock_list.xml"],
+        "output_paths": ["service/Intraday_Analyse/output", "service/5min_Analyse/output", "service/30min_Analyse/output"],
+        "sentinel": "service/5min_Analyse/output/5min_data.json"
     }
 }
 
-def run_service(service_info):
+def replay_env(args):
+    """
+    Environment for running the services against a record/replay archive
+    (see src/data_fetch/replay.py). Empty when neither --record nor --replay is given.
+    """
+    if args.record:
+        mode, archive = "record", args.record
+    elif args.replay:
+        mode, archive = "replay", args.replay
+    else:
+        return {}
+    return {
+        "AIQUANT_REPLAY_MODE": mode,
+        "AIQUANT_REPLAY_ARCHIVE": os.path.abspath(archive),
+        "AIQUANT_REPLAY_LATENCY": str(args.latency / 1000),
+        "AIQUANT_REPLAY_JITTER": str(args.jitter / 1000),
+        "AIQUANT_REPLAY_ERROR_RATE": str(args.error_rate),
+        "AIQUANT_REPLAY_SEED": str(args.seed),
+    }
+
+# Wall time and outcome of each service in this cycle, written to cycle.json
+SERVICE_RESULTS = {}
+
+def project_path(rel_path):
+    return os.path.join(PROJECT_ROOT, *rel_path.split("/"))
+
+def write_cycle_metrics(metrics_dir, total_seconds):
+    """
+    Write cycle.json next to the per-service metrics files and print where the
+    HTTP time went (per service and data source).
+    """
+    os.makedirs(metrics_dir, exist_ok=True)
+    cycle_path = os.path.join(metrics_dir, "cycle.json")
+    with open(cycle_path, "w", encoding="utf-8") as f:
+        json.dump({"total_s": round(total_seconds, 3), "services": SERVICE_RESULTS}, f, ensure_ascii=False, indent=2)
+
+    print(f"\nMetrics saved to: {metrics_dir}")
+    for name in sorted(os.listdir(metrics_dir)):
+        if name == "cycle.json" or not name.endswith(".json"):
+            continue
+        with open(os.path.join(metrics_dir, name), encoding="utf-8") as f:
+            data = json.load(f)
+        sources = sorted(data.get("http_latency", {}).items(), key=lambda kv: -kv[1]["total_s"])
+        breakdown = ", ".join(f"{src} {h['count']} calls / {h['total_s']:.1f}s" for src, h in sources) or "no HTTP calls"
+        print(f"  {data.get('service')}: wall {data.get('wall_s', 0):.1f}s; {breakdown}")
+
+    cache_status = [f"{name} {result['cache']}" for name, result in SERVICE_RESULTS.items() if "cache" in result]
+    if cache_status:
+        print(f"Result cache: {', '.join(cache_status)}")
+
+def run_service(service_info, extra_env=None):
     name = service_info["name"]
     script_rel_path = service_info["script"]
     cwd_rel_path = service_info["cwd"]
@@ -59,9 +138,16 @@ def run_service(service_info):
         existing_pythonpath = env.get("PYTHONPATH", "")
         env["PYTHONPATH"] = f"{PROJECT_ROOT}{os.pathsep}{existing_pythonpath}"
         
+        command = [sys.executable, script_path]
+        if extra_env:
+            # Run through the replay wrapper so requests/akshare/aiohttp traffic is recorded or replayed
+            env.update(extra_env)
+            env["AIQUANT_REPLAY_LABEL"] = os.path.basename(cwd_path)
+            command = [sys.executable, "-m", "src.data_fetch.replay_run", script_path]
+        
         # Capture output to avoid interleaved printing in parallel exec
         result = subprocess.run(
-            [sys.executable, script_path],
+            command,
             cwd=cwd_path,
             env=env, # Pass the modified environment
             capture_output=False, # Let it stream to console for now, though it might be messy
@@ -69,38 +155,40 @@ def run_service(service_info):
         )
         
         duration = time.time() - start_time
+        SERVICE_RESULTS[name] = {"success": True, "wall_s": round(duration, 3)}
         print(f"\n[SUCCESS] {name} completed in {duration:.2f} seconds.")
         return True, name
     
     except subprocess.CalledProcessError as e:
+        SERVICE_RESULTS[name] = {"success": False, "wall_s": round(time.time() - start_time, 3)}
         print(f"\n[ERROR] {name} failed with exit code {e.returncode}.")
         return False, name
     except Exception as e:
+        SERVICE_RESULTS[name] = {"success": False, "wall_s": round(time.time() - start_time, 3)}
         print(f"\n[ERROR] {name} failed with exception: {e}")
         return False, name
 
-def main():
-    print(f"Starting Full AIQuant Workflow at {time.ctime()}")
-    print(f"Project Root: {PROJECT_ROOT}")
-    print(f"Mode: Parallel Execution Optimized")
-    
+def run_subprocess_cycle(extra_env):
+    """
+    Legacy mode: every service runs as its own Python subprocess.
+    Returns the names of the services that failed.
+    """
     failed_services = []
-    start_total = time.time()
 
     # Strategy:
-    # 1. Start [Block, LHB, 30min, 5min] in parallel.
+    # 1. Start [Block, LHB, Intraday] in parallel.
+    #    Intraday fetches minute data once for every bar width (5min/30min reports included).
     # 2. Wait for LHB to finish.
     # 3. Start Daily Monitor (Depends on LHB).
     # 4. Wait for all.
 
     with concurrent.futures.ThreadPoolExecutor(max_workers=5) as executor:
         # Submit independent tasks
-        future_block = executor.submit(run_service, SERVICES["Block"])
-        future_lhb = executor.submit(run_service, SERVICES["LHB"])
-        future_30min = executor.submit(run_service, SERVICES["30min"])
-        future_5min = executor.submit(run_service, SERVICES["5min"])
+        future_block = executor.submit(run_service, SERVICES["Block"], extra_env)
+        future_lhb = executor.submit(run_service, SERVICES["LHB"], extra_env)
+        future_intraday = executor.submit(run_service, SERVICES["Intraday"], extra_env)
         
-        independent_futures = [future_block, future_lhb, future_30min, future_5min]
+        independent_futures = [future_block, future_lhb, future_intraday]
         
         # Wait specifically for BOTH LHB and Block to finish before starting Daily Monitor
         # Daily Monitor needs:
@@ -126,7 +214,7 @@ def main():
         else:
             print(f"\n[WARN] Dependencies missing (LHB: {success_lhb}, Block: {success_block}). Daily Monitor might have incomplete data.")
             
-        future_daily = executor.submit(run_service, SERVICES["Daily"])
+        future_daily = executor.submit(run_service, SERVICES["Daily"], extra_env)
         independent_futures.append(future_daily)
 
         # Wait for everything else
@@ -135,14 +223,185 @@ def main():
             if not success:
                 failed_services.append(name)
 
+    return failed_services
+
+def service_module(key):
+    """
+    Import a service module in this process (once; later calls get the cached module).
+    The service directory is put first on sys.path, as when the script is run directly,
+    so that its sibling imports (config, data_fetcher, report generators) resolve.
+    Importing inside the task means a service with a missing dependency only fails its own task.
+    """
+    service_dir = os.path.join(PROJECT_ROOT, SERVICES[key]["cwd"])
+    if service_dir not in sys.path:
+        sys.path.insert(0, service_dir)
+    return importlib.import_module(SERVICES[key]["module"])
+
+def run_in_process_cycle(args):
+    """
+    Default mode: all services run as tasks of one in-process DAG
+    (see orchestrator.py), sharing one StockDataFetcher, one AsyncFetchEngine,
+    the process-wide symbol master and a parsed stock_list.xml.
+    Returns the names of the services that failed.
+    """
+    # Charts are rendered from worker threads
+    os.environ.setdefault("MPLBACKEND", "Agg")
+    if args.record or args.replay:
+        replay.install(
+            "record" if args.record else "replay",
+            os.path.abspath(args.record or args.replay),
+            latency=args.latency / 1000,
+            jitter=args.jitter / 1000,
+            error_rate=args.error_rate,
+            seed=args.seed,
+            label="full_cycle",
+        )
+    metrics.start_run("full_cycle")
+
+    engine = AsyncFetchEngine()
+    fetcher = StockDataFetcher(engine=engine)
+    context = TaskContext(fetcher=fetcher, engine=engine, symbol_master=fetcher.symbol_master)
+
+    def stock_config(ctx):
+        config = service_module("Intraday").load_stock_config(os.path.join(PROJECT_ROOT, "data", "stock_list.xml"))
+        # Daily Monitor's load_stock_list layout
+        stock_list = [
+            {"code": s["code"], "name": s["name"], "block": block_name}
+            for block_name, stocks in config["blocks"].items() for s in stocks
+        ]
+        return {"stock_config": config, "stock_list": stock_list}
+
+    block_outputs = {"block_statistics": project_path(SERVICES["Block"]["sentinel"])}
+    lhb_outputs = {"lhb_summary": project_path(SERVICES["LHB"]["sentinel"])}
+
+    def block(ctx):
+        service_module("Block").main(config=ctx.input("stock_config"), fetcher=ctx.fetcher)
+        return block_outputs
+
+    def lhb(ctx):
+        service_module("LHB").main(fetcher=ctx.fetcher)
+        return lhb_outputs
+
+    def intraday(ctx):
+        service_module("Intraday").main(config=ctx.input("stock_config"), engine=ctx.engine)
+
+    def daily(ctx):
+        # Reads block_statistics.csv and lhb_latest_summary.csv written upstream
+        service_module("Daily").run_daily_monitor(stocks=ctx.input("stock_list"))
+
+    def timed(key, func):
+        def run(ctx):
+            with metrics.timer(f"task.{key}"):
+                return func(ctx)
+        return run
+
+    cache = ResultCache(
+        os.path.join(PROJECT_ROOT, "output", "result_cache"), PROJECT_ROOT,
+        force=args.force, invalidate=args.invalidate,
+    )
+    # Reruns over a weekend or holiday share the last trading day's entries
+    trading_date = get_trading_calendar().previous_trading_day(inclusive=True)
+    cache_status = {}
+
+    def cached(key, func, outputs=None):
+        """
+        Skip the stage when its outputs for the same inputs are already cached
+        (restoring them in place); otherwise run it and store what it wrote.
+        outputs: what the task publishes on a cache hit.
+        """
+        info = SERVICES[key]
+        if args.no_cache:
+            return func
+
+        def run(ctx):
+            cache_key = cache.key(key, trading_date, [project_path(p) for p in info["config_files"]], info.get("upstream", ()))
+            if cache.restore(key, cache_key):
+                cache_status[info["name"]] = "hit"
+                metrics.incr("cache.result.hit")
+                print(f"[CACHE] {info['name']}: outputs restored from cache ({cache_key[:12]})")
+                return outputs
+            start = time.time() - 1  # mtime resolution
+            values = func(ctx)
+            stored = cache_key is not None and os.path.exists(project_path(info["sentinel"])) \
+                and os.path.getmtime(project_path(info["sentinel"])) >= start
+            # Digest is recorded either way so that dependents can key on it
+            cache.store(key, cache_key if stored else None, [project_path(p) for p in info["output_paths"]], start)
+            # "not stored": the stage ran but did not rewrite its sentinel (e.g. LHB on a day without data)
+            status = "uncached" if cache_key is None else "miss" if stored else "not stored"
+            cache_status[info["name"]] = status
+            metrics.incr(f"cache.result.{status.replace(' ', '_')}")
+            return values
+        return run
+
+    tasks = [
+        Task("Stock Config", timed("StockConfig", stock_config), outputs=("stock_config", "stock_list")),
+        Task(SERVICES["Block"]["name"], timed("Block", cached("Block", block, block_outputs)), inputs=("stock_config",), outputs=("block_statistics",)),
+        Task(SERVICES["LHB"]["name"], timed("LHB", cached("LHB", lhb, lhb_outputs)), outputs=("lhb_summary",)),
+        Task(SERVICES["Intraday"]["name"], timed("Intraday", cached("Intraday", intraday)), inputs=("stock_config",)),
+        Task(SERVICES["Daily"]["name"], timed("Daily", cached("Daily", daily)), inputs=("stock_list", "block_statistics", "lhb_summary")),
+    ]
+    results = Orchestrator(tasks, max_workers=args.workers).run(context)
+
+    failed_services = []
+    for name, result in results.items():
+        SERVICE_RESULTS[name] = {"success": result.success, "wall_s": round(result.wall_s, 3)}
+        if name in cache_status:
+            SERVICE_RESULTS[name]["cache"] = cache_status[name]
+        if not result.success:
+            failed_services.append(name)
+    # Written again at exit; this copy is picked up by the cycle summary
+    metrics.METRICS.write()
+    return failed_services
+
+def main():
+    parser = argparse.ArgumentParser(description="Run all AIQuant services and package the reports")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="DIR", help="Record every HTTP response into an archive directory")
+    group.add_argument("--replay", metavar="DIR", help="Serve HTTP responses from an archive directory instead of the network")
+    parser.add_argument("--latency", type=float, default=0.0, help="Replay: fixed latency per request (ms)")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Replay: extra uniform random latency per request (ms)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Replay: probability that a request fails")
+    parser.add_argument("--seed", type=int, default=0, help="Replay: seed for latency jitter and error injection")
+    parser.add_argument("--no-package", action="store_true", help="Skip report packaging (e.g. for throughput runs)")
+    parser.add_argument("--subprocess", action="store_true", help="Run every service in its own subprocess (legacy mode)")
+    parser.add_argument("--workers", type=int, default=4, help="In-process mode: size of the shared task pool")
+    parser.add_argument("--force", action="store_true", help="Rerun every stage even if its outputs are cached")
+    parser.add_argument("--invalidate", metavar="STAGES", help="Comma-separated stages to rerun regardless of the cache (Block,LHB,Intraday,Daily)")
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the result cache")
+    args = parser.parse_args()
+    args.invalidate = [stage.strip() for stage in args.invalidate.split(",") if stage.strip()] if args.invalidate else []
+    unknown = [stage for stage in args.invalidate if stage not in SERVICES]
+    if unknown:
+        parser.error(f"--invalidate: unknown stage(s) {', '.join(unknown)} (expected {', '.join(SERVICES)})")
+    extra_env = replay_env(args)
+    # Every service writes its metrics JSON into one directory per cycle (see src/utils/metrics.py)
+    metrics_dir = os.path.join(PROJECT_ROOT, "output", "metrics", datetime.now().strftime("%Y%m%d_%H%M%S"))
+    os.environ["AIQUANT_METRICS_DIR"] = metrics_dir
+
+    print(f"Starting Full AIQuant Workflow at {time.ctime()}")
+    print(f"Project Root: {PROJECT_ROOT}")
+    print(f"Mode: {'Subprocess per service' if args.subprocess else 'In-process task graph'}")
+    if extra_env:
+        print(f"HTTP {extra_env['AIQUANT_REPLAY_MODE']}: {extra_env['AIQUANT_REPLAY_ARCHIVE']}")
+    
+    start_total = time.time()
+    if args.subprocess:
+        failed_services = run_subprocess_cycle(extra_env)
+    else:
+        failed_services = run_in_process_cycle(args)
+
     print(f"\n{'='*60}")
     print(f"All Services Execution Cycle Completed in {time.time() - start_total:.2f}s.")
+    write_cycle_metrics(metrics_dir, time.time() - start_total)
     
     if failed_services:
         print(f"Warning: The following services failed: {', '.join(failed_services)}")
     
     print(f"{'='*60}")
     
+    if args.no_package:
+        return
+    
     # Package Results
     print("\nStarting Report Packaging...")
     try:
@@ -3,5 +3,8 @@
 """
 
 from .technical import TechnicalAnalyzer
+from .indicators import IndicatorEngine, IndicatorPanel, align_panel
+from .streaming import IndicatorStream
+from .margin import margin_analytics, margin_rollup
 
-__all__ = ['TechnicalAnalyzer']
+__all__ = ['TechnicalAnalyzer', 'IndicatorEngine', 'IndicatorPanel', 'align_panel', 'IndicatorStream', 'margin_analytics', 'margin_rollup']
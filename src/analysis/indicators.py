@@ -0,0 +1,375 @@
+"""
+技术指标计算引擎
+
+按声明式的指标列表一次性计算技术指标:
+- 收盘价序列、滚动窗口、EMA 等中间结果按 (类型, 列, 参数) 缓存, 多个指标共用时只计算一次
+  (如 MA20 与 BOLL_MID、MACD 的 EMA12/26 与 EMA 指标)
+- 结果直接写入预先分配的 float64 矩阵, 不复制输入 DataFrame
+- 可返回新的 DataFrame, 或原地写入输入 DataFrame
+- 面板模式: 输入按日期对齐的 (日期 × 股票) 价格矩阵, 所有股票按列一次性计算, 输出 IndicatorPanel
+- backend 参数: 滚动均值/标准差/极值可切换为 rolling 模块的 numpy/numba 实现 (默认 pandas)
+"""
+
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .rolling import resolve_backend, rolling_max, rolling_mean_var, rolling_min
+
+
+# 声明式指标列表: (指标名, 参数); 与 TechnicalAnalyzer.calculate_all_indicators 的默认参数一致
+DEFAULT_INDICATORS = [
+    ('MA', {'periods': (5, 10, 20, 60)}),
+    ('MACD', {'fast': 12, 'slow': 26, 'signal': 9}),
+    ('RSI', {'period': 14}),
+    ('KDJ', {'n': 9, 'm1': 3, 'm2': 3}),
+    ('BOLL', {'period': 20, 'std_multiplier': 2}),
+]
+
+# 面板模式默认另加 EMA12/26 (与 MACD 共用 EMA 缓存, 几乎不增加计算量)
+PANEL_INDICATORS = DEFAULT_INDICATORS + [('EMA', {'periods': (12, 26)})]
+
+
+PRICE_COLUMNS = ('收盘', '最高', '最低')
+
+
+def _frame(values: np.ndarray):
+    """一维数组包装为 Series, 二维 (日期 × 股票) 数组包装为 DataFrame, 以便按列滚动计算"""
+    if values.ndim == 1:
+        return pd.Series(values, copy=False)
+    return pd.DataFrame(values, copy=False)
+
+
+class SharedSeries:
+    """指标间共享的中间结果缓存 (单只股票的一段行情, 或按日期对齐的多只股票)"""
+
+    def __init__(self, df, backend: str = 'pandas'):
+        """
+        Args:
+            df: 单只股票的DataFrame, 或 列名 -> (日期 × 股票) DataFrame 的映射
+            backend: 滚动窗口算子后端, 见 rolling.resolve_backend
+        """
+        self.df = df
+        self.backend = backend
+        self.cache = {}
+
+    def _get(self, key: tuple, compute: Callable):
+        if key not in self.cache:
+            self.cache[key] = compute()
+        return self.cache[key]
+
+    def values(self, column: str) -> np.ndarray:
+        return self.series(column).to_numpy()
+
+    def series(self, column: str):
+        """float64 价格序列 (不带原索引, 避免索引对齐开销); 面板模式下为 (日期 × 股票) DataFrame"""
+        return self._get(('series', column), lambda: _frame(self.df[column].to_numpy(dtype=np.float64)))
+
+    def rolling(self, column: str, window: int):
+        return self._get(('rolling', column, window), lambda: self.series(column).rolling(window=window))
+
+    def _mean_var(self, column: str, window: int) -> Tuple[np.ndarray, np.ndarray]:
+        # 非 pandas 后端: 均值与方差一次遍历同时得到
+        return self._get(('mean_var', column, window),
+                         lambda: rolling_mean_var(self.values(column), window, backend=self.backend))
+
+    def rolling_mean(self, column: str, window: int) -> np.ndarray:
+        if self.backend != 'pandas':
+            return self._mean_var(column, window)[0]
+        return self._get(('mean', column, window), lambda: self.rolling(column, window).mean().to_numpy())
+
+    def rolling_std(self, column: str, window: int) -> np.ndarray:
+        if self.backend != 'pandas':
+            return self._get(('std', column, window), lambda: np.sqrt(self._mean_var(column, window)[1]))
+        return self._get(('std', column, window), lambda: self.rolling(column, window).std().to_numpy())
+
+    def rolling_min(self, column: str, window: int) -> np.ndarray:
+        if self.backend != 'pandas':
+            return self._get(('min', column, window), lambda: rolling_min(self.values(column), window, self.backend))
+        return self._get(('min', column, window), lambda: self.rolling(column, window).min().to_numpy())
+
+    def rolling_max(self, column: str, window: int) -> np.ndarray:
+        if self.backend != 'pandas':
+            return self._get(('max', column, window), lambda: rolling_max(self.values(column), window, self.backend))
+        return self._get(('max', column, window), lambda: self.rolling(column, window).max().to_numpy())
+
+    def ema(self, column: str, span: int) -> np.ndarray:
+        return self._get(('ema', column, span), lambda: self.series(column).ewm(span=span, adjust=False).mean().to_numpy())
+
+    def diff(self, column: str) -> np.ndarray:
+        return self._get(('diff', column), lambda: self.series(column).diff().to_numpy())
+
+
+def _ewm(values: np.ndarray, **kwargs) -> np.ndarray:
+    return _frame(values).ewm(adjust=False, **kwargs).mean().to_numpy()
+
+
+# ---- 各指标: 输出列名 + 写入函数 (out 为 列名 -> 预分配的 float64 视图, 面板模式下为二维) ----
+
+def _ma_columns(periods=(5, 10, 20, 60)):
+    return [f'MA{p}' for p in periods]
+
+
+def _ma(shared: SharedSeries, out: Dict[str, np.ndarray], periods=(5, 10, 20, 60)):
+    for p in periods:
+        out[f'MA{p}'][:] = shared.rolling_mean('收盘', p)
+
+
+def _ema_columns(periods=(12, 26)):
+    return [f'EMA{p}' for p in periods]
+
+
+def _ema(shared: SharedSeries, out: Dict[str, np.ndarray], periods=(12, 26)):
+    for p in periods:
+        out[f'EMA{p}'][:] = shared.ema('收盘', p)
+
+
+def _macd_columns(fast=12, slow=26, signal=9):
+    return ['DIF', 'DEA', 'MACD']
+
+
+def _macd(shared: SharedSeries, out: Dict[str, np.ndarray], fast=12, slow=26, signal=9):
+    dif, dea, macd = out['DIF'], out['DEA'], out['MACD']
+    np.subtract(shared.ema('收盘', fast), shared.ema('收盘', slow), out=dif)
+    dea[:] = _ewm(dif, span=signal)
+    np.subtract(dif, dea, out=macd)
+    macd *= 2
+
+
+def _rsi_columns(period=14, wilder=False):
+    return ['RSI']
+
+
+def _rsi(shared: SharedSeries, out: Dict[str, np.ndarray], period=14, wilder=False):
+    # wilder=False: 简单移动平均 (同 TechnicalAnalyzer.calculate_rsi); True: Wilder 平滑 (alpha=1/period)
+    delta = shared.diff('收盘')
+    gain = np.where(delta > 0, delta, 0.0)
+    loss = -np.where(delta < 0, delta, 0.0)
+    rsi = out['RSI']
+    if wilder:
+        avg_gain = _frame(gain).ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean().to_numpy()
+        avg_loss = _frame(loss).ewm(alpha=1.0 / period, adjust=False, min_periods=period).mean().to_numpy()
+    else:
+        avg_gain = _frame(gain).rolling(window=period).mean().to_numpy()
+        avg_loss = _frame(loss).rolling(window=period).mean().to_numpy()
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.divide(avg_gain, avg_loss, out=rsi)
+        rsi += 1
+        np.divide(100, rsi, out=rsi)
+    np.subtract(100, rsi, out=rsi)
+
+
+def _kdj_columns(n=9, m1=3, m2=3):
+    return ['K', 'D', 'J']
+
+
+def _kdj(shared: SharedSeries, out: Dict[str, np.ndarray], n=9, m1=3, m2=3):
+    k, d, j = out['K'], out['D'], out['J']
+    low_n = shared.rolling_min('最低', n)
+    high_n = shared.rolling_max('最高', n)
+    # 先在 J 列中计算 RSV, 最后再覆盖为 J 值
+    with np.errstate(divide='ignore', invalid='ignore'):
+        np.subtract(shared.values('收盘'), low_n, out=j)
+        np.divide(j, high_n - low_n, out=j)
+    j *= 100
+    k[:] = _ewm(j, com=m1 - 1)
+    d[:] = _ewm(k, com=m2 - 1)
+    np.multiply(3, k, out=j)
+    j -= 2 * d
+
+
+def _boll_columns(period=20, std_multiplier=2):
+    return ['BOLL_MID', 'BOLL_UP', 'BOLL_DOWN']
+
+
+def _boll(shared: SharedSeries, out: Dict[str, np.ndarray], period=20, std_multiplier=2):
+    mid = shared.rolling_mean('收盘', period)
+    width = std_multiplier * shared.rolling_std('收盘', period)
+    out['BOLL_MID'][:] = mid
+    np.add(mid, width, out=out['BOLL_UP'])
+    np.subtract(mid, width, out=out['BOLL_DOWN'])
+
+
+# 指标名 -> (输出列函数, 计算函数)
+INDICATORS = {
+    'MA': (_ma_columns, _ma),
+    'EMA': (_ema_columns, _ema),
+    'MACD': (_macd_columns, _macd),
+    'RSI': (_rsi_columns, _rsi),
+    'KDJ': (_kdj_columns, _kdj),
+    'BOLL': (_boll_columns, _boll),
+}
+
+
+class IndicatorEngine:
+    """声明式技术指标计算引擎"""
+
+    def __init__(self, indicators: Sequence[Tuple[str, dict]] = DEFAULT_INDICATORS, backend: str = 'pandas'):
+        """
+        初始化, 展开所有指标的输出列
+
+        Args:
+            indicators: [(指标名, 参数字典), ...], 指标名见 INDICATORS
+            backend: 滚动均值/标准差/极值的实现: 'pandas' (默认, 与 TechnicalAnalyzer 逐位一致) / 'numpy' / 'numba' / 'auto'
+        """
+        self.backend = resolve_backend(backend)
+        self.indicators = []
+        for name, params in indicators:
+            name = name.upper()
+            if name not in INDICATORS:
+                raise ValueError(f"未知指标: {name}, 可选: {', '.join(INDICATORS)}")
+            self.indicators.append((name, dict(params)))
+
+        self.columns: List[str] = []
+        for name, params in self.indicators:
+            for col in INDICATORS[name][0](**params):
+                if col in self.columns:
+                    raise ValueError(f"指标输出列重复: {col}")
+                self.columns.append(col)
+
+    def _compute_block(self, data, shape: tuple) -> np.ndarray:
+        """计算所有指标, 返回 (输出列数,) + shape 的 float64 数组"""
+        block = np.empty((len(self.columns),) + shape, dtype=np.float64)
+        out = dict(zip(self.columns, block))
+        shared = SharedSeries(data, self.backend)
+        for name, params in self.indicators:
+            INDICATORS[name][1](shared, out, **params)
+        return block
+
+    def compute_arrays(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        计算所有指标, 返回 (行数 × 输出列数) 的 float64 矩阵, 列顺序同 self.columns
+
+        Args:
+            df: 包含OHLC数据的DataFrame
+
+        Returns:
+            np.ndarray: 指标矩阵
+        """
+        return self._compute_block(df, (len(df),)).T
+
+    def compute(self, df: pd.DataFrame, inplace: bool = False) -> pd.DataFrame:
+        """
+        计算所有指标
+
+        Args:
+            df: 包含OHLC数据的DataFrame
+            inplace: 为 True 时直接写入 df 并返回 df, 否则返回新的 DataFrame (不修改 df)
+
+        Returns:
+            pd.DataFrame: 添加了指标列的DataFrame; 已存在的同名列被覆盖
+        """
+        values = self.compute_arrays(df)
+
+        if not inplace and not df.columns.isin(self.columns).any():
+            block = pd.DataFrame(values, index=df.index, columns=self.columns, copy=False)
+            return pd.concat([df, block], axis=1)
+
+        result = df if inplace else df.copy()
+        for i, col in enumerate(self.columns):
+            result[col] = values[:, i]
+        return result
+
+    def compute_panel(
+        self,
+        close: pd.DataFrame,
+        high: Optional[pd.DataFrame] = None,
+        low: Optional[pd.DataFrame] = None
+    ) -> 'IndicatorPanel':
+        """
+        面板模式: 所有股票按列一次性计算
+
+        Args:
+            close: 收盘价矩阵 (index 为日期, columns 为股票代码)
+            high: 最高价矩阵, 计算 KDJ 时必需, 行列须与 close 一致
+            low: 最低价矩阵, 计算 KDJ 时必需, 行列须与 close 一致
+
+        Returns:
+            IndicatorPanel: (指标 × 日期 × 股票) 结果
+        """
+        data = {'收盘': close}
+        for column, frame in (('最高', high), ('最低', low)):
+            if frame is None:
+                continue
+            if not (frame.index.equals(close.index) and frame.columns.equals(close.columns)):
+                raise ValueError(f"{column}矩阵的日期/股票与收盘价矩阵不一致, 请先用 align_panel 对齐")
+            data[column] = frame
+        if any(name == 'KDJ' for name, _ in self.indicators) and ('最高' not in data or '最低' not in data):
+            raise ValueError("计算 KDJ 需要最高价和最低价矩阵, 请传入 high/low 或从指标集中去掉 KDJ")
+
+        values = self._compute_block(data, close.shape)
+        return IndicatorPanel(values, self.columns, close.index, close.columns)
+
+
+class IndicatorPanel:
+    """面板指标结果: values[指标, 日期, 股票]"""
+
+    def __init__(self, values: np.ndarray, indicators: List[str], index: pd.Index, symbols: pd.Index):
+        self.values = values
+        self.indicators = list(indicators)
+        self.index = index
+        self.symbols = symbols
+        self._positions = {name: i for i, name in enumerate(self.indicators)}
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return self.values.shape
+
+    def indicator(self, name: str) -> pd.DataFrame:
+        """按指标切片: (日期 × 股票)"""
+        return pd.DataFrame(self.values[self._positions[name]], index=self.index, columns=self.symbols)
+
+    def __getitem__(self, name: str) -> pd.DataFrame:
+        return self.indicator(name)
+
+    def symbol(self, symbol: str) -> pd.DataFrame:
+        """按股票切片: (日期 × 指标)"""
+        pos = self.symbols.get_loc(symbol)
+        return pd.DataFrame(self.values[:, :, pos].T, index=self.index, columns=self.indicators)
+
+    def at(self, date=None) -> pd.DataFrame:
+        """
+        某一日的截面 (股票 × 指标), 用于板块选股
+
+        Args:
+            date: 日期, 为 None 时取最后一个日期
+        """
+        pos = len(self.index) - 1 if date is None else self.index.get_loc(date)
+        return pd.DataFrame(self.values[:, pos, :].T, index=self.symbols, columns=self.indicators)
+
+    def stack(self) -> pd.DataFrame:
+        """
+        堆叠为长表: index 为 (日期, 股票) 的 MultiIndex, columns 为指标
+        """
+        n_dates, n_symbols = len(self.index), len(self.symbols)
+        index = pd.MultiIndex.from_product([self.index, self.symbols], names=['日期', '代码'])
+        flat = self.values.reshape(len(self.indicators), n_dates * n_symbols).T
+        return pd.DataFrame(flat, index=index, columns=self.indicators)
+
+
+def align_panel(
+    frames: Mapping[str, pd.DataFrame],
+    columns: Iterable[str] = PRICE_COLUMNS,
+    date_column: str = '日期'
+) -> Dict[str, pd.DataFrame]:
+    """
+    将每只股票的日线 DataFrame 按日期对齐为 (日期 × 股票) 价格矩阵
+
+    Args:
+        frames: 股票代码 -> 日线DataFrame (需包含 date_column 及 columns)
+        columns: 需要对齐的价格列
+        date_column: 日期列名
+
+    Returns:
+        dict: 价格列名 -> (日期 × 股票) DataFrame, 缺失日期为 NaN
+    """
+    indexed = {code: df.set_index(date_column) for code, df in frames.items() if df is not None and not df.empty}
+    return {
+        column: pd.DataFrame({code: df[column] for code, df in indexed.items()}).sort_index()
+        for column in columns
+    }
+
+
+DEFAULT_ENGINE = IndicatorEngine()
+PANEL_ENGINE = IndicatorEngine(PANEL_INDICATORS)
@@ -0,0 +1,487 @@
+"""
+分时数据聚合内核
+
+将腾讯分时接口返回的数据直接解析为数组 (HHMM, 价格, 累计成交额),
+用 searchsorted 分桶聚合为 N 分钟K线, 并以 (股票 × K线) 矩阵一次性计算板块指数。
+"""
+
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+
+# 09:00 昨收基准点, 作为每只股票的第一根"K线"
+SEED_HHMM = 900
+SESSIONS = ((930, 1130), (1300, 1500))
+
+
+def _to_minutes(hhmm):
+    return hhmm // 100 * 60 + hhmm % 100
+
+
+def _to_hhmm(minutes):
+    return minutes // 60 * 100 + minutes % 60
+
+
+def bar_labels(width: int, open_bar: bool = False) -> np.ndarray:
+    """
+    生成N分钟K线的结束时间 (HHMM)
+
+    Args:
+        width: K线宽度(分钟), 需整除120
+        open_bar: 是否将 09:30 开盘成交单独作为一根K线
+
+    Returns:
+        np.ndarray: 升序的HHMM数组, 第一个元素为 09:00 昨收基准点
+    """
+    if width <= 0 or 120 % width != 0:
+        raise ValueError(f"K线宽度必须整除120分钟: {width}")
+
+    parts = [np.array([SEED_HHMM])]
+    if open_bar:
+        parts.append(np.array([930]))
+    for start, end in SESSIONS:
+        minutes = np.arange(_to_minutes(start) + width, _to_minutes(end) + 1, width)
+        parts.append(_to_hhmm(minutes))
+    return np.concatenate(parts)
+
+
+def format_bar_times(labels: np.ndarray, date_str: str) -> List[str]:
+    """
+    HHMM数组 -> "YYYY-MM-DD HH:MM:00" 字符串列表
+
+    Args:
+        labels: HHMM数组
+        date_str: 日期 格式YYYY-MM-DD
+
+    Returns:
+        list: 时间字符串列表
+    """
+    return [f"{date_str} {h:02d}:{m:02d}:00" for h, m in zip(labels // 100, labels % 100)]
+
+
+def parse_minute_payload(tencent_code: str, data: dict) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, float]]:
+    """
+    解析腾讯分时接口返回的JSON
+
+    分时数据每行格式为 "HHMM 价格 成交量 累计成交额",
+    各行字段数一致时整体切分后 reshape, 不逐行构造对象。
+
+    Args:
+        tencent_code: 带前缀的股票代码 (e.g., "sh600519")
+        data: 分时接口返回的JSON
+
+    Returns:
+        tuple: (HHMM, 价格, 累计成交额, 昨收), 数据无效返回None; 昨收缺失时为NaN
+    """
+    try:
+        stock_data = data['data'][tencent_code]
+        rows = stock_data['data']['data']
+    except (KeyError, TypeError):
+        return None
+    if not rows:
+        return None
+
+    prev_close = np.nan
+    qt_data = stock_data.get('qt', {}).get(tencent_code)
+    if isinstance(qt_data, list) and len(qt_data) > 4:
+        try:
+            prev_close = float(qt_data[4])
+        except (TypeError, ValueError):
+            pass
+
+    rows = np.asarray(rows)
+    field_counts = np.char.count(rows, ' ') + 1
+    n_fields = int(field_counts[0])
+    try:
+        if n_fields >= 2 and (field_counts == n_fields).all():
+            fields = np.array(' '.join(rows.tolist()).split()).reshape(len(rows), n_fields)
+        else:
+            # 字段数不一致时逐行补齐为4列
+            padded = [(row.split(' ') + ['0', '0', '0'])[:4] for row in rows.tolist() if row.count(' ') >= 1]
+            if not padded:
+                return None
+            fields = np.array(padded)
+            n_fields = 4
+        hhmm = fields[:, 0].astype(np.int64)
+        price = fields[:, 1].astype(np.float64)
+        amount = fields[:, 3].astype(np.float64) if n_fields >= 4 else np.zeros(len(fields))
+    except ValueError:
+        return None
+
+    return hhmm, price, amount, prev_close
+
+
+def bucket_bars(
+    hhmm: np.ndarray,
+    price: np.ndarray,
+    amount: np.ndarray,
+    labels: np.ndarray,
+    prev_close: float = np.nan
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    将分时数据分桶为N分钟K线
+
+    每根K线的收盘价取桶内最后一笔价格, 累计成交额取桶内最大值。
+    非交易时段的数据被丢弃。
+
+    Args:
+        hhmm: 分时时间 (HHMM)
+        price: 分时价格
+        amount: 分时累计成交额
+        labels: bar_labels 生成的K线结束时间
+        prev_close: 昨收, 有效时写入 09:00 基准点
+
+    Returns:
+        tuple: (收盘价, 累计成交额), 长度与 labels 相同, 无数据的K线为NaN
+    """
+    close = np.full(len(labels), np.nan)
+    cum_amount = np.full(len(labels), np.nan)
+    if prev_close > 0:
+        close[0] = prev_close
+        cum_amount[0] = 0.0
+
+    in_session = (hhmm >= SEED_HHMM) & ((hhmm <= SESSIONS[0][1]) | ((hhmm >= SESSIONS[1][0]) & (hhmm <= SESSIONS[1][1])))
+    if not in_session.any():
+        return close, cum_amount
+
+    minutes = _to_minutes(hhmm[in_session])
+    order = np.argsort(minutes, kind='stable')
+    minutes, bar_price, bar_amount = minutes[order], price[in_session][order], amount[in_session][order]
+
+    # 分钟 -> 第一个结束时间不早于它的K线
+    bar_idx = np.searchsorted(_to_minutes(labels[1:]), minutes, side='left') + 1
+    last = np.flatnonzero(np.append(bar_idx[1:] != bar_idx[:-1], True))
+    first = np.append(0, last[:-1] + 1)
+
+    close[bar_idx[last]] = bar_price[last]
+    cum_amount[bar_idx[last]] = np.maximum.reduceat(bar_amount, first)
+    return close, cum_amount
+
+
+def quote_minute(timestamp: str) -> Optional[int]:
+    """
+    将实时行情时间戳映射到分时数据的分钟 (HHMM)
+
+    分时数据中 HHMM 表示截至该分钟末的成交, 因此 09:31:25 归入 0932;
+    集合竞价归入 0930, 午间休市和收盘后分别归入 1130 和 1500。
+
+    Args:
+        timestamp: 行情时间戳 格式YYYYMMDDHHMMSS
+
+    Returns:
+        int: HHMM, 时间戳无效返回None
+    """
+    if len(timestamp) != 14 or not timestamp.isdigit():
+        return None
+    hhmm = int(timestamp[8:12])
+    if int(timestamp[12:14]) > 0:
+        hhmm = _to_hhmm(_to_minutes(hhmm) + 1)
+    if hhmm < SESSIONS[0][0]:
+        return SESSIONS[0][0]
+    if SESSIONS[0][1] < hhmm < SESSIONS[1][0]:
+        return SESSIONS[0][1]
+    return min(hhmm, SESSIONS[1][1])
+
+
+def merge_minutes(
+    parsed: Tuple[np.ndarray, np.ndarray, np.ndarray, float],
+    hhmm: np.ndarray,
+    price: np.ndarray,
+    amount: np.ndarray
+) -> Tuple[Tuple[np.ndarray, np.ndarray, np.ndarray, float], np.ndarray]:
+    """
+    将新的分时点合并到已有的分时数组
+
+    与最后一分钟相同的点覆盖该分钟, 更早的点被丢弃。
+
+    Args:
+        parsed: parse_minute_payload 的返回值
+        hhmm: 新分时点时间 (HHMM, 升序)
+        price: 新分时点价格
+        amount: 新分时点累计成交额
+
+    Returns:
+        tuple: (合并后的分时数据, 实际生效的新分时点索引)
+    """
+    old_hhmm, old_price, old_amount, prev_close = parsed
+    last = old_hhmm[-1] if len(old_hhmm) else -1
+    fresh = np.flatnonzero(hhmm >= last)
+    if not len(fresh):
+        return parsed, fresh
+
+    keep = len(old_hhmm) - int((old_hhmm == last).sum()) if len(old_hhmm) else 0
+    merged = (
+        np.concatenate([old_hhmm[:keep], hhmm[fresh]]),
+        np.concatenate([old_price[:keep], price[fresh]]),
+        np.concatenate([old_amount[:keep], amount[fresh]]),
+        prev_close
+    )
+    return merged, fresh
+
+
+def _ffill(values: np.ndarray, fill: np.ndarray) -> np.ndarray:
+    """
+    每行向前填充NaN (即每只股票截至当前K线的最后一个有效值), 之前没有有效值时取 fill
+    """
+    n_rows, n_cols = values.shape
+    valid = ~np.isnan(values)
+    idx = np.where(valid, np.arange(n_cols), -1)
+    np.maximum.accumulate(idx, axis=1, out=idx)
+
+    rows = np.arange(n_rows)[:, None]
+    filled = values[rows, np.maximum(idx, 0)]
+    return np.where(idx >= 0, filled, fill[:, None])
+
+
+def _shift(filled: np.ndarray, fill: np.ndarray) -> np.ndarray:
+    """每行右移一列, 第一列取 fill"""
+    shifted = np.empty_like(filled)
+    shifted[:, 0] = fill
+    shifted[:, 1:] = filled[:, :-1]
+    return shifted
+
+
+def block_index(close: np.ndarray, cum_amount: np.ndarray, prev_close: np.ndarray) -> Optional[Dict[str, np.ndarray]]:
+    """
+    以 (股票 × K线) 矩阵计算板块指数
+
+    - values: 以累计成交额加权的累计涨跌幅(相对昨收)
+    - dynamic_values: 以区间成交额加权的区间涨跌幅(相对上一根K线)
+    - volumes / cum_volumes: 板块区间成交额 / 累计成交额
+
+    Args:
+        close: 收盘价矩阵, 无数据为NaN
+        cum_amount: 累计成交额矩阵, 无数据为NaN
+        prev_close: 各股票昨收, 无效时以当日第一根K线收盘价为基准
+
+    Returns:
+        dict: 上述各序列及 mask (至少一只股票有数据的K线), 无有效股票返回None
+    """
+    return BlockIndexState().update(close, cum_amount, prev_close)
+
+
+class BlockIndexState:
+    """
+    板块指数的增量计算状态
+
+    缓存每根K线结束时各股票的前值(最后收盘价、最后累计成交额、累计权重)
+    和板块累计成交额, 新数据到达时只从第一根变动的K线开始重算,
+    之前的列直接复用, 累计和只向后追加。
+    """
+
+    def __init__(self):
+        self.n_done = 0
+        self._shape: Optional[Tuple[int, int]] = None
+
+    def _reset(self, n_rows: int, n_cols: int):
+        self.n_done = 0
+        self._shape = (n_rows, n_cols)
+        self._last_close = np.full((n_rows, n_cols), np.nan)
+        self._last_amount = np.full((n_rows, n_cols), np.nan)
+        self._running = np.zeros((n_rows, n_cols))
+        self._cum_volumes = np.zeros(n_cols)
+        self._values = np.full(n_cols, np.nan)
+        self._dynamic_values = np.full(n_cols, np.nan)
+        self._volumes = np.zeros(n_cols)
+        self._mask = np.zeros(n_cols, dtype=bool)
+
+    def update(
+        self,
+        close: np.ndarray,
+        cum_amount: np.ndarray,
+        prev_close: np.ndarray,
+        start: int = 0
+    ) -> Optional[Dict[str, np.ndarray]]:
+        """
+        更新板块指数
+
+        Args:
+            close: 收盘价矩阵, 无数据为NaN
+            cum_amount: 累计成交额矩阵, 无数据为NaN
+            prev_close: 各股票昨收, 无效时以当日第一根K线收盘价为基准
+            start: 自上次调用以来第一根有变动的K线列号;
+                成分股行数或K线列数变化时自动从第0列全量计算
+
+        Returns:
+            dict: 同 block_index
+        """
+        close = np.atleast_2d(close)
+        cum_amount = np.atleast_2d(cum_amount)
+        if self._shape != close.shape:
+            self._reset(*close.shape)
+        start = min(start, self.n_done)
+        if self.n_done and start == close.shape[1]:
+            # 已计算的列均未变动
+            return self._result()
+
+        has_bar_all = ~np.isnan(close)
+        if not has_bar_all.any():
+            return None
+
+        first_idx = np.argmax(has_bar_all, axis=1)
+        first_close = close[np.arange(len(close)), first_idx]
+        base = np.where(prev_close > 0, prev_close, first_close)
+
+        stocks = has_bar_all.any(axis=1) & (base != 0) & ~np.isnan(base)
+        if not stocks.any():
+            return None
+
+        if start == 0:
+            carry_close = np.full(len(close), np.nan)
+            carry_amount = np.full(len(close), np.nan)
+            carry_running = np.zeros(len(close))
+            carry_volume = 0.0
+        else:
+            carry_close = self._last_close[:, start - 1]
+            carry_amount = self._last_amount[:, start - 1]
+            carry_running = self._running[:, start - 1]
+            carry_volume = self._cum_volumes[start - 1]
+
+        # 无效股票整行视为无数据
+        sub_close = np.where(stocks[:, None], close[:, start:], np.nan)
+        sub_amount = np.where(stocks[:, None], cum_amount[:, start:], np.nan)
+        has_bar = ~np.isnan(sub_close)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            pct = (sub_close - base[:, None]) / base[:, None] * 100
+
+            last_close = _ffill(sub_close, carry_close)
+            prev_bar_close = _shift(last_close, carry_close)
+            prev_bar_close = np.where(np.isnan(prev_bar_close), base[:, None], prev_bar_close)
+            interval_pct = np.where(prev_bar_close > 0, (sub_close - prev_bar_close) / prev_bar_close * 100, 0.0)
+            interval_pct[~has_bar] = np.nan
+
+            last_amount = _ffill(sub_amount, carry_amount)
+            prev_amount = _shift(last_amount, carry_amount)
+            interval_amount = sub_amount - np.where(np.isnan(prev_amount), 0.0, prev_amount)
+            running = np.nancumsum(np.hstack([carry_running[:, None], interval_amount]), axis=1)[:, 1:]
+            running_amount = np.where(np.isnan(interval_amount), np.nan, running)
+
+            cum_weighted = np.nansum(pct * running_amount, axis=0)
+            cum_weights = np.nansum(np.where(has_bar, running_amount, np.nan), axis=0)
+            values = cum_weighted / cum_weights
+
+            dyn_weighted = np.nansum(interval_pct * interval_amount, axis=0)
+            dyn_weights = np.nansum(np.where(has_bar, interval_amount, np.nan), axis=0)
+            dynamic_values = dyn_weighted / dyn_weights
+
+        mask = has_bar.any(axis=0)
+        volumes = np.where(mask, np.nansum(interval_amount, axis=0), 0.0)
+
+        self._last_close[:, start:] = last_close
+        self._last_amount[:, start:] = last_amount
+        self._running[:, start:] = running
+        self._cum_volumes[start:] = np.cumsum(np.append(carry_volume, volumes))[1:]
+        self._values[start:] = values
+        self._dynamic_values[start:] = dynamic_values
+        self._volumes[start:] = volumes
+        self._mask[start:] = mask
+        self.n_done = close.shape[1]
+        return self._result()
+
+    def _result(self) -> Optional[Dict[str, np.ndarray]]:
+        mask = self._mask.copy()
+        if not mask.any():
+            return None
+        values, dynamic_values = self._values[mask], self._dynamic_values[mask]
+        return {
+            'mask': mask,
+            'values': np.where(np.isnan(values), 0.0, values),
+            'dynamic_values': np.where(np.isnan(dynamic_values), 0.0, dynamic_values),
+            'volumes': self._volumes[mask],
+            'cum_volumes': self._cum_volumes[mask]
+        }
+
+
+class IntradayBarTable:
+    """
+    全市场(或自选股池)的N分钟K线矩阵
+
+    每只股票一行, 每根K线一列; 板块计算时按代码取出对应行即可,
+    不再逐只股票构造 DataFrame。
+    """
+
+    def __init__(self, width: int, open_bar: bool = False):
+        """
+        初始化
+
+        Args:
+            width: K线宽度(分钟)
+            open_bar: 是否将 09:30 开盘成交单独作为一根K线
+        """
+        self.width = width
+        self.open_bar = open_bar
+        self.labels = bar_labels(width, open_bar)
+        self.index: Dict[str, int] = {}
+        self._close: List[np.ndarray] = []
+        self._amount: List[np.ndarray] = []
+        self._prev_close: List[float] = []
+        self._stacked: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]] = None
+
+    def add(self, code: str, parsed: Tuple[np.ndarray, np.ndarray, np.ndarray, float]):
+        """
+        加入一只股票的分时数据
+
+        Args:
+            code: 股票代码
+            parsed: parse_minute_payload 的返回值
+        """
+        hhmm, price, amount, prev_close = parsed
+        close, cum_amount = bucket_bars(hhmm, price, amount, self.labels, prev_close)
+        self.index[code] = len(self._close)
+        self._close.append(close)
+        self._amount.append(cum_amount)
+        self._prev_close.append(prev_close)
+        self._stacked = None
+
+    def update(self, code: str, hhmm: np.ndarray, price: np.ndarray, amount: np.ndarray) -> Optional[int]:
+        """
+        将一只股票新到达的分时点并入已有K线 (不重新分桶整段数据)
+
+        新分时点须晚于该股票已并入的数据: 所在K线的收盘价取最后一个点,
+        累计成交额取最大值。
+
+        Args:
+            code: 股票代码 (须已通过 add 加入)
+            hhmm: 新分时点时间 (HHMM, 升序)
+            price: 新分时点价格
+            amount: 新分时点累计成交额
+
+        Returns:
+            int: 第一根有变动的K线列号, 没有变动返回None
+        """
+        close, cum_amount = bucket_bars(hhmm, price, amount, self.labels)
+        touched = np.flatnonzero(~np.isnan(close))
+        if not len(touched):
+            return None
+
+        row = self.index[code]
+        row_close, row_amount = self._close[row], self._amount[row]
+        row_close[touched] = close[touched]
+        row_amount[touched] = np.fmax(row_amount[touched], cum_amount[touched])
+        if self._stacked is not None:
+            self._stacked[0][row] = row_close
+            self._stacked[1][row] = row_amount
+        return int(touched[0])
+
+    def __len__(self):
+        return len(self._close)
+
+    def join(self, codes: Iterable[str]) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """
+        取出指定代码的K线矩阵
+
+        Args:
+            codes: 股票代码 (重复和缺失的代码会被忽略)
+
+        Returns:
+            tuple: (收盘价矩阵, 累计成交额矩阵, 昨收), 没有任何数据返回None
+        """
+        rows = [self.index[code] for code in dict.fromkeys(codes) if code in self.index]
+        if not rows:
+            return None
+        if self._stacked is None:
+            self._stacked = (np.vstack(self._close), np.vstack(self._amount), np.array(self._prev_close))
+        close, cum_amount, prev_close = self._stacked
+        return close[rows], cum_amount[rows], prev_close[rows]
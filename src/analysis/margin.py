@@ -0,0 +1,104 @@
+"""
+全市场两融分析
+
+输入为 fetch_margin_data(full_market=True) 格式的当日明细 (每只两融标的一行)
+和 MarginStore 归档的历史明细, 一次向量化计算:
+- 融资净买入排名和净买入占比
+- 融资余额变化的 z-score (当日变化相对该股票近 N 个交易日变化的均值/标准差)
+- 按任意分组列 (自选板块、市场板块等) 汇总
+"""
+
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+
+# 计算 z-score 至少需要的历史变化数, 不足时为 NaN
+MIN_Z_HISTORY = 5
+
+
+def _net_buy_ratio(net_buy: pd.Series, prev_balance: pd.Series) -> pd.Series:
+    """净买入 / 前一日融资余额 * 100, 前一日余额为 0 时为 0"""
+    return (net_buy / prev_balance.where(prev_balance != 0) * 100).fillna(0)
+
+
+def balance_change_zscore(today: pd.DataFrame, history: Optional[pd.DataFrame], window: int = 20) -> pd.Series:
+    """
+    融资余额变化的 z-score
+
+    Args:
+        today: 当日明细 (code, date, margin_balance); 两个交易所的最新日期可能不同, 按日期分别计算
+        history: 历史明细 (code, date, margin_balance), 可含当日 (以 today 为准)
+        window: 参与统计的历史变化数
+
+    Returns:
+        pd.Series: 与 today 行对齐的 z-score, 历史不足 MIN_Z_HISTORY 时为 NaN
+    """
+    if today.empty:
+        return pd.Series(dtype=float)
+    parts = [_zscore_on_date(date, group, history, window) for date, group in today.groupby('date')]
+    return pd.concat(parts).reindex(today.index)
+
+
+def _zscore_on_date(date: str, today: pd.DataFrame, history: Optional[pd.DataFrame], window: int) -> pd.Series:
+    frames = [today[['code', 'date', 'margin_balance']]]
+    if history is not None and not history.empty:
+        frames.insert(0, history.loc[history['date'] < date, ['code', 'date', 'margin_balance']])
+    long = pd.concat(frames, ignore_index=True).drop_duplicates(['date', 'code'], keep='last')
+
+    # 日期 × 股票 面板, 取最后 window+2 个交易日 (window 个历史变化 + 当日变化)
+    panel = long.pivot(index='date', columns='code', values='margin_balance').sort_index().tail(window + 2)
+    changes = panel.diff().iloc[1:]
+    if len(changes) < MIN_Z_HISTORY + 1:
+        return pd.Series(np.nan, index=today.index)
+
+    last, past = changes.iloc[-1], changes.iloc[:-1]
+    z = (last - past.mean()) / past.std(ddof=1)
+    z[(past.count() < MIN_Z_HISTORY) | ~np.isfinite(z)] = np.nan
+    return today['code'].map(z).astype(float)
+
+
+def margin_analytics(today: pd.DataFrame, history: Optional[pd.DataFrame] = None, window: int = 20) -> pd.DataFrame:
+    """
+    全市场两融指标
+
+    Args:
+        today: 当日明细 (fetch_margin_data(full_market=True) 的输出)
+        history: MarginStore 归档的历史明细
+        window: z-score 的历史窗口(交易日)
+
+    Returns:
+        pd.DataFrame: today 加 margin_balance_prev, net_buy_ratio (%), net_buy_rank (1 为净买入最多),
+            net_buy_ratio_rank, balance_chg_z 列
+    """
+    df = today.copy()
+    if df.empty:
+        return df
+    df['margin_balance_prev'] = df['margin_balance'] - df['margin_net_buy']
+    df['net_buy_ratio'] = _net_buy_ratio(df['margin_net_buy'], df['margin_balance_prev'])
+    df['net_buy_rank'] = df['margin_net_buy'].rank(ascending=False, method='min').astype('Int64')
+    df['net_buy_ratio_rank'] = df['net_buy_ratio'].rank(ascending=False, method='min').astype('Int64')
+    df['balance_chg_z'] = balance_change_zscore(df, history, window)
+    return df
+
+
+def margin_rollup(df: pd.DataFrame, by: str) -> pd.DataFrame:
+    """
+    按分组列汇总融资净买入和余额
+
+    Args:
+        df: 明细 (margin_net_buy, margin_balance 及分组列)
+        by: 分组列名, 该列为空的行不参与汇总
+
+    Returns:
+        pd.DataFrame: by, margin_net_buy_sum, margin_balance_sum, margin_balance_prev_sum, net_buy_ratio, stock_count
+    """
+    grouped = df.dropna(subset=[by]).groupby(by)
+    out = grouped[['margin_net_buy', 'margin_balance']].sum().reset_index()
+    out.columns = [by, 'margin_net_buy_sum', 'margin_balance_sum']
+    # Prev Balance = Current Balance - Net Buy
+    out['margin_balance_prev_sum'] = out['margin_balance_sum'] - out['margin_net_buy_sum']
+    out['net_buy_ratio'] = _net_buy_ratio(out['margin_net_buy_sum'], out['margin_balance_prev_sum'])
+    out['stock_count'] = grouped.size().to_numpy()
+    return out
@@ -0,0 +1,258 @@
+"""
+滚动窗口基础算子
+
+对连续的 float64 数组 (一维, 或 日期 × 股票 的二维, 沿第 0 维滚动) 计算:
+- 滚动最大/最小值: numba 后端为单调队列 (环形缓冲区), numpy 后端为 van Herk/Gil-Werman 分块前缀/后缀极值,
+  两者与 pandas rolling().max()/min() 逐位一致
+- 滚动均值/方差: Welford 在线算法 (numpy 后端对窄输入改用滑动窗口两遍法), 与 pandas 结果在浮点误差范围内一致
+
+窗口内有 NaN 时输出 NaN (同 pandas 默认 min_periods=window)。
+numba 为可选依赖, 未安装时 backend='auto' 使用 numpy 实现。
+"""
+
+from typing import Tuple
+
+import numpy as np
+
+try:
+    import numba
+    HAS_NUMBA = True
+except ImportError:
+    numba = None
+    HAS_NUMBA = False
+
+
+BACKENDS = ('pandas', 'numpy', 'numba')
+
+# numpy 后端: 日期数 × 股票数 × 窗口 不超过该值时用滑动窗口两遍法, 否则按日期循环做 Welford (对股票向量化)
+SLIDING_LIMIT = 4_000_000
+
+
+def resolve_backend(backend: str) -> str:
+    """
+    解析后端名称
+
+    Args:
+        backend: 'auto' / 'pandas' / 'numpy' / 'numba'; 'auto' 在安装了 numba 时为 'numba', 否则为 'numpy'
+
+    Returns:
+        str: 实际使用的后端
+    """
+    if backend == 'auto':
+        return 'numba' if HAS_NUMBA else 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError(f"未知后端: {backend}, 可选: auto, {', '.join(BACKENDS)}")
+    if backend == 'numba' and not HAS_NUMBA:
+        raise ImportError("backend='numba' 需要安装 numba (pip install numba)")
+    return backend
+
+
+def _jit(func):
+    return numba.njit(cache=True)(func) if HAS_NUMBA else func
+
+
+def _as_2d(values) -> Tuple[np.ndarray, tuple]:
+    arr = np.ascontiguousarray(values, dtype=np.float64)
+    return arr.reshape(len(arr), -1), arr.shape
+
+
+# ---- numba 实现 (逐序列循环, 输入为 股票 × 日期 的连续数组) ----
+
+@_jit
+def _extreme_numba(x, window, is_max):
+    s, n = x.shape
+    out = np.empty((s, n))
+    ring = np.empty(window, np.int64)
+    for c in range(s):
+        head = 0
+        size = 0
+        last_nan = -window - 1
+        for i in range(n):
+            # 弹出已离开窗口的队首
+            if size > 0 and ring[head] <= i - window:
+                head = (head + 1) % window
+                size -= 1
+            v = x[c, i]
+            if v != v:
+                last_nan = i
+            else:
+                while size > 0:
+                    back = x[c, ring[(head + size - 1) % window]]
+                    if (back <= v) if is_max else (back >= v):
+                        size -= 1
+                    else:
+                        break
+                ring[(head + size) % window] = i
+                size += 1
+            if i >= window - 1 and last_nan <= i - window and size > 0:
+                out[c, i] = x[c, ring[head]]
+            else:
+                out[c, i] = np.nan
+    return out
+
+
+@_jit
+def _mean_var_numba(x, window, ddof):
+    s, n = x.shape
+    mean = np.empty((s, n))
+    var = np.empty((s, n))
+    for c in range(s):
+        nobs = 0
+        mu = 0.0
+        m2 = 0.0
+        for i in range(n):
+            if i >= window:
+                old = x[c, i - window]
+                if old == old:
+                    nobs -= 1
+                    if nobs > 0:
+                        delta = old - mu
+                        mu -= delta / nobs
+                        m2 -= delta * (old - mu)
+                    else:
+                        mu = 0.0
+                        m2 = 0.0
+            v = x[c, i]
+            if v == v:
+                nobs += 1
+                delta = v - mu
+                mu += delta / nobs
+                m2 += delta * (v - mu)
+            if nobs >= window:
+                mean[c, i] = mu
+                var[c, i] = max(m2, 0.0) / (nobs - ddof) if nobs > ddof else np.nan
+            else:
+                mean[c, i] = np.nan
+                var[c, i] = np.nan
+    return mean, var
+
+
+# ---- numpy 实现 (按列向量化) ----
+
+def _extreme_numpy(x: np.ndarray, window: int, is_max: bool) -> np.ndarray:
+    n, s = x.shape
+    out = np.full((n, s), np.nan)
+    if window > n:
+        return out
+    op = np.maximum if is_max else np.minimum
+    pad = (-n) % window
+    if pad:
+        # 用极值的单位元填充尾部, 不影响结果; 原始数据中的 NaN 仍会传播
+        x = np.concatenate([x, np.full((pad, s), -np.inf if is_max else np.inf)])
+    blocks = x.reshape(-1, window, s)
+    prefix = op.accumulate(blocks, axis=1).reshape(-1, s)
+    suffix = op.accumulate(blocks[:, ::-1], axis=1)[:, ::-1].reshape(-1, s)
+    op(suffix[:n - window + 1], prefix[window - 1:n], out=out[window - 1:])
+    return out
+
+
+def _mean_var_numpy(x: np.ndarray, window: int, ddof: int) -> Tuple[np.ndarray, np.ndarray]:
+    n, s = x.shape
+    mean = np.full((n, s), np.nan)
+    var = np.full((n, s), np.nan)
+    if window > n:
+        return mean, var
+    if n * s * window <= SLIDING_LIMIT:
+        view = np.lib.stride_tricks.sliding_window_view(x, window, axis=0)
+        mean[window - 1:] = view.mean(axis=-1)
+        if window > ddof:
+            var[window - 1:] = view.var(axis=-1, ddof=ddof)
+        return mean, var
+
+    nobs = np.zeros(s)
+    mu = np.zeros(s)
+    m2 = np.zeros(s)
+    valid = ~np.isnan(x)
+    filled = np.where(valid, x, 0.0)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for i in range(n):
+            if i >= window:
+                ok, old = valid[i - window], filled[i - window]
+                nobs -= ok
+                delta = np.where(ok, old - mu, 0.0)
+                mu = np.where(nobs > 0, mu - delta / nobs, 0.0)
+                m2 = np.where(nobs > 0, m2 - delta * (old - mu), 0.0)
+            ok, v = valid[i], filled[i]
+            nobs += ok
+            delta = np.where(ok, v - mu, 0.0)
+            mu = mu + np.where(ok, delta / nobs, 0.0)
+            m2 = m2 + np.where(ok, delta * (v - mu), 0.0)
+            full = nobs >= window
+            mean[i] = np.where(full, mu, np.nan)
+            var[i] = np.where(full & (nobs > ddof), np.maximum(m2, 0.0) / (nobs - ddof), np.nan)
+    return mean, var
+
+
+# ---- pandas 实现 (对照) ----
+
+def _frame(x: np.ndarray):
+    import pandas as pd
+    return pd.DataFrame(x, copy=False)
+
+
+def rolling_max(values, window: int, backend: str = 'auto') -> np.ndarray:
+    """
+    滚动最大值
+
+    Args:
+        values: 一维数组, 或 (日期 × 股票) 二维数组
+        window: 窗口长度
+        backend: 'auto' / 'pandas' / 'numpy' / 'numba'
+
+    Returns:
+        np.ndarray: 与输入同形状的 float64 数组, 前 window-1 行为 NaN
+    """
+    return _rolling_extreme(values, window, True, backend)
+
+
+def rolling_min(values, window: int, backend: str = 'auto') -> np.ndarray:
+    """
+    滚动最小值, 参数同 rolling_max
+    """
+    return _rolling_extreme(values, window, False, backend)
+
+
+def _rolling_extreme(values, window: int, is_max: bool, backend: str) -> np.ndarray:
+    backend = resolve_backend(backend)
+    x, shape = _as_2d(values)
+    if backend == 'numba':
+        out = _extreme_numba(np.ascontiguousarray(x.T), window, is_max).T
+    elif backend == 'numpy':
+        out = _extreme_numpy(x, window, is_max)
+    else:
+        rolling = _frame(x).rolling(window=window)
+        out = (rolling.max() if is_max else rolling.min()).to_numpy()
+    return out.reshape(shape)
+
+
+def rolling_mean_var(values, window: int, ddof: int = 1, backend: str = 'auto') -> Tuple[np.ndarray, np.ndarray]:
+    """
+    一次遍历同时计算滚动均值和方差 (Welford)
+
+    Args:
+        values: 一维数组, 或 (日期 × 股票) 二维数组
+        window: 窗口长度
+        ddof: 方差自由度修正, 默认 1 (同 pandas)
+        backend: 'auto' / 'pandas' / 'numpy' / 'numba'
+
+    Returns:
+        tuple: (均值, 方差), 与输入同形状
+    """
+    backend = resolve_backend(backend)
+    x, shape = _as_2d(values)
+    if backend == 'numba':
+        mean, var = _mean_var_numba(np.ascontiguousarray(x.T), window, ddof)
+        mean, var = mean.T, var.T
+    elif backend == 'numpy':
+        mean, var = _mean_var_numpy(x, window, ddof)
+    else:
+        rolling = _frame(x).rolling(window=window)
+        mean, var = rolling.mean().to_numpy(), rolling.var(ddof=ddof).to_numpy()
+    return mean.reshape(shape), var.reshape(shape)
+
+
+def rolling_std(values, window: int, ddof: int = 1, backend: str = 'auto') -> np.ndarray:
+    """
+    滚动标准差, 参数同 rolling_mean_var
+    """
+    return np.sqrt(rolling_mean_var(values, window, ddof, backend)[1])
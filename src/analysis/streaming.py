@@ -0,0 +1,560 @@
+"""
+流式 (增量) 技术指标
+
+每来一根新K线只做 O(1) 更新, 不再对整段历史重新执行 pandas rolling/ewm。
+滚动均值/标准差按 pandas 的在线算法 (Kahan 补偿求和、Welford 方差) 逐步复现,
+EMA 按 pandas ewm(adjust=False) 的递推公式复现, 因此 MA、EMA、MACD、RSI、KDJ、BOLL_MID
+与 TechnicalAnalyzer / IndicatorEngine 的批量结果逐位一致。
+BOLL_UP/BOLL_DOWN 依赖滚动标准差: 窗口内没有连续相同收盘价时逐位一致; 出现连续相同价格时,
+pandas 内部对滚动方差另有处理, 两者可能相差 1e-13 量级。
+
+所有状态可序列化为 JSON, 用于盘中监控断点续算。
+"""
+
+import json
+import math
+import os
+from collections import deque
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from .indicators import DEFAULT_INDICATORS
+
+
+NAN = float('nan')
+
+
+def _div(a: float, b: float) -> float:
+    """按 IEEE 754 语义的除法 (与 NumPy 一致), 除数为 0 时返回 inf/nan 而不是抛异常"""
+    if b == 0:
+        if a == 0 or a != a:
+            return NAN
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+    return a / b
+
+
+def _signbit(value: float) -> bool:
+    return math.copysign(1.0, value) < 0
+
+
+# 类名 -> 类, 用于从 JSON 状态恢复
+_REGISTRY = {}
+
+
+class StreamingState:
+    """
+    可序列化状态的基类
+
+    子类声明:
+        _params: 构造参数名
+        _state: 可变状态属性名 (float/int/list/deque)
+        _children: 嵌套的 StreamingState 属性名
+        _child_lists: 嵌套的 StreamingState 列表属性名
+    """
+
+    _params: Tuple[str, ...] = ()
+    _state: Tuple[str, ...] = ()
+    _children: Tuple[str, ...] = ()
+    _child_lists: Tuple[str, ...] = ()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        _REGISTRY[cls.__name__] = cls
+
+    def state_dict(self) -> dict:
+        """导出为可 JSON 序列化的字典"""
+        state = {}
+        for name in self._state:
+            value = getattr(self, name)
+            state[name] = list(value) if isinstance(value, deque) else value
+        return {
+            'type': type(self).__name__,
+            'params': {name: getattr(self, name) for name in self._params},
+            'state': state,
+            'children': {name: getattr(self, name).state_dict() for name in self._children},
+            'child_lists': {name: [c.state_dict() for c in getattr(self, name)] for name in self._child_lists},
+        }
+
+    @staticmethod
+    def from_state(data: dict) -> 'StreamingState':
+        """由 state_dict() 的结果恢复对象"""
+        obj = _REGISTRY[data['type']](**data['params'])
+        for name, value in data['state'].items():
+            current = getattr(obj, name)
+            if isinstance(current, deque):
+                value = deque(tuple(v) if isinstance(v, list) else v for v in value)
+            setattr(obj, name, value)
+        for name, child in data['children'].items():
+            setattr(obj, name, StreamingState.from_state(child))
+        for name, children in data.get('child_lists', {}).items():
+            setattr(obj, name, [StreamingState.from_state(c) for c in children])
+        return obj
+
+
+# ---- 基础滚动/递推统计量 ----
+
+class RollingMean(StreamingState):
+    """滚动均值, 复现 pandas rolling(window).mean() 的 Kahan 补偿求和"""
+
+    _params = ('window',)
+    _state = ('values', 'nobs', 'sum_x', 'neg_ct', 'comp_add', 'comp_remove', 'same_count', 'prev_value')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.sum_x = 0.0
+        self.neg_ct = 0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_count = 0
+        self.prev_value = NAN
+
+    def _add(self, val: float):
+        if val != val:
+            return
+        self.nobs += 1
+        y = val - self.comp_add
+        t = self.sum_x + y
+        self.comp_add = t - self.sum_x - y
+        self.sum_x = t
+        if _signbit(val):
+            self.neg_ct += 1
+        if val == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = val
+
+    def _remove(self, val: float):
+        if val != val:
+            return
+        self.nobs -= 1
+        y = -val - self.comp_remove
+        t = self.sum_x + y
+        self.comp_remove = t - self.sum_x - y
+        self.sum_x = t
+        if _signbit(val):
+            self.neg_ct -= 1
+
+    def update(self, val: float) -> float:
+        self.values.append(val)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.nobs < self.window or self.nobs == 0:
+            return NAN
+        if self.same_count >= self.nobs:
+            return self.prev_value
+        result = self.sum_x / self.nobs
+        if self.neg_ct == 0 and result < 0:
+            return 0.0
+        if self.neg_ct == self.nobs and result > 0:
+            return 0.0
+        return result
+
+
+class RollingStd(StreamingState):
+    """
+    滚动标准差 (ddof=1), 按 pandas rolling(window).std() 的 Welford + Kahan 算法计算
+
+    窗口内出现连续相同值时, 与 pandas 的结果可能有 1e-13 量级的差异
+    """
+
+    _params = ('window',)
+    _state = ('values', 'nobs', 'mean_x', 'ssqdm_x', 'comp_add', 'comp_remove', 'same_count', 'prev_value')
+
+    def __init__(self, window: int):
+        self.window = window
+        self.values = deque()
+        self.nobs = 0
+        self.mean_x = 0.0
+        self.ssqdm_x = 0.0
+        self.comp_add = 0.0
+        self.comp_remove = 0.0
+        self.same_count = 0
+        self.prev_value = NAN
+
+    def _add(self, val: float):
+        if val != val:
+            return
+        self.nobs += 1
+        if val == self.prev_value:
+            self.same_count += 1
+        else:
+            self.same_count = 1
+        self.prev_value = val
+        prev_mean = self.mean_x - self.comp_add
+        y = val - self.comp_add
+        t = y - self.mean_x
+        self.comp_add = t + self.mean_x - y
+        self.mean_x = self.mean_x + t / self.nobs
+        self.ssqdm_x = self.ssqdm_x + (val - prev_mean) * (val - self.mean_x)
+
+    def _remove(self, val: float):
+        if val != val:
+            return
+        self.nobs -= 1
+        if self.nobs:
+            prev_mean = self.mean_x - self.comp_remove
+            y = val - self.comp_remove
+            t = y - self.mean_x
+            self.comp_remove = t + self.mean_x - y
+            self.mean_x = self.mean_x - t / self.nobs
+            self.ssqdm_x = self.ssqdm_x - (val - prev_mean) * (val - self.mean_x)
+        else:
+            self.mean_x = 0.0
+            self.ssqdm_x = 0.0
+
+    def update(self, val: float) -> float:
+        self.values.append(val)
+        if len(self.values) > self.window:
+            self._remove(self.values.popleft())
+        self._add(val)
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if self.nobs < self.window or self.nobs <= 1:
+            return NAN
+        if self.same_count >= self.nobs:
+            return 0.0
+        var = self.ssqdm_x / (self.nobs - 1)
+        return math.sqrt(var) if var > 0 else 0.0
+
+
+class RollingExtreme(StreamingState):
+    """滚动最大/最小值, 单调队列实现 (摊还 O(1))"""
+
+    _params = ('window', 'is_max')
+    _state = ('queue', 'count', 'valid')
+
+    def __init__(self, window: int, is_max: bool = True):
+        self.window = window
+        self.is_max = is_max
+        self.queue = deque()    # (序号, 值), 值单调
+        self.count = 0          # 已输入的K线数
+        self.valid = deque()    # 窗口内非 NaN 值的序号
+
+    def update(self, val: float) -> float:
+        i = self.count
+        self.count += 1
+        if val == val:
+            self.valid.append(i)
+            if self.is_max:
+                while self.queue and self.queue[-1][1] <= val:
+                    self.queue.pop()
+            else:
+                while self.queue and self.queue[-1][1] >= val:
+                    self.queue.pop()
+            self.queue.append((i, val))
+        start = self.count - self.window
+        while self.queue and self.queue[0][0] < start:
+            self.queue.popleft()
+        while self.valid and self.valid[0] < start:
+            self.valid.popleft()
+        return self.value
+
+    @property
+    def value(self) -> float:
+        if len(self.valid) < self.window:
+            return NAN
+        return self.queue[0][1]
+
+
+class EWMean(StreamingState):
+    """
+    指数加权均值, 复现 pandas ewm(..., adjust=False).mean()
+
+    com/span/alpha 三选一, 与 pandas 一样先换算为 com 再求 alpha
+    """
+
+    _params = ('com', 'min_periods')
+    _state = ('weighted', 'old_wt', 'nobs')
+
+    def __init__(self, com: Optional[float] = None, span: Optional[float] = None,
+                 alpha: Optional[float] = None, min_periods: int = 0):
+        if span is not None:
+            com = (span - 1) / 2.0
+        elif alpha is not None:
+            com = 1.0 / alpha - 1
+        if com is None:
+            raise ValueError("必须指定 com、span 或 alpha 之一")
+        self.com = float(com)
+        self.min_periods = max(int(min_periods), 1)
+        self.alpha = 1.0 / (1.0 + self.com)
+        self.weighted = NAN
+        self.old_wt = 1.0
+        self.nobs = 0
+
+    def update(self, val: float) -> float:
+        is_observation = val == val
+        self.nobs += is_observation
+        if self.weighted == self.weighted:
+            self.old_wt *= 1.0 - self.alpha
+            if is_observation:
+                if self.weighted != val:
+                    self.weighted = (self.old_wt * self.weighted + self.alpha * val) / (self.old_wt + self.alpha)
+                self.old_wt = 1.0
+        elif is_observation:
+            self.weighted = val
+        return self.value
+
+    @property
+    def value(self) -> float:
+        return self.weighted if self.nobs >= self.min_periods else NAN
+
+
+# ---- 指标 (输出列与 IndicatorEngine 一致) ----
+
+class StreamingIndicator(StreamingState):
+    """流式指标基类: update 输入一根K线, 返回 列名 -> 值"""
+
+    def columns(self) -> List[str]:
+        raise NotImplementedError
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        raise NotImplementedError
+
+
+class StreamingMA(StreamingIndicator):
+    _params = ('periods',)
+    _child_lists = ('means',)
+
+    def __init__(self, periods: Sequence[int] = (5, 10, 20, 60)):
+        self.periods = list(periods)
+        self.means = [RollingMean(p) for p in self.periods]
+
+    def columns(self) -> List[str]:
+        return [f'MA{p}' for p in self.periods]
+
+    def update(self, close, high=NAN, low=NAN):
+        return {f'MA{p}': m.update(close) for p, m in zip(self.periods, self.means)}
+
+
+class StreamingEMA(StreamingIndicator):
+    _params = ('periods',)
+    _child_lists = ('emas',)
+
+    def __init__(self, periods: Sequence[int] = (12, 26)):
+        self.periods = list(periods)
+        self.emas = [EWMean(span=p) for p in self.periods]
+
+    def columns(self) -> List[str]:
+        return [f'EMA{p}' for p in self.periods]
+
+    def update(self, close, high=NAN, low=NAN):
+        return {f'EMA{p}': e.update(close) for p, e in zip(self.periods, self.emas)}
+
+
+class StreamingMACD(StreamingIndicator):
+    _params = ('fast', 'slow', 'signal')
+    _children = ('ema_fast', 'ema_slow', 'dea')
+
+    def __init__(self, fast: int = 12, slow: int = 26, signal: int = 9):
+        self.fast, self.slow, self.signal = fast, slow, signal
+        self.ema_fast = EWMean(span=fast)
+        self.ema_slow = EWMean(span=slow)
+        self.dea = EWMean(span=signal)
+
+    def columns(self) -> List[str]:
+        return ['DIF', 'DEA', 'MACD']
+
+    def update(self, close, high=NAN, low=NAN):
+        dif = self.ema_fast.update(close) - self.ema_slow.update(close)
+        dea = self.dea.update(dif)
+        return {'DIF': dif, 'DEA': dea, 'MACD': (dif - dea) * 2}
+
+
+class StreamingRSI(StreamingIndicator):
+    """RSI; wilder=False 为简单均值 (同 TechnicalAnalyzer.calculate_rsi), True 为 Wilder 平滑"""
+
+    _params = ('period', 'wilder')
+    _state = ('prev_close',)
+    _children = ('avg_gain', 'avg_loss')
+
+    def __init__(self, period: int = 14, wilder: bool = False):
+        self.period = period
+        self.wilder = wilder
+        self.prev_close = NAN
+        if wilder:
+            self.avg_gain = EWMean(alpha=1.0 / period, min_periods=period)
+            self.avg_loss = EWMean(alpha=1.0 / period, min_periods=period)
+        else:
+            self.avg_gain = RollingMean(period)
+            self.avg_loss = RollingMean(period)
+
+    def columns(self) -> List[str]:
+        return ['RSI']
+
+    def update(self, close, high=NAN, low=NAN):
+        delta = close - self.prev_close
+        self.prev_close = close
+        gain = delta if delta > 0 else 0.0
+        loss = -(delta if delta < 0 else 0.0)
+        rs = _div(self.avg_gain.update(gain), self.avg_loss.update(loss))
+        return {'RSI': 100 - _div(100, rs + 1)}
+
+
+class StreamingKDJ(StreamingIndicator):
+    _params = ('n', 'm1', 'm2')
+    _children = ('low_n', 'high_n', 'k', 'd')
+
+    def __init__(self, n: int = 9, m1: int = 3, m2: int = 3):
+        self.n, self.m1, self.m2 = n, m1, m2
+        self.low_n = RollingExtreme(n, is_max=False)
+        self.high_n = RollingExtreme(n, is_max=True)
+        self.k = EWMean(com=m1 - 1)
+        self.d = EWMean(com=m2 - 1)
+
+    def columns(self) -> List[str]:
+        return ['K', 'D', 'J']
+
+    def update(self, close, high=NAN, low=NAN):
+        low_n = self.low_n.update(low)
+        high_n = self.high_n.update(high)
+        rsv = _div(close - low_n, high_n - low_n) * 100
+        k = self.k.update(rsv)
+        d = self.d.update(k)
+        return {'K': k, 'D': d, 'J': 3 * k - 2 * d}
+
+
+class StreamingBOLL(StreamingIndicator):
+    _params = ('period', 'std_multiplier')
+    _children = ('mid', 'std')
+
+    def __init__(self, period: int = 20, std_multiplier: float = 2):
+        self.period = period
+        self.std_multiplier = std_multiplier
+        self.mid = RollingMean(period)
+        self.std = RollingStd(period)
+
+    def columns(self) -> List[str]:
+        return ['BOLL_MID', 'BOLL_UP', 'BOLL_DOWN']
+
+    def update(self, close, high=NAN, low=NAN):
+        mid = self.mid.update(close)
+        width = self.std_multiplier * self.std.update(close)
+        return {'BOLL_MID': mid, 'BOLL_UP': mid + width, 'BOLL_DOWN': mid - width}
+
+
+# 指标名 -> 流式指标类, 与 indicators.INDICATORS 同名同参数
+STREAMING_INDICATORS = {
+    'MA': StreamingMA,
+    'EMA': StreamingEMA,
+    'MACD': StreamingMACD,
+    'RSI': StreamingRSI,
+    'KDJ': StreamingKDJ,
+    'BOLL': StreamingBOLL,
+}
+
+
+class IndicatorStream:
+    """单只股票的一组流式指标, 指标列表格式同 IndicatorEngine"""
+
+    def __init__(self, indicators: Sequence[Tuple[str, dict]] = DEFAULT_INDICATORS):
+        """
+        Args:
+            indicators: [(指标名, 参数字典), ...], 指标名见 STREAMING_INDICATORS
+        """
+        self.indicators: List[StreamingIndicator] = []
+        for name, params in indicators:
+            name = name.upper()
+            if name not in STREAMING_INDICATORS:
+                raise ValueError(f"未知指标: {name}, 可选: {', '.join(STREAMING_INDICATORS)}")
+            self.indicators.append(STREAMING_INDICATORS[name](**params))
+        self.columns = [col for ind in self.indicators for col in ind.columns()]
+        self.bars = 0
+        self.last: Dict[str, float] = {col: NAN for col in self.columns}
+
+    def update(self, close: float, high: float = NAN, low: float = NAN) -> Dict[str, float]:
+        """
+        输入一根新K线, O(1) 更新所有指标
+
+        Args:
+            close: 收盘价
+            high: 最高价 (KDJ 需要)
+            low: 最低价 (KDJ 需要)
+
+        Returns:
+            dict: 列名 -> 最新指标值
+        """
+        close, high, low = float(close), float(high), float(low)
+        result = {}
+        for ind in self.indicators:
+            result.update(ind.update(close, high, low))
+        self.bars += 1
+        self.last = result
+        return result
+
+    def warm_up(self, df: pd.DataFrame) -> Dict[str, float]:
+        """
+        用历史K线初始化状态
+
+        Args:
+            df: 包含 收盘 (及 最高、最低) 列的DataFrame, 按时间升序
+
+        Returns:
+            dict: 最后一根K线的指标值
+        """
+        closes = df['收盘'].tolist()
+        highs = df['最高'].tolist() if '最高' in df.columns else [NAN] * len(closes)
+        lows = df['最低'].tolist() if '最低' in df.columns else [NAN] * len(closes)
+        for bar in zip(closes, highs, lows):
+            self.update(*bar)
+        return self.last
+
+    def state_dict(self) -> dict:
+        return {
+            'bars': self.bars,
+            'last': self.last,
+            'indicators': [ind.state_dict() for ind in self.indicators],
+        }
+
+    @classmethod
+    def from_state(cls, data: dict) -> 'IndicatorStream':
+        stream = cls(indicators=())
+        stream.indicators = [StreamingState.from_state(d) for d in data['indicators']]
+        stream.columns = [col for ind in stream.indicators for col in ind.columns()]
+        stream.bars = data['bars']
+        stream.last = data['last']
+        return stream
+
+
+def save_checkpoint(streams: Dict[str, IndicatorStream], path: str):
+    """
+    将多只股票的流式指标状态保存为 JSON (先写临时文件再替换, 避免中断时损坏)
+
+    Args:
+        streams: 股票代码 -> IndicatorStream
+        path: 文件路径
+    """
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({code: s.state_dict() for code, s in streams.items()}, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def load_checkpoint(path: str) -> Dict[str, IndicatorStream]:
+    """
+    读取 save_checkpoint 保存的状态
+
+    Args:
+        path: 文件路径
+
+    Returns:
+        dict: 股票代码 -> IndicatorStream; 文件不存在时为空
+    """
+    if not os.path.exists(path):
+        return {}
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return {code: IndicatorStream.from_state(state) for code, state in data.items()}
@@ -4,7 +4,10 @@
 
 import pandas as pd
 import numpy as np
-from typing import List, Tuple
+from typing import List, Optional, Tuple
+
+from .indicators import DEFAULT_ENGINE, PANEL_ENGINE, PANEL_INDICATORS, IndicatorEngine, IndicatorPanel
+from .rolling import rolling_max, rolling_mean_var, rolling_min
 
 
 class TechnicalAnalyzer:
@@ -118,7 +121,13 @@ class TechnicalAnalyzer:
         return result
     
     @staticmethod
-    def calculate_kdj(df: pd.DataFrame, n: int = 9, m1: int = 3, m2: int = 3) -> pd.DataFrame:
+    def calculate_kdj(
+        df: pd.DataFrame,
+        n: int = 9,
+        m1: int = 3,
+        m2: int = 3,
+        backend: str = 'pandas'
+    ) -> pd.DataFrame:
         """
         计算KDJ指标
         
@@ -127,6 +136,7 @@ class TechnicalAnalyzer:
             n: RSV周期
             m1: K值周期
             m2: D值周期
+            backend: 滚动极值实现, 'pandas' / 'numpy' / 'numba' / 'auto', 见 rolling 模块
             
         Returns:
             pd.DataFrame: 添加了KDJ列的DataFrame
@@ -134,8 +144,12 @@ class TechnicalAnalyzer:
         result = df.copy()
         
         # 计算RSV
-        low_n = result['最低'].rolling(window=n).min()
-        high_n = result['最高'].rolling(window=n).max()
+        if backend == 'pandas':
+            low_n = result['最低'].rolling(window=n).min()
+            high_n = result['最高'].rolling(window=n).max()
+        else:
+            low_n = pd.Series(rolling_min(result['最低'].to_numpy(), n, backend), index=result.index)
+            high_n = pd.Series(rolling_max(result['最高'].to_numpy(), n, backend), index=result.index)
         rsv = (result['收盘'] - low_n) / (high_n - low_n) * 100
         
         # 计算K值
@@ -150,7 +164,12 @@ class TechnicalAnalyzer:
         return result
     
     @staticmethod
-    def calculate_boll(df: pd.DataFrame, period: int = 20, std_multiplier: float = 2) -> pd.DataFrame:
+    def calculate_boll(
+        df: pd.DataFrame,
+        period: int = 20,
+        std_multiplier: float = 2,
+        backend: str = 'pandas'
+    ) -> pd.DataFrame:
         """
         计算布林带指标
         
@@ -158,17 +177,24 @@ class TechnicalAnalyzer:
             df: 包含收盘价的DataFrame
             period: 周期
             std_multiplier: 标准差倍数
+            backend: 滚动均值/标准差实现, 'pandas' / 'numpy' / 'numba' / 'auto', 见 rolling 模块
             
         Returns:
             pd.DataFrame: 添加了布林带列的DataFrame
         """
         result = df.copy()
         
-        # 计算中轨(MA)
-        result['BOLL_MID'] = result['收盘'].rolling(window=period).mean()
-        
-        # 计算标准差
-        std = result['收盘'].rolling(window=period).std()
+        if backend == 'pandas':
+            # 计算中轨(MA)
+            result['BOLL_MID'] = result['收盘'].rolling(window=period).mean()
+            
+            # 计算标准差
+            std = result['收盘'].rolling(window=period).std()
+        else:
+            # 均值与方差一次遍历 (Welford)
+            mean, var = rolling_mean_var(result['收盘'].to_numpy(), period, backend=backend)
+            result['BOLL_MID'] = mean
+            std = pd.Series(np.sqrt(var), index=result.index)
         
         # 计算上轨和下轨
         result['BOLL_UP'] = result['BOLL_MID'] + std_multiplier * std
@@ -177,31 +203,41 @@ class TechnicalAnalyzer:
         return result
     
     @staticmethod
-    def calculate_all_indicators(df: pd.DataFrame) -> pd.DataFrame:
+    def calculate_all_indicators(df: pd.DataFrame, inplace: bool = False, backend: str = 'pandas') -> pd.DataFrame:
         """
-        计算所有常用技术指标
-        
+        计算所有常用技术指标 (MA、MACD、RSI、KDJ、布林带)
+
+        由 IndicatorEngine 一次性计算, 共用 MA20/BOLL_MID 等中间结果, 不逐个指标复制 DataFrame
+
         Args:
             df: 包含OHLC数据的DataFrame
-            
+            inplace: 是否直接写入 df
+            backend: 滚动窗口算子实现, 'pandas' (默认) / 'numpy' / 'numba' / 'auto', 见 rolling 模块
+
         Returns:
             pd.DataFrame: 添加了所有指标的DataFrame
         """
-        result = df.copy()
-        
-        # 移动平均线
-        result = TechnicalAnalyzer.calculate_ma(result, [5, 10, 20, 60])
-        
-        # MACD
-        result = TechnicalAnalyzer.calculate_macd(result)
-        
-        # RSI
-        result = TechnicalAnalyzer.calculate_rsi(result)
-        
-        # KDJ
-        result = TechnicalAnalyzer.calculate_kdj(result)
-        
-        # 布林带
-        result = TechnicalAnalyzer.calculate_boll(result)
-        
-        return result
+        engine = DEFAULT_ENGINE if backend == 'pandas' else IndicatorEngine(backend=backend)
+        return engine.compute(df, inplace=inplace)
+
+    @staticmethod
+    def calculate_panel_indicators(
+        close: pd.DataFrame,
+        high: Optional[pd.DataFrame] = None,
+        low: Optional[pd.DataFrame] = None,
+        backend: str = 'pandas'
+    ) -> IndicatorPanel:
+        """
+        面板模式: 对按日期对齐的多只股票一次性计算所有常用技术指标 (MA、EMA、MACD、RSI、KDJ、布林带)
+
+        Args:
+            close: 收盘价矩阵 (日期 × 股票), 可由 indicators.align_panel 生成
+            high: 最高价矩阵 (日期 × 股票)
+            low: 最低价矩阵 (日期 × 股票)
+            backend: 滚动窗口算子实现, 见 rolling 模块
+
+        Returns:
+            IndicatorPanel: 可按指标 (panel['MA5']) 或按股票 (panel.symbol(code)) 切片
+        """
+        engine = PANEL_ENGINE if backend == 'pandas' else IndicatorEngine(PANEL_INDICATORS, backend=backend)
+        return engine.compute_panel(close, high, low)
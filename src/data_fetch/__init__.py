@@ -3,5 +3,7 @@
 """
 
 from .stock_data import StockDataFetcher
+from .symbol_master import SymbolMaster, get_symbol_master
+from .trading_calendar import TradingCalendar, get_trading_calendar
 
-__all__ = ['StockDataFetcher']
+__all__ = ['StockDataFetcher', 'SymbolMaster', 'get_symbol_master', 'TradingCalendar', 'get_trading_calendar']
@@ -0,0 +1,195 @@
+"""
+异步行情请求引擎 (腾讯源)
+
+在单个事件循环内并发请求 qt.gtimg.cn 批量行情和 web.ifzq.gtimg.cn 分时数据,
+共享一个长连接池, 并用信号量限制同时在途的请求数。
+"""
+
+import asyncio
+import json
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+
+from . import replay
+from ..utils import metrics
+
+
+QUOTE_URL = "http://qt.gtimg.cn/q={}"
+MINUTE_URL = "http://web.ifzq.gtimg.cn/appstock/app/minute/query?code={}"
+
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
+}
+
+
+class AsyncFetchEngine:
+    """异步行情请求引擎"""
+
+    def __init__(self, max_concurrency: int = 32, timeout: float = 10, keepalive_timeout: float = 30):
+        """
+        初始化
+
+        Args:
+            max_concurrency: 最大并发请求数 (同时也是连接池大小)
+            timeout: 单个请求超时(秒)
+            keepalive_timeout: 空闲长连接保持时间(秒)
+        """
+        self.max_concurrency = max_concurrency
+        self.timeout = timeout
+        self.keepalive_timeout = keepalive_timeout
+
+    # ------------------------------------------------------------------
+    # 同步入口
+    # ------------------------------------------------------------------
+
+    def fetch_quote_batches(self, prefixed_symbols: List[str], batch_size: int = 80) -> List[str]:
+        """
+        并发请求批量行情
+
+        Args:
+            prefixed_symbols: 带前缀的股票代码列表 (e.g., ["sh600519", "sz000001"])
+            batch_size: 每个请求包含的股票数
+
+        Returns:
+            list: 每批的响应文本, 失败的批次不包含在内
+        """
+        bodies, _ = self.fetch_universe(quote_symbols=prefixed_symbols, batch_size=batch_size)
+        return bodies
+
+    def fetch_minute_queries(self, prefixed_codes: List[str]) -> Dict[str, dict]:
+        """
+        并发请求分时数据
+
+        Args:
+            prefixed_codes: 带前缀的股票代码列表
+
+        Returns:
+            dict: {代码: 响应JSON}, 失败的代码不包含在内
+        """
+        _, payloads = self.fetch_universe(minute_codes=prefixed_codes)
+        return payloads
+
+    def fetch_universe(
+        self,
+        quote_symbols: Optional[List[str]] = None,
+        minute_codes: Optional[List[str]] = None,
+        batch_size: int = 80
+    ) -> Tuple[List[str], Dict[str, dict]]:
+        """
+        在同一个事件循环和连接池内同时请求批量行情和分时数据
+
+        Args:
+            quote_symbols: 需要批量行情的带前缀代码列表
+            minute_codes: 需要分时数据的带前缀代码列表
+            batch_size: 批量行情每个请求包含的股票数
+
+        Returns:
+            tuple: (批量行情响应文本列表, {代码: 分时JSON})
+        """
+        return self._run(self._fetch_universe(quote_symbols or [], minute_codes or [], batch_size))
+
+    @staticmethod
+    def _run(coro):
+        """运行协程; 若当前线程已有事件循环(如 Jupyter), 则在新线程中运行"""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coro)
+
+        result = {}
+
+        def runner():
+            try:
+                result['value'] = asyncio.run(coro)
+            except BaseException as e:
+                result['error'] = e
+
+        thread = threading.Thread(target=runner)
+        thread.start()
+        thread.join()
+        if 'error' in result:
+            raise result['error']
+        return result['value']
+
+    # ------------------------------------------------------------------
+    # 协程实现
+    # ------------------------------------------------------------------
+
+    def _new_session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(
+            limit=self.max_concurrency,
+            keepalive_timeout=self.keepalive_timeout
+        )
+        return aiohttp.ClientSession(
+            connector=connector,
+            headers=DEFAULT_HEADERS,
+            timeout=aiohttp.ClientTimeout(total=self.timeout)
+        )
+
+    async def _fetch_universe(
+        self,
+        quote_symbols: List[str],
+        minute_codes: List[str],
+        batch_size: int
+    ) -> Tuple[List[str], Dict[str, dict]]:
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        async with self._new_session() as session:
+            batches = [quote_symbols[i:i + batch_size] for i in range(0, len(quote_symbols), batch_size)]
+            quote_tasks = [
+                self._get(session, semaphore, QUOTE_URL.format(','.join(batch)), as_json=False)
+                for batch in batches
+            ]
+            minute_tasks = [
+                self._get(session, semaphore, MINUTE_URL.format(code), as_json=True)
+                for code in minute_codes
+            ]
+            results = await asyncio.gather(*quote_tasks, *minute_tasks)
+
+        quote_results = results[:len(quote_tasks)]
+        minute_results = results[len(quote_tasks):]
+        bodies = [body for body in quote_results if body]
+        payloads = {code: data for code, data in zip(minute_codes, minute_results) if data}
+        return bodies, payloads
+
+    async def _get(self, session: aiohttp.ClientSession, semaphore: asyncio.Semaphore, url: str, as_json: bool):
+        """发起单个 GET 请求, 失败返回 None"""
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                status, raw = await self._request(session, url)
+                metrics.record_http(url, status, len(raw), time.perf_counter() - start)
+                if status != 200:
+                    print(f"腾讯源请求失败: {status} {url}")
+                    return None
+                if as_json:
+                    return json.loads(raw)
+                # 行情接口返回 GBK 编码
+                return raw.decode('gbk', errors='replace')
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                metrics.record_http(url, None, 0, time.perf_counter() - start)
+                print(f"腾讯源请求异常: {e} {url}")
+                return None
+            except ValueError as e:
+                print(f"腾讯源请求异常: {e} {url}")
+                return None
+
+    @staticmethod
+    async def _request(session: aiohttp.ClientSession, url: str) -> Tuple[int, bytes]:
+        """返回 (状态码, 响应内容); 启用了录制/回放时经过 replay 模块"""
+        recorder = replay.active()
+        if recorder is not None and recorder.mode == 'replay':
+            await asyncio.sleep(recorder.delay())
+            try:
+                entry = recorder.serve('GET', url)
+            except replay.ReplayError as e:
+                raise aiohttp.ClientConnectionError(str(e))
+            return entry['status'], entry['content']
+
+        async with session.get(url) as resp:
+            raw = await resp.read()
+            if recorder is not None:
+                recorder.record('GET', url, None, resp.status, resp.headers, raw)
+            return resp.status, raw
@@ -0,0 +1,276 @@
+"""
+本地日线存储模块
+
+按股票代码分区的列式存储: 每只股票一个目录, 每列一个定长二进制文件,
+读取时通过 np.memmap 映射, 区间查询直接返回内存映射上的切片(零拷贝)。
+
+列文件带版本号 (meta.json 的 gen): 头部补齐时写入新版本的列文件, 最后原子替换
+meta.json 切换版本, 中途崩溃只会留下未被引用的新文件; 旧版本文件在切换后删除,
+已打开的内存映射不受影响。
+"""
+
+import json
+import os
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_STORE_DIR = os.path.join(str(Path(__file__).parent.parent.parent), "data", "bar_store", "daily")
+
+# 列名 -> (数据类型, get_stock_hist 返回的列名)
+COLUMNS = {
+    'date': ('<M8[D]', '日期'),
+    'open': ('<f8', '开盘'),
+    'high': ('<f8', '最高'),
+    'low': ('<f8', '最低'),
+    'close': ('<f8', '收盘'),
+    'volume': ('<f8', '成交量'),
+    'amount': ('<f8', 'amount'),
+    'turnover': ('<f8', 'turnover'),
+}
+
+META_FILE = "meta.json"
+
+# 写锁按 (存储根目录, 股票) 在进程内共享: 指向同一目录的多个 BarStore 实例互斥写入
+_LOCKS: Dict[Tuple[str, str], threading.Lock] = {}
+_LOCKS_GUARD = threading.Lock()
+
+
+def _to_day(date_str: str) -> np.datetime64:
+    """YYYYMMDD -> datetime64[D]"""
+    return np.datetime64(datetime.strptime(date_str, "%Y%m%d").date(), 'D')
+
+
+def _shift_date(date_str: str, days: int) -> str:
+    return (datetime.strptime(date_str, "%Y%m%d") + timedelta(days=days)).strftime("%Y%m%d")
+
+
+class BarStore:
+    """
+    本地日线存储
+
+    目录结构: <root>/<symbol>/<column>[.<gen>].bin + meta.json
+    meta.json 记录已覆盖的日期区间 [start, end]、有效行数和列文件版本,
+    覆盖区间内即使没有K线(停牌/节假日)也视为已同步, 不会重复请求。
+    """
+
+    def __init__(self, root: str = DEFAULT_STORE_DIR):
+        """
+        初始化
+
+        Args:
+            root: 存储根目录
+        """
+        self.root = root
+
+    def lock(self, symbol: str) -> threading.Lock:
+        """获取单只股票的写锁 (同一存储目录的所有实例共用)"""
+        key = (os.path.abspath(self.root), symbol)
+        with _LOCKS_GUARD:
+            if key not in _LOCKS:
+                _LOCKS[key] = threading.Lock()
+            return _LOCKS[key]
+
+    def _symbol_dir(self, symbol: str) -> str:
+        return os.path.join(self.root, symbol)
+
+    def _column_path(self, symbol: str, col: str, gen: int) -> str:
+        # 版本 0 沿用无版本号的文件名, 兼容已有数据
+        name = f"{col}.bin" if gen == 0 else f"{col}.{gen}.bin"
+        return os.path.join(self._symbol_dir(symbol), name)
+
+    def _read_meta(self, symbol: str) -> Optional[dict]:
+        meta_path = os.path.join(self._symbol_dir(symbol), META_FILE)
+        if not os.path.exists(meta_path):
+            return None
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_meta(self, symbol: str, meta: dict):
+        meta_path = os.path.join(self._symbol_dir(symbol), META_FILE)
+        tmp_path = meta_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, meta_path)
+
+    def coverage(self, symbol: str) -> Optional[Tuple[str, str]]:
+        """
+        获取已覆盖的日期区间
+
+        Args:
+            symbol: 带前缀的股票代码 (e.g., "sh600519")
+
+        Returns:
+            tuple: (start, end) 格式YYYYMMDD, 无数据返回None
+        """
+        meta = self._read_meta(symbol)
+        if not meta:
+            return None
+        return meta['start'], meta['end']
+
+    def missing_ranges(self, symbol: str, start_date: str, end_date: str) -> List[Tuple[str, str]]:
+        """
+        计算需要从网络补齐的日期区间
+
+        只补齐头部和尾部, 保证覆盖区间始终连续。
+
+        Args:
+            symbol: 带前缀的股票代码
+            start_date: 开始日期 格式YYYYMMDD
+            end_date: 结束日期 格式YYYYMMDD
+
+        Returns:
+            list: [(start, end), ...]
+        """
+        if start_date > end_date:
+            return []
+        cov = self.coverage(symbol)
+        if cov is None:
+            return [(start_date, end_date)]
+
+        cov_start, cov_end = cov
+        ranges = []
+        if start_date < cov_start:
+            ranges.append((start_date, _shift_date(cov_start, -1)))
+        if end_date > cov_end:
+            ranges.append((_shift_date(cov_end, 1), end_date))
+        return ranges
+
+    def query(self, symbol: str, start_date: str = "", end_date: str = "") -> Dict[str, np.ndarray]:
+        """
+        区间查询, 返回各列在内存映射上的切片(零拷贝视图)
+
+        Args:
+            symbol: 带前缀的股票代码
+            start_date: 开始日期 格式YYYYMMDD, 为空表示不限
+            end_date: 结束日期 格式YYYYMMDD, 为空表示不限
+
+        Returns:
+            dict: {列名: np.ndarray}, 无数据时各列为空数组
+        """
+        for attempt in range(2):
+            meta = self._read_meta(symbol)
+            rows = meta['rows'] if meta else 0
+            if rows == 0:
+                return {col: np.empty(0, dtype=dtype) for col, (dtype, _) in COLUMNS.items()}
+            gen = meta.get('gen', 0)
+            try:
+                arrays = {
+                    col: np.memmap(self._column_path(symbol, col, gen), dtype=dtype, mode='r', shape=(rows,))
+                    for col, (dtype, _) in COLUMNS.items()
+                }
+                break
+            except FileNotFoundError:
+                # 未持锁读取时恰好切换了版本, 重新读取 meta
+                if attempt:
+                    raise
+
+        dates = arrays['date']
+        lo = np.searchsorted(dates, _to_day(start_date), side='left') if start_date else 0
+        hi = np.searchsorted(dates, _to_day(end_date), side='right') if end_date else rows
+        return {col: arr[lo:hi] for col, arr in arrays.items()}
+
+    def read_frame(self, symbol: str, start_date: str = "", end_date: str = "") -> pd.DataFrame:
+        """
+        区间查询并转换为 get_stock_hist 格式的 DataFrame
+
+        Args:
+            symbol: 带前缀的股票代码
+            start_date: 开始日期 格式YYYYMMDD
+            end_date: 结束日期 格式YYYYMMDD
+
+        Returns:
+            pd.DataFrame: 历史数据
+        """
+        view = self.query(symbol, start_date, end_date)
+        df = pd.DataFrame({name: np.array(view[col]) for col, (_, name) in COLUMNS.items()})
+        df['日期'] = pd.to_datetime(df['日期'])
+        return df
+
+    def write(self, symbol: str, df: pd.DataFrame, start_date: str, end_date: str):
+        """
+        写入 [start_date, end_date] 区间的K线并扩展覆盖区间
+
+        尾部新数据直接追加到列文件末尾; 头部补齐时写入新版本的列文件,
+        再原子替换 meta.json 切换到新版本。调用方需持有 lock(symbol)。
+
+        Args:
+            symbol: 带前缀的股票代码
+            df: get_stock_hist 格式的K线数据
+            start_date: 本次数据覆盖的开始日期 格式YYYYMMDD
+            end_date: 本次数据覆盖的结束日期 格式YYYYMMDD
+        """
+        new_cols = self._frame_to_columns(df)
+        meta = self._read_meta(symbol)
+        symbol_dir = self._symbol_dir(symbol)
+        os.makedirs(symbol_dir, exist_ok=True)
+
+        old_gen = meta.get('gen', 0) if meta else 0
+        gen = old_gen
+        if meta is None or meta['rows'] == 0 or start_date < meta['start']:
+            # 首次写入或头部补齐: 合并后写入新版本的列文件, 不修改当前版本
+            if meta is not None and meta['rows'] > 0:
+                old_cols = {col: np.array(arr) for col, arr in self.query(symbol).items()}
+                merged = {col: np.concatenate([new_cols[col], old_cols[col]]) for col in COLUMNS}
+                _, keep = np.unique(merged['date'][::-1], return_index=True)
+                keep = len(merged['date']) - 1 - keep
+                new_cols = {col: arr[keep] for col, arr in merged.items()}
+            if meta is not None:
+                gen = old_gen + 1
+            for col in COLUMNS:
+                path = self._column_path(symbol, col, gen)
+                tmp_path = path + ".tmp"
+                new_cols[col].tofile(tmp_path)
+                os.replace(tmp_path, path)
+            rows = len(new_cols['date'])
+            start = start_date if meta is None else min(start_date, meta['start'])
+            end = end_date if meta is None else max(end_date, meta['end'])
+        else:
+            # 尾部追加: 只写入比已有最后一根更新的K线
+            rows = meta['rows']
+            last_date = self.query(symbol)['date'][-1]
+            mask = new_cols['date'] > last_date
+            for col, (dtype, _) in COLUMNS.items():
+                path = self._column_path(symbol, col, gen)
+                # 截掉上次中断写入可能残留的多余数据
+                with open(path, 'r+b') as f:
+                    f.truncate(rows * np.dtype(dtype).itemsize)
+                with open(path, 'ab') as f:
+                    new_cols[col][mask].tofile(f)
+            rows += int(mask.sum())
+            start = meta['start']
+            end = max(end_date, meta['end'])
+
+        self._write_meta(symbol, {'start': start, 'end': end, 'rows': rows, 'gen': gen})
+        if gen != old_gen:
+            # 切换完成后删除旧版本 (已打开的内存映射仍然有效; 删除失败时留待下次)
+            for col in COLUMNS:
+                try:
+                    os.remove(self._column_path(symbol, col, old_gen))
+                except OSError:
+                    pass
+
+    @staticmethod
+    def _frame_to_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+        """将 get_stock_hist 格式的 DataFrame 转为按日期升序的列数组"""
+        if df is None or df.empty:
+            return {col: np.empty(0, dtype=dtype) for col, (dtype, _) in COLUMNS.items()}
+
+        df = df.sort_values('日期').drop_duplicates('日期', keep='last')
+        cols = {'date': pd.to_datetime(df['日期']).values.astype('<M8[D]')}
+        for col, (dtype, name) in COLUMNS.items():
+            if col == 'date':
+                continue
+            if name in df.columns:
+                cols[col] = pd.to_numeric(df[name], errors='coerce').to_numpy(dtype=dtype)
+            else:
+                cols[col] = np.full(len(df), np.nan, dtype=dtype)
+        return cols
@@ -0,0 +1,97 @@
+"""
+按交易日缓存的全市场表格
+
+资金流排行、北向持股排行这类接口一次返回全市场当日数据, 收盘后不再变化。
+每张表每个交易日下载一次, 保存为 <root>/<name>/<date>.csv, 之后直接读取。
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+import pandas as pd
+
+from ..utils import metrics
+
+
+DEFAULT_DAILY_CACHE_DIR = os.path.join(str(Path(__file__).parent.parent.parent), "data", "daily_cache")
+
+
+class DailyTableCache:
+    """
+    全市场表格的按日缓存
+
+    表格需含 code 列 (6位纯代码), 读取时按字符串解析以保留前导零。
+    """
+
+    def __init__(self, root: str = DEFAULT_DAILY_CACHE_DIR):
+        """
+        初始化
+
+        Args:
+            root: 缓存根目录
+        """
+        self.root = root
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+    def _lock(self, key: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(key, threading.Lock())
+
+    def _path(self, name: str, date: str) -> str:
+        return os.path.join(self.root, name, f"{date}.csv")
+
+    def get(self, name: str, date: str, loader: Callable[[], pd.DataFrame], persist: bool = True) -> pd.DataFrame:
+        """
+        读取缓存, 缺失时调用 loader 下载
+
+        Args:
+            name: 表名 (e.g., "fund_flow")
+            date: 交易日 YYYYMMDD
+            loader: 下载函数, 返回 DataFrame
+            persist: 是否保存下载结果 (盘中数据仍在变化时传 False)
+
+        Returns:
+            pd.DataFrame: 表格, 下载失败时为空
+        """
+        path = self._path(name, date)
+        # 同一张表的并发请求只下载一次
+        with self._lock(f"{name}/{date}"):
+            if os.path.exists(path):
+                try:
+                    df = pd.read_csv(path, dtype={'code': str})
+                    metrics.incr(f'cache.{name}.hit')
+                    return df
+                except (OSError, ValueError) as e:
+                    print(f"读取缓存失败 {path}: {e}")
+
+            metrics.incr(f'cache.{name}.miss')
+            try:
+                df = loader()
+            except Exception as e:
+                print(f"获取{name}失败: {e}")
+                return pd.DataFrame()
+            if df is None or df.empty:
+                return pd.DataFrame()
+
+            if persist:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                tmp_path = path + ".tmp"
+                df.to_csv(tmp_path, index=False)
+                os.replace(tmp_path, path)
+            return df
+
+
+_default_cache: Optional[DailyTableCache] = None
+_default_lock = threading.Lock()
+
+
+def get_daily_cache() -> DailyTableCache:
+    """获取进程内共享的默认按日缓存"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = DailyTableCache()
+        return _default_cache
@@ -0,0 +1,212 @@
+"""
+融资融券本地存储模块
+
+交易所公布的历史两融数据不会再变化, 每个交易日只需下载一次。
+汇总数据 (沪市/深市融资余额) 按交易所各存一个 CSV, 每行一个交易日,
+调用方只需为缺失的日期请求接口。
+明细数据 (全市场每只两融标的一行) 按交易日各存一个列式 .npz 文件。
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+
+
+DEFAULT_MARGIN_DIR = os.path.join(str(Path(__file__).parent.parent.parent), "data", "margin_store")
+
+EXCHANGES = ('sh', 'sz')
+
+# 明细列名 -> 存储类型 (与 fetch_margin_data 的输出列一致)
+DETAIL_FIELDS = {
+    'code': 'U6',
+    'name': 'U16',
+    'market': 'U2',
+    'margin_buy': '<f8',
+    'margin_balance': '<f8',
+    'margin_net_buy': '<f8',
+    'margin_total': '<f8',
+}
+
+
+class MarginStore:
+    """
+    两融数据存储
+
+    目录结构:
+        <root>/summary_<exchange>.csv   列为 date (YYYYMMDD) 和 balance_yi (融资余额, 亿元)
+        <root>/detail/<date>.npz        当日全市场明细, 各列为定长数组 (见 DETAIL_FIELDS)
+    """
+
+    def __init__(self, root: str = DEFAULT_MARGIN_DIR):
+        """
+        初始化
+
+        Args:
+            root: 存储根目录
+        """
+        self.root = root
+        self._lock = threading.Lock()
+        self._summary: Dict[str, Dict[str, float]] = {}
+
+    def _summary_path(self, exchange: str) -> str:
+        return os.path.join(self.root, f"summary_{exchange}.csv")
+
+    def _load_summary(self, exchange: str) -> Dict[str, float]:
+        if exchange not in EXCHANGES:
+            raise ValueError(f"未知交易所: {exchange}")
+        if exchange not in self._summary:
+            values = {}
+            path = self._summary_path(exchange)
+            if os.path.exists(path):
+                try:
+                    df = pd.read_csv(path, dtype={'date': str})
+                    values = dict(zip(df['date'], df['balance_yi'].astype(float)))
+                except (OSError, KeyError, ValueError) as e:
+                    print(f"读取两融汇总缓存失败: {e}")
+            self._summary[exchange] = values
+        return self._summary[exchange]
+
+    def summary(self, exchange: str, dates: Iterable[str]) -> Dict[str, float]:
+        """
+        读取已缓存的融资余额
+
+        Args:
+            exchange: 'sh' / 'sz'
+            dates: 日期列表 YYYYMMDD
+
+        Returns:
+            dict: {日期: 融资余额(亿元)}, 只含已缓存的日期
+        """
+        with self._lock:
+            values = self._load_summary(exchange)
+            return {d: values[d] for d in dates if d in values}
+
+    def missing_summary_dates(self, exchange: str, dates: Iterable[str]) -> List[str]:
+        """
+        需要从网络补齐的日期
+
+        Args:
+            exchange: 'sh' / 'sz'
+            dates: 日期列表 YYYYMMDD
+
+        Returns:
+            list: 未缓存的日期, 保持传入顺序
+        """
+        with self._lock:
+            values = self._load_summary(exchange)
+            return [d for d in dates if d not in values]
+
+    def write_summary(self, exchange: str, values: Dict[str, float]):
+        """
+        写入融资余额 (同日期覆盖)
+
+        Args:
+            exchange: 'sh' / 'sz'
+            values: {日期 YYYYMMDD: 融资余额(亿元)}
+        """
+        if not values:
+            return
+        with self._lock:
+            merged = self._load_summary(exchange)
+            merged.update({str(d): float(v) for d, v in values.items()})
+            os.makedirs(self.root, exist_ok=True)
+            path = self._summary_path(exchange)
+            tmp_path = path + ".tmp"
+            pd.DataFrame(sorted(merged.items()), columns=['date', 'balance_yi']).to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+    # ------------------------------------------------------------------
+    # 明细
+    # ------------------------------------------------------------------
+
+    def _detail_path(self, date: str) -> str:
+        return os.path.join(self.root, "detail", f"{date}.npz")
+
+    def detail_dates(self) -> List[str]:
+        """
+        已归档明细的日期
+
+        Returns:
+            list: 日期 YYYYMMDD, 升序
+        """
+        detail_dir = os.path.join(self.root, "detail")
+        if not os.path.isdir(detail_dir):
+            return []
+        return sorted(name[:-4] for name in os.listdir(detail_dir) if name.endswith(".npz") and name[:-4].isdigit())
+
+    def write_detail(self, date: str, df: pd.DataFrame):
+        """
+        归档一个交易日的全市场明细
+
+        按交易所覆盖: df 中出现的交易所替换已归档的同交易所数据, 其余交易所保留。
+
+        Args:
+            date: 日期 YYYYMMDD
+            df: fetch_margin_data(full_market=True) 格式的明细
+        """
+        if df is None or df.empty:
+            return
+        existing = self.read_detail(date)
+        if not existing.empty:
+            existing = existing[~existing['market'].isin(df['market'].unique())]
+            df = pd.concat([existing, df], ignore_index=True)
+        path = self._detail_path(date)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, **{
+            col: df[col].fillna('' if dtype.startswith('U') else np.nan).to_numpy(dtype=dtype)
+            for col, dtype in DETAIL_FIELDS.items()
+        })
+        os.replace(tmp_path, path)
+
+    def read_detail(self, date: str) -> pd.DataFrame:
+        """
+        读取一个交易日的明细
+
+        Args:
+            date: 日期 YYYYMMDD
+
+        Returns:
+            pd.DataFrame: DETAIL_FIELDS 各列加 date 列, 未归档时为空
+        """
+        path = self._detail_path(date)
+        if not os.path.exists(path):
+            return pd.DataFrame()
+        try:
+            with np.load(path) as data:
+                df = pd.DataFrame({col: data[col] for col in DETAIL_FIELDS})
+        except (OSError, KeyError, ValueError) as e:
+            print(f"读取两融明细失败 {date}: {e}")
+            return pd.DataFrame()
+        df['date'] = date
+        return df
+
+    def read_details(self, dates: Iterable[str]) -> pd.DataFrame:
+        """
+        读取多个交易日的明细并纵向拼接
+
+        Args:
+            dates: 日期列表 YYYYMMDD
+
+        Returns:
+            pd.DataFrame: 明细, 未归档的日期被跳过
+        """
+        frames = [df for df in (self.read_detail(d) for d in dates) if not df.empty]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+_default_store: Optional[MarginStore] = None
+_default_lock = threading.Lock()
+
+
+def get_margin_store() -> MarginStore:
+    """获取进程内共享的默认两融存储"""
+    global _default_store
+    with _default_lock:
+        if _default_store is None:
+            _default_store = MarginStore()
+        return _default_store
@@ -0,0 +1,157 @@
+"""
+腾讯批量行情解析模块
+
+qt.gtimg.cn 每行格式为 v_sh600519="1~贵州茅台~600519~...";
+每行只切分到所需的最大字段下标, 按预先编译的字段下标整列取出,
+一次性转换为 NumPy 数值列, 不逐行构造 dict。
+"""
+
+import re
+from operator import itemgetter
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# 列名 -> (字段下标, 单位换算系数, 空字段默认值)
+# 换算系数为 None 表示文本列; 默认值为 None 表示该字段必须是有效数字, 否则整行视为异常
+REALTIME_FIELDS = {
+    '代码': (2, None, None),
+    '名称': (1, None, None),
+    '最新价': (3, 1, None),
+    '涨跌幅': (32, 1, None),
+    '成交量': (6, 1, None),            # 手
+    '成交额': (37, 10000, None),        # 万 -> 元
+    '总市值': (45, 100000000, None),    # 亿 -> 元
+    '换手率': (38, 1, 0.0),
+    '最高': (33, 1, None),
+    '最低': (34, 1, None),
+    '今开': (5, 1, None),
+    '昨收': (4, 1, None),
+}
+
+# 全市场快照额外保留行情时间戳
+SNAPSHOT_FIELDS = {**REALTIME_FIELDS, '时间': (30, None, None)}
+
+_ROW_RE = re.compile(r'v_(\w+)="([^"]*)"')
+
+
+class QuoteParser:
+    """腾讯批量行情解析器"""
+
+    def __init__(
+        self,
+        fields: Dict[str, Tuple[int, Optional[float], Optional[float]]] = REALTIME_FIELDS,
+        symbol_column: Optional[str] = None
+    ):
+        """
+        初始化, 预先编译字段下标
+
+        Args:
+            fields: 列名 -> (字段下标, 单位换算系数, 空字段默认值), 见 REALTIME_FIELDS
+            symbol_column: 若指定, 额外输出一列带前缀的代码 (取自 v_sh600519 中的 sh600519)
+        """
+        self.fields = fields
+        self.symbol_column = symbol_column
+        self.columns = list(fields)
+        self.offsets = np.array([spec[0] for spec in fields.values()])
+        self.min_fields = int(self.offsets.max()) + 1
+        self.getters = [itemgetter(int(offset)) for offset in self.offsets]
+        self.numeric = [i for i, spec in enumerate(fields.values()) if spec[1] is not None]
+        self.scales = np.array([fields[self.columns[i]][1] for i in self.numeric], dtype=np.float64)
+        self.defaults = [fields[self.columns[i]][2] for i in self.numeric]
+
+    @staticmethod
+    def split_rows(bodies: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        提取每行的带前缀代码和引号内的内容, 跳过不存在的代码 (v_pv_none_match)
+
+        Returns:
+            tuple: (带前缀代码列表, 内容列表)
+        """
+        symbols, contents = [], []
+        for body in bodies:
+            for symbol, content in _ROW_RE.findall(body):
+                if symbol.startswith('pv_none'):
+                    continue
+                symbols.append(symbol)
+                contents.append(content)
+        return symbols, contents
+
+    def _field_columns(self, contents: List[str]) -> Tuple[List[list], np.ndarray]:
+        """
+        每行只切分到所需的最大字段下标, 再按预编译下标逐列取出
+
+        Returns:
+            tuple: (各列的字符串列表, 字段数足够的行的掩码), 字段数不足的行不包含在列中
+        """
+        rows = [c.split('~', self.min_fields) for c in contents]
+        lengths = np.fromiter(map(len, rows), dtype=np.int64, count=len(rows))
+        enough = lengths >= self.min_fields
+        if not enough.all():
+            rows = [row for row, ok in zip(rows, enough.tolist()) if ok]
+        return [list(map(getter, rows)) for getter in self.getters], enough
+
+    @staticmethod
+    def _to_float(raw: list) -> np.ndarray:
+        """字符串列表转 float64, 无法解析的值为 NaN"""
+        try:
+            return np.array(raw, dtype=np.float64)
+        except ValueError:
+            return pd.to_numeric(np.array(raw, dtype=object), errors='coerce').astype(np.float64)
+
+    def parse(self, bodies: Iterable[str]) -> Tuple[pd.DataFrame, int]:
+        """
+        解析批量行情响应
+
+        Args:
+            bodies: qt.gtimg.cn 响应文本列表
+
+        Returns:
+            tuple: (行情 DataFrame, 异常行数); 异常行包括字段数不足和必需数值字段无法解析的行
+        """
+        symbols, contents = self.split_rows(bodies)
+        names = ([self.symbol_column] if self.symbol_column else []) + self.columns
+        if not contents:
+            return pd.DataFrame(columns=names), 0
+
+        columns, enough = self._field_columns(contents)
+        valid = np.ones(int(enough.sum()), dtype=bool)
+
+        for k, i in enumerate(self.numeric):
+            raw = columns[i]
+            col = self._to_float(raw)
+            bad = np.isnan(col)
+            if self.defaults[k] is not None:
+                empty = np.array(raw, dtype=object) == ''
+                col[empty] = self.defaults[k]
+                bad &= ~empty
+            valid &= ~bad
+            columns[i] = col * self.scales[k] if self.scales[k] != 1 else col
+
+        columns = [col if i in self.numeric else np.array(col, dtype=object) for i, col in enumerate(columns)]
+        if self.symbol_column:
+            columns.insert(0, np.array(symbols, dtype=object)[enough])
+        if not valid.all():
+            columns = [col[valid] for col in columns]
+        data = dict(zip(names, columns))
+        malformed = len(contents) - int(valid.sum())
+        return pd.DataFrame(data, columns=names), malformed
+
+
+# 默认的实时行情解析器 (字段与 get_stock_realtime_batch 返回的列一致)
+REALTIME_PARSER = QuoteParser()
+
+
+def parse_quotes(bodies: Iterable[str]) -> Tuple[pd.DataFrame, int]:
+    """
+    按 REALTIME_FIELDS 解析批量行情
+
+    Args:
+        bodies: qt.gtimg.cn 响应文本列表
+
+    Returns:
+        tuple: (行情 DataFrame, 异常行数)
+    """
+    return REALTIME_PARSER.parse(bodies)
@@ -0,0 +1,274 @@
+"""
+按数据源的自适应限流与重试
+
+每个数据源 (eastmoney / sina / tencent / szse / sse ...) 一个 HostLimiter:
+- 令牌桶: 限制请求速率 (每秒请求数, 允许一定突发)
+- AIMD 并发窗口: 请求成功时窗口缓慢增大 (每满一个窗口 +1), 失败 (限流、超时、
+  接口返回异常页面导致的解析错误) 时减半, 并发数因此收敛到数据源能承受的上限
+- 失败预算: 最近一段时间内失败过多时不再重试, 避免数据源故障时反复请求
+
+交易所尚未公布某日数据时, akshare 拿到空页面后在解析阶段抛出异常。这类
+"无数据" 由 limited_call(missing_ok=True) 作为空结果返回, 不计入数据源失败。
+
+limited_call 在限流下调用 akshare 等接口, 失败时按指数退避 (带抖动) 重试;
+run_batch 用线程池并发执行一批任务, 首轮失败的任务在最后统一再跑一轮,
+而不是直接丢弃。限流只在 limited_call 中进行, run_batch 只负责调度,
+因此任务函数内部可以调用多个数据源而不会互相占用并发名额。
+"""
+
+import collections
+import concurrent.futures
+import random
+import threading
+import time
+from typing import Callable, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import pandas as pd
+import requests
+
+from ..utils import metrics
+
+
+# 数据源 -> (每秒请求数, 突发数, 初始并发, 最大并发)
+SOURCE_LIMITS = {
+    'eastmoney': (20.0, 20, 8, 24),
+    'sina': (10.0, 10, 6, 16),
+    'tencent': (20.0, 20, 8, 24),
+    'szse': (5.0, 5, 2, 4),
+    'sse': (5.0, 5, 2, 4),
+}
+DEFAULT_LIMITS = (10.0, 10, 4, 8)
+
+# 失败预算: FAILURE_WINDOW 秒内失败超过 FAILURE_BUDGET 次后不再重试
+FAILURE_BUDGET = 30
+FAILURE_WINDOW = 60.0
+
+# 重试: 第 n 次重试前等待 min(BACKOFF_MAX, BACKOFF_BASE * 2**n) * [0.5, 1.5) 秒
+DEFAULT_RETRIES = 2
+BACKOFF_BASE = 0.5
+BACKOFF_MAX = 8.0
+
+# 两次并发窗口减半之间的最短间隔 (同一波失败只减一次)
+DECREASE_COOLDOWN = 1.0
+
+# akshare 解析空页面时抛出的异常类型 (requests 的网络/解码异常除外)
+NO_DATA_ERRORS = (KeyError, IndexError, ValueError, AttributeError)
+
+
+def _is_no_data(error: Exception) -> bool:
+    """异常是否表示接口正常返回了空页面 (而不是网络错误或限流页面)"""
+    return isinstance(error, NO_DATA_ERRORS) and not isinstance(error, requests.RequestException)
+
+
+class TokenBucket:
+    """令牌桶"""
+
+    def __init__(self, rate: float, burst: int):
+        """
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量
+        """
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> float:
+        """
+        取一个令牌, 不足时等待
+
+        Returns:
+            float: 等待时间(秒)
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+                self._last = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return waited
+                delay = (1 - self._tokens) / self.rate
+            time.sleep(delay)
+            waited += delay
+
+
+class HostLimiter:
+    """单个数据源的令牌桶 + AIMD 并发窗口 + 失败预算"""
+
+    def __init__(self, source: str, rate: float, burst: int, concurrency: int, max_concurrency: int,
+                 min_concurrency: int = 1):
+        """
+        Args:
+            source: 数据源名称
+            rate: 每秒请求数
+            burst: 令牌桶容量
+            concurrency: 初始并发窗口
+            max_concurrency: 并发窗口上限 (也是 run_batch 的线程数)
+            min_concurrency: 并发窗口下限
+        """
+        self.source = source
+        self.bucket = TokenBucket(rate, burst)
+        self.window = float(concurrency)
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self._in_flight = 0
+        self._last_decrease = 0.0
+        self._failures = collections.deque()
+        self._budget_reported = False
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """等待并发名额和令牌"""
+        start = time.monotonic()
+        with self._cond:
+            while self._in_flight >= int(self.window):
+                self._cond.wait()
+            self._in_flight += 1
+        self.bucket.acquire()
+        waited = time.monotonic() - start
+        if waited > 0.001:
+            metrics.incr(f'ratelimit.{self.source}.wait_s', waited)
+
+    def release(self, success: bool):
+        """释放并发名额并按结果调整窗口"""
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if success:
+                # 加性增: 每成功一个窗口的请求, 窗口 +1
+                self.window = min(self.max_concurrency, self.window + 1 / self.window)
+            else:
+                self._failures.append(now)
+                if now - self._last_decrease >= DECREASE_COOLDOWN:
+                    # 乘性减
+                    self.window = max(self.min_concurrency, self.window / 2)
+                    self._last_decrease = now
+                    metrics.incr(f'ratelimit.{self.source}.decrease')
+            self._cond.notify_all()
+
+    def budget_left(self) -> bool:
+        """失败预算是否还有剩余 (用尽时不再重试)"""
+        with self._cond:
+            cutoff = time.monotonic() - FAILURE_WINDOW
+            while self._failures and self._failures[0] < cutoff:
+                self._failures.popleft()
+            exhausted = len(self._failures) >= FAILURE_BUDGET
+            if exhausted and not self._budget_reported:
+                print(f"[RateLimit] {self.source}: {FAILURE_WINDOW:.0f}s 内失败 {len(self._failures)} 次, 暂停重试")
+                metrics.incr(f'ratelimit.{self.source}.budget_exhausted')
+            self._budget_reported = exhausted
+            return not exhausted
+
+
+_limiters: Dict[str, HostLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(source: str) -> HostLimiter:
+    """获取进程内共享的数据源限流器"""
+    with _limiters_lock:
+        if source not in _limiters:
+            rate, burst, concurrency, max_concurrency = SOURCE_LIMITS.get(source, DEFAULT_LIMITS)
+            _limiters[source] = HostLimiter(source, rate, burst, concurrency, max_concurrency)
+        return _limiters[source]
+
+
+def backoff_delay(attempt: int) -> float:
+    """第 attempt 次重试前的等待时间(秒)"""
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt) * random.uniform(0.5, 1.5)
+
+
+def limited_call(source: str, func: Callable, *args, retries: int = DEFAULT_RETRIES, missing_ok: bool = False,
+                 **kwargs):
+    """
+    在数据源限流下调用 func, 失败时指数退避重试
+
+    Args:
+        source: 数据源名称 (见 SOURCE_LIMITS)
+        func: 被调用的函数 (e.g., ak.stock_lhb_stock_detail_em)
+        retries: 最多重试次数, 失败预算用尽时不再重试
+        missing_ok: 数据可能尚未公布 (如按日期查询的交易所数据), 解析空页面的异常视为无数据
+        *args, **kwargs: 传给 func
+
+    Returns:
+        func 的返回值; missing_ok 且无数据时为空 DataFrame
+
+    Raises:
+        最后一次调用的异常
+    """
+    limiter = get_limiter(source)
+    attempt = 0
+    while True:
+        limiter.acquire()
+        try:
+            result = func(*args, **kwargs)
+        except Exception as e:
+            if missing_ok and _is_no_data(e):
+                # 数据源正常响应, 只是没有数据
+                limiter.release(True)
+                metrics.incr(f'ratelimit.{source}.no_data')
+                return pd.DataFrame()
+            limiter.release(False)
+            metrics.incr(f'errors.{source}')
+            if attempt >= retries or not limiter.budget_left():
+                raise
+            metrics.incr(f'retry.{source}')
+            time.sleep(backoff_delay(attempt))
+            attempt += 1
+            continue
+        limiter.release(True)
+        return result
+
+
+def run_batch(func: Callable, items: Iterable[Hashable], source: str, retry_rounds: int = 1,
+              progress: Optional[Callable[[int, int], None]] = None) -> Tuple[Dict, List]:
+    """
+    并发执行 func(item), 失败的任务在本轮结束后再跑 retry_rounds 轮
+
+    线程数取数据源的最大并发, 实际并发由 func 内部的 limited_call 控制。
+
+    Args:
+        func: 任务函数, 失败时抛出异常
+        items: 任务参数 (需可哈希, 作为结果的键)
+        source: 主要访问的数据源, 决定线程数和失败预算
+        retry_rounds: 失败任务的补跑轮数
+        progress: 进度回调 progress(完成数, 总数)
+
+    Returns:
+        tuple: ({item: 结果}, [最终失败的 item])
+    """
+    limiter = get_limiter(source)
+    pending = list(items)
+    total = len(pending)
+    results = {}
+    completed = 0
+
+    for round_no in range(retry_rounds + 1):
+        if not pending:
+            break
+        if round_no > 0:
+            if not limiter.budget_left():
+                break
+            print(f"[RateLimit] {source}: 补跑 {len(pending)} 个失败任务 (第 {round_no} 轮)")
+            metrics.incr(f'retry.{source}.batch', len(pending))
+            time.sleep(backoff_delay(round_no))
+
+        failed = []
+        with concurrent.futures.ThreadPoolExecutor(max_workers=limiter.max_concurrency) as executor:
+            futures = {executor.submit(func, item): item for item in pending}
+            for future in concurrent.futures.as_completed(futures):
+                item = futures[future]
+                try:
+                    results[item] = future.result()
+                    completed += 1
+                    if progress:
+                        progress(completed, total)
+                except Exception:
+                    failed.append(item)
+        pending = failed
+
+    return results, pending
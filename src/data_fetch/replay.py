@@ -0,0 +1,317 @@
+"""
+HTTP 录制/回放
+
+录制模式下记录所有经 requests (含 akshare 内部请求) 和 AsyncFetchEngine 发出的请求及响应;
+回放模式下不访问网络, 直接从存档返回响应, 可注入固定/随机延迟和随机错误,
+用于收盘后离线压测和可重复的吞吐量测量。
+
+存档为一个目录, 每个进程写一个 gzip 压缩的 JSON Lines 文件 (并行运行的服务互不干扰),
+回放时合并读取。请求按 方法 + URL(查询参数排序, 忽略时间戳/回调等易变参数) + 请求体 匹配;
+精确匹配失败时忽略 URL 中的日期再匹配, 以便在录制日之后回放。
+同一请求录制了多次时按录制顺序依次返回, 用完后重复最后一条。
+
+启用方式:
+- 代码内: install('record' / 'replay', 存档目录, ...)
+- 子进程: 设置 AIQUANT_REPLAY_* 环境变量后运行 python -m src.data_fetch.replay_run <脚本> [参数...]
+"""
+
+import atexit
+import base64
+import gzip
+import hashlib
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from typing import Dict, List, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+
+MODES = ('record', 'replay')
+
+ENV_MODE = 'AIQUANT_REPLAY_MODE'
+ENV_ARCHIVE = 'AIQUANT_REPLAY_ARCHIVE'
+ENV_LATENCY = 'AIQUANT_REPLAY_LATENCY'
+ENV_JITTER = 'AIQUANT_REPLAY_JITTER'
+ENV_ERROR_RATE = 'AIQUANT_REPLAY_ERROR_RATE'
+ENV_SEED = 'AIQUANT_REPLAY_SEED'
+ENV_LABEL = 'AIQUANT_REPLAY_LABEL'
+
+# 每次请求都会变化的查询参数 (时间戳, JSONP 回调名), 不参与匹配
+VOLATILE_PARAMS = {'_', 'cb', 'callback', 'jsonp', 'r', 'rnd', 'random', 't'}
+
+# 只保留影响解码的响应头; 存档中的内容已解压, 不保留 Content-Encoding/Length
+KEPT_HEADERS = ('Content-Type',)
+
+_DATE_PATTERN = re.compile(r'(?<!\d)(?:19|20)\d{2}-?[01]\d-?[0-3]\d(?!\d)')
+
+
+def request_key(method: str, url: str, body=None) -> str:
+    """
+    请求的匹配键
+
+    Args:
+        method: HTTP 方法
+        url: 完整 URL
+        body: 请求体 (str/bytes/None)
+
+    Returns:
+        str: "METHOD URL" (查询参数已排序), 有请求体时追加其 SHA1
+    """
+    parts = urlsplit(url)
+    query = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k not in VOLATILE_PARAMS)
+    key = f"{method.upper()} {urlunsplit((parts.scheme, parts.netloc, parts.path, urlencode(query), ''))}"
+    if isinstance(body, str):
+        body = body.encode('utf-8')
+    if isinstance(body, bytes) and body:
+        key += ' ' + hashlib.sha1(body).hexdigest()
+    return key
+
+
+def dateless_key(key: str) -> str:
+    """去掉匹配键中的日期 (YYYYMMDD / YYYY-MM-DD)"""
+    return _DATE_PATTERN.sub('<date>', key)
+
+
+class ReplayError(ConnectionError):
+    """回放未命中或注入的错误"""
+
+
+class HttpReplay:
+    """录制/回放状态 (线程安全)"""
+
+    def __init__(
+        self,
+        mode: str,
+        archive: str,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        seed: int = 0,
+        label: Optional[str] = None
+    ):
+        """
+        初始化
+
+        Args:
+            mode: 'record' 或 'replay'
+            archive: 存档目录
+            latency: 回放时每个请求的固定延迟(秒)
+            jitter: 回放时在固定延迟上叠加的 [0, jitter) 均匀随机延迟(秒)
+            error_rate: 回放时请求以该概率失败 (抛出连接错误)
+            seed: 延迟与错误注入的随机种子, 相同种子的两次回放注入位置相同
+            label: 录制文件名前缀 (默认 "proc")
+        """
+        if mode not in MODES:
+            raise ValueError(f"未知模式: {mode}, 可选: {', '.join(MODES)}")
+        self.mode = mode
+        self.archive = archive
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.stats = {'recorded': 0, 'served': 0, 'missed': 0, 'injected': 0}
+
+        self._lock = threading.Lock()
+        self._rng = random.Random(seed)
+        self._file = None
+        self._label = label or 'proc'
+        self._exact: Dict[str, List[dict]] = defaultdict(list)
+        self._dateless: Dict[str, List[dict]] = defaultdict(list)
+        self._cursor: Dict[str, int] = defaultdict(int)
+
+        if mode == 'replay':
+            self._load()
+
+    # ---- 录制 ----
+
+    def record(self, method: str, url: str, body, status: int, headers, content: bytes):
+        """
+        追加一条响应到存档
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL
+            body: 请求体
+            status: 响应状态码
+            headers: 响应头 (只保存 KEPT_HEADERS)
+            content: 响应内容 (已解压)
+        """
+        entry = {
+            'key': request_key(method, url, body),
+            'status': status,
+            'headers': {name: headers[name] for name in KEPT_HEADERS if name in headers},
+            'content': base64.b64encode(content or b'').decode('ascii'),
+        }
+        line = json.dumps(entry, ensure_ascii=False) + '\n'
+        with self._lock:
+            if self._file is None:
+                os.makedirs(self.archive, exist_ok=True)
+                path = os.path.join(self.archive, f"{self._label}-{os.getpid()}.jsonl.gz")
+                self._file = gzip.open(path, 'at', encoding='utf-8')
+            self._file.write(line)
+            self.stats['recorded'] += 1
+
+    def close(self):
+        """关闭录制文件 (进程退出时自动调用)"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    # ---- 回放 ----
+
+    def _load(self):
+        if not os.path.isdir(self.archive):
+            raise FileNotFoundError(f"回放存档不存在: {self.archive}")
+        for name in sorted(os.listdir(self.archive)):
+            if not name.endswith('.jsonl.gz'):
+                continue
+            with gzip.open(os.path.join(self.archive, name), 'rt', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 录制进程被强制结束时最后一行可能不完整
+                        continue
+                    entry['content'] = base64.b64decode(entry['content'])
+                    self._exact[entry['key']].append(entry)
+                    self._dateless[dateless_key(entry['key'])].append(entry)
+
+    def serve(self, method: str, url: str, body=None) -> dict:
+        """
+        取出一条录制的响应
+
+        Args:
+            method: HTTP 方法
+            url: 完整 URL
+            body: 请求体
+
+        Returns:
+            dict: {'status', 'headers', 'content'}
+
+        Raises:
+            ReplayError: 存档中没有该请求, 或命中了错误注入
+        """
+        key = request_key(method, url, body)
+        with self._lock:
+            if self.error_rate and self._rng.random() < self.error_rate:
+                self.stats['injected'] += 1
+                raise ReplayError(f"注入错误: {url}")
+            for table, k in ((self._exact, key), (self._dateless, dateless_key(key))):
+                entries = table.get(k)
+                if entries:
+                    cursor = self._cursor[k]
+                    self._cursor[k] = cursor + 1
+                    self.stats['served'] += 1
+                    return entries[min(cursor, len(entries) - 1)]
+            self.stats['missed'] += 1
+        raise ReplayError(f"回放存档中没有该请求: {key}")
+
+    def delay(self) -> float:
+        """本次回放请求的延迟(秒)"""
+        if not self.jitter:
+            return self.latency
+        with self._lock:
+            return self.latency + self._rng.random() * self.jitter
+
+    def summary(self) -> str:
+        if self.mode == 'record':
+            return f"录制: {self.stats['recorded']} 个响应 -> {self.archive}"
+        return (f"回放: 命中 {self.stats['served']}, 未命中 {self.stats['missed']}, "
+                f"注入错误 {self.stats['injected']}")
+
+
+# ---- 安装 ----
+
+_ACTIVE: Optional[HttpReplay] = None
+_ORIGINAL_SEND = None
+
+
+def active() -> Optional[HttpReplay]:
+    """当前进程启用的录制/回放, 未启用返回 None"""
+    return _ACTIVE
+
+
+def install(mode: str, archive: str, **kwargs) -> HttpReplay:
+    """
+    在当前进程启用录制/回放
+
+    requests 通过替换 HTTPAdapter.send 接入 (akshare 的请求也经过这里),
+    AsyncFetchEngine 在发请求前检查 active()。
+
+    Args:
+        mode: 'record' 或 'replay'
+        archive: 存档目录
+        **kwargs: 传给 HttpReplay (latency, jitter, error_rate, seed, label)
+
+    Returns:
+        HttpReplay: 启用的实例
+    """
+    global _ACTIVE, _ORIGINAL_SEND
+    import requests.adapters
+
+    if _ACTIVE is not None:
+        _ACTIVE.close()
+    _ACTIVE = HttpReplay(mode, archive, **kwargs)
+    if _ORIGINAL_SEND is None:
+        _ORIGINAL_SEND = requests.adapters.HTTPAdapter.send
+        requests.adapters.HTTPAdapter.send = _send
+        atexit.register(_at_exit)
+    return _ACTIVE
+
+
+def install_from_env() -> Optional[HttpReplay]:
+    """按 AIQUANT_REPLAY_* 环境变量启用; 未设置 AIQUANT_REPLAY_MODE 时不做任何事"""
+    mode = os.environ.get(ENV_MODE)
+    if not mode:
+        return None
+    return install(
+        mode,
+        os.environ[ENV_ARCHIVE],
+        latency=float(os.environ.get(ENV_LATENCY, 0)),
+        jitter=float(os.environ.get(ENV_JITTER, 0)),
+        error_rate=float(os.environ.get(ENV_ERROR_RATE, 0)),
+        seed=int(os.environ.get(ENV_SEED, 0)),
+        label=os.environ.get(ENV_LABEL),
+    )
+
+
+def _at_exit():
+    if _ACTIVE is not None:
+        _ACTIVE.close()
+        print(_ACTIVE.summary())
+
+
+def _send(adapter, request, **kwargs):
+    """替换后的 HTTPAdapter.send"""
+    import requests
+    from requests.structures import CaseInsensitiveDict
+    from requests.utils import get_encoding_from_headers
+
+    replay = _ACTIVE
+    if replay is None:
+        return _ORIGINAL_SEND(adapter, request, **kwargs)
+    if replay.mode == 'record':
+        resp = _ORIGINAL_SEND(adapter, request, **kwargs)
+        replay.record(request.method, request.url, request.body, resp.status_code, resp.headers, resp.content)
+        return resp
+
+    time.sleep(replay.delay())
+    try:
+        entry = replay.serve(request.method, request.url, request.body)
+    except ReplayError as e:
+        raise requests.exceptions.ConnectionError(str(e), request=request)
+
+    resp = requests.Response()
+    resp.status_code = entry['status']
+    resp.headers = CaseInsensitiveDict(entry['headers'])
+    resp.encoding = get_encoding_from_headers(resp.headers)
+    resp._content = entry['content']
+    resp.url = request.url
+    resp.request = request
+    resp.connection = adapter
+    return resp
+
@@ -0,0 +1,28 @@
+"""
+按 AIQUANT_REPLAY_* 环境变量启用录制/回放后运行脚本 (见 replay 模块)
+
+用法:
+    python -m src.data_fetch.replay_run <script.py> [args...]
+"""
+
+import os
+import runpy
+import sys
+
+from src.data_fetch import replay
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("用法: python -m src.data_fetch.replay_run <script.py> [args...]")
+        sys.exit(2)
+    replay.install_from_env()
+    script = os.path.abspath(sys.argv[1])
+    sys.argv = sys.argv[1:]
+    # 与直接运行脚本一致: 脚本所在目录优先
+    sys.path.insert(0, os.path.dirname(script))
+    runpy.run_path(script, run_name='__main__')
+
+
+if __name__ == "__main__":
+    main()
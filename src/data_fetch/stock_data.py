@@ -2,110 +2,218 @@
 股票数据获取模块
 """
 
+import threading
+import time
 import akshare as ak
 import pandas as pd
-import requests
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from datetime import datetime, timedelta
 
+from .async_engine import AsyncFetchEngine
+from .bar_store import BarStore
+from .quote_parser import QuoteParser, SNAPSHOT_FIELDS, parse_quotes
+from .rate_limit import limited_call
+from .symbol_master import SymbolMaster, add_market_prefix, get_symbol_master, strip_market_prefixes
+from .trading_calendar import get_trading_calendar
+from ..utils import metrics
 
-class StockDataFetcher:
-    """股票数据获取器"""
+
+SNAPSHOT_PARSER = QuoteParser(SNAPSHOT_FIELDS)
+
+
+def merge_windows(windows: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """
+    合并有重叠的日期区间
     
+    Args:
+        windows: [(开始日期, 结束日期)] 格式YYYYMMDD, 两端均含
+        
+    Returns:
+        list: 合并后互不重叠的区间, 按开始日期升序
+    """
+    merged = []
+    for start, end in sorted(windows):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def slice_hist(df: pd.DataFrame, start_date: str, end_date: str) -> pd.DataFrame:
+    """
+    截取 [start_date, end_date] 区间的K线 (返回副本)
+    
+    Args:
+        df: get_stock_hist 格式的K线数据
+        start_date: 开始日期 格式YYYYMMDD
+        end_date: 结束日期 格式YYYYMMDD
+        
+    Returns:
+        pd.DataFrame: 区间内的K线
+    """
+    if df is None or df.empty or '日期' not in df.columns:
+        return pd.DataFrame()
+    dates = pd.to_datetime(df['日期'])
+    mask = (dates >= pd.Timestamp(start_date)) & (dates <= pd.Timestamp(end_date))
+    return df[mask.to_numpy()].reset_index(drop=True)
+
+
+class HistoryFetchError(Exception):
+    """所有数据源都请求失败 (区别于请求成功但区间内没有K线)"""
+
+
+class _Flight:
+    """一次进行中的历史K线请求"""
+
+    def __init__(self, start_date: str, end_date: str):
+        self.start_date = start_date
+        self.end_date = end_date
+        self.result = pd.DataFrame()
+        self.error: Optional[Exception] = None
+        self.done = threading.Event()
+
+
+def _uncovered(start_date: str, end_date: str, covered: List[Tuple[str, str]]) -> List[Tuple[str, str]]:
+    """[start_date, end_date] 中未被 covered 各区间覆盖的部分 (日期格式YYYYMMDD, 两端均含)"""
+    gaps = []
+    cursor = pd.Timestamp(start_date)
+    last = pd.Timestamp(end_date)
+    for s, e in merge_windows(covered):
+        s, e = pd.Timestamp(s), pd.Timestamp(e)
+        if e < cursor:
+            continue
+        if s > last:
+            break
+        if s > cursor:
+            gaps.append((cursor, s - pd.Timedelta(days=1)))
+        cursor = max(cursor, e + pd.Timedelta(days=1))
+    if cursor <= last:
+        gaps.append((cursor, last))
+    return [(s.strftime("%Y%m%d"), e.strftime("%Y%m%d")) for s, e in gaps]
+
+
+class HistoryFlights:
+    """
+    历史K线请求合并 (single-flight)
+    
+    同一股票、周期、复权类型的请求, 与进行中的请求日期区间有重叠时, 重叠部分
+    等待这些请求完成后截取, 只有未被覆盖的部分才请求网络, 最后拼接为自己的区间。
+    完全被覆盖的请求不再请求网络。
+    进程内所有 StockDataFetcher 共享同一个实例。
+    """
+
     def __init__(self):
-        """初始化"""
-        pass
+        self._flights: Dict[tuple, List[_Flight]] = {}
+        self._lock = threading.Lock()
 
-    def _add_market_prefix(self, symbol: str) -> str:
+    def fetch(self, key: tuple, start_date: str, end_date: str, download) -> pd.DataFrame:
         """
-        为股票代码添加市场前缀 (sh/sz/bj)
+        获取 [start_date, end_date] 区间的K线
         
         Args:
-            symbol: 股票代码 (e.g., "600519")
+            key: (带前缀代码, 周期, 复权类型)
+            start_date: 开始日期 格式YYYYMMDD
+            end_date: 结束日期 格式YYYYMMDD
+            download: 实际请求函数 download(start_date, end_date), 失败时抛出异常
             
         Returns:
-            str: 带前缀的代码 (e.g., "sh600519")
+            pd.DataFrame: K线数据
+
+        Raises:
+            自己或共享的请求失败时的异常
         """
-        if not symbol[0].isdigit(): # 已经有前缀
-            return symbol
-            
-        if symbol.startswith('6'):
-            return f"sh{symbol}"
-        elif symbol.startswith('0') or symbol.startswith('3'):
-            return f"sz{symbol}"
-        if symbol.startswith('4') or symbol.startswith('8'):
-            return f"bj{symbol}"
-        return symbol
+        with self._lock:
+            flights = self._flights.setdefault(key, [])
+            shared = [f for f in flights if f.start_date <= end_date and start_date <= f.end_date]
+            # 只等待比自己早登记的请求, 不会互相等待
+            own = [_Flight(s, e) for s, e in _uncovered(start_date, end_date, [(f.start_date, f.end_date) for f in shared])]
+            flights.extend(own)
+            if not flights:
+                del self._flights[key]
+        
+        if not shared and not own:
+            # 空区间 (start_date > end_date)
+            return pd.DataFrame()
+        if not shared:
+            # 无重叠: 自己请求整个区间
+            flight = own[0]
+            self._download(key, flights, flight, download)
+            # 其他请求各自截取切片, 返回副本以免调用方修改共享的结果
+            return flight.result.copy()
+        
+        metrics.incr('coalesce.stock_hist.shared')
+        for flight in own:
+            self._download(key, flights, flight, download)
+        for flight in shared:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+        
+        frames = [f.result for f in shared + own if f.result is not None and not f.result.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        df = slice_hist(df, start_date, end_date)
+        if len(frames) > 1:
+            df = df.drop_duplicates(subset='日期').sort_values('日期').reset_index(drop=True)
+        return df
+
+    def _download(self, key: tuple, flights: List[_Flight], flight: _Flight, download):
+        try:
+            flight.result = download(flight.start_date, flight.end_date)
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                flights.remove(flight)
+                if not flights and self._flights.get(key) is flights:
+                    del self._flights[key]
+            flight.done.set()
+
+
+HISTORY_FLIGHTS = HistoryFlights()
+
+
+class StockDataFetcher:
+    """股票数据获取器"""
     
-    def get_stock_realtime_batch(self, symbol_list: list) -> pd.DataFrame:
+    def __init__(
+        self,
+        bar_store: Optional[BarStore] = None,
+        use_bar_store: bool = True,
+        engine: Optional[AsyncFetchEngine] = None,
+        symbol_master: Optional[SymbolMaster] = None
+    ):
         """
-        批量获取指定股票的实时行情（腾讯源）
+        初始化
         
         Args:
-            symbol_list: 股票代码列表 (e.g., ["600519", "000001"])
-            
-        Returns:
-            pd.DataFrame: 包含实时行情的DataFrame
+            bar_store: 本地日线存储, 为空时使用默认目录
+            use_bar_store: 是否启用本地日线存储
+            engine: 异步行情请求引擎, 为空时使用默认配置
+            symbol_master: 股票代码主表, 为空时使用进程内共享的默认主表
         """
-        if not symbol_list:
-            return pd.DataFrame()
-            
-        # 构建请求URL
-        # 腾讯接口格式: http://qt.gtimg.cn/q=sh600519,sz000001
-        prefixed_symbols = [self._add_market_prefix(s) for s in symbol_list]
-        # 腾讯接口一次请求太多可能会失败，建议分批，这里假设列表不长
-        # 如果列表很长，可以分批请求
+        self.engine = engine if engine is not None else AsyncFetchEngine()
+        self.symbol_master = symbol_master if symbol_master is not None else get_symbol_master()
+        if use_bar_store:
+            self.bar_store = bar_store if bar_store is not None else BarStore()
+        else:
+            self.bar_store = None
+
+    def _add_market_prefix(self, symbol: str) -> str:
+        """
+        为股票代码添加市场前缀 (sh/sz/bj)
         
-        all_data = []
-        batch_size = 50
-        for i in range(0, len(prefixed_symbols), batch_size):
-            batch = prefixed_symbols[i:i+batch_size]
-            url = f"http://qt.gtimg.cn/q={','.join(batch)}"
+        Args:
+            symbol: 股票代码 (e.g., "600519")
             
-            try:
-                resp = requests.get(url, timeout=10)
-                if resp.status_code != 200:
-                    print(f"腾讯源请求失败: {resp.status_code}")
-                    continue
-                    
-                # 解析数据
-                lines = resp.text.strip().split(';')
-                for line in lines:
-                    if not line.strip():
-                        continue
-                    
-                    # line format: v_sh600519="1~贵州茅台~600519~..."
-                    parts = line.split('=')
-                    if len(parts) < 2:
-                        continue
-                        
-                    vals = parts[1].strip('"').split('~')
-                    if len(vals) < 46: # 确保有足够字段
-                        continue
-                        
-                    # 提取字段
-                    # 1:名称, 2:代码, 3:最新价, 32:涨跌幅(%), 36:成交量(手), 37:成交额(万), 44:流通市值(亿), 45:总市值(亿)
-                    try:
-                        item = {
-                            '代码': vals[2],
-                            '名称': vals[1],
-                            '最新价': float(vals[3]),
-                            '涨跌幅': float(vals[32]),
-                            '成交量': float(vals[36]), # 腾讯返回手
-                            '成交额': float(vals[37]) * 10000, # 腾讯返回万，转为元
-                            '流通市值': float(vals[44]) * 100000000 if vals[44] else 0, # 亿 -> 元
-                            '总市值': float(vals[45]) * 100000000 if vals[45] else 0, # 亿 -> 元
-                            '换手率': float(vals[38]) if vals[38] else 0
-                        }
-                        all_data.append(item)
-                    except (ValueError, IndexError) as e:
-                        # print(f"解析股票数据出错 {vals[2]}: {e}")
-                        continue
-            except Exception as e:
-                print(f"批量获取实时行情失败: {e}")
-                
-        return pd.DataFrame(all_data)
-
+        Returns:
+            str: 带前缀的代码 (e.g., "sh600519")
+        """
+        return add_market_prefix(symbol)
+    
     def get_stock_list(self) -> pd.DataFrame:
         """
         获取A股股票列表
@@ -117,7 +225,7 @@ class StockDataFetcher:
         # 1. 尝试新浪源
         try:
             # print("尝试新浪源获取股票列表...")
-            df = ak.stock_zh_a_spot()
+            df = limited_call('sina', ak.stock_zh_a_spot)
             if df is not None and not df.empty:
                 # 重命名以匹配通用格式
                 df = df.rename(columns={
@@ -143,12 +251,93 @@ class StockDataFetcher:
     def get_stock_realtime(self) -> pd.DataFrame:
         """
         获取A股实时行情
-        优先级: 新浪 -> 东方财富
+        优先级: 腾讯全市场快照 -> 新浪
+        
+        Returns:
+            pd.DataFrame: 与 get_market_snapshot 相同的列 (新浪源缺少的列为 NaN)
+        """
+        df = self.get_market_snapshot()
+        if not df.empty:
+            return df
+        snapshot_time = datetime.now()
+        df = self.get_stock_list()
+        if df is None or df.empty:
+            return pd.DataFrame()
+        df = self._sina_spot_to_snapshot(df, snapshot_time)
+        df.attrs['snapshot_time'] = snapshot_time
+        df.attrs['malformed_rows'] = 0
+        return df
+
+    @staticmethod
+    def _sina_spot_to_snapshot(df: pd.DataFrame, snapshot_time: datetime) -> pd.DataFrame:
+        """
+        将新浪A股列表转为腾讯快照的列和单位
+        
+        Args:
+            df: get_stock_list 的输出
+            snapshot_time: 请求时间, 用于补全行情时间戳的日期
+            
+        Returns:
+            pd.DataFrame: SNAPSHOT_FIELDS 各列, 代码为6位纯代码, 成交量为手
+        """
+        out = pd.DataFrame(index=df.index, columns=list(SNAPSHOT_FIELDS), dtype=float)
+        out['代码'] = strip_market_prefixes(df['代码'])
+        out['名称'] = df['名称'].astype(str)
+        for col in ('最新价', '涨跌幅', '成交额', '换手率', '最高', '最低', '今开', '昨收'):
+            if col in df.columns:
+                out[col] = pd.to_numeric(df[col], errors='coerce')
+        # 新浪源成交量为股, 腾讯源为手
+        out['成交量'] = pd.to_numeric(df['成交量'], errors='coerce') / 100
+        if '总市值' in df.columns:
+            # 新浪源 mktcap 单位为万元
+            out['总市值'] = pd.to_numeric(df['总市值'], errors='coerce') * 10000
+        # 时间戳只有 HH:MM:SS, 补上日期与腾讯源的 YYYYMMDDHHMMSS 对齐
+        if '时间戳' in df.columns:
+            out['时间'] = snapshot_time.strftime("%Y%m%d") + df['时间戳'].astype(str).str.replace(':', '')
+        else:
+            out['时间'] = None
+        return out.reset_index(drop=True)
+
+    def get_symbol_universe(self) -> List[str]:
+        """
+        获取全A股代码列表 (来自代码主表, 过期时自动增量刷新)
         
         Returns:
-            pd.DataFrame: 实时行情数据
+            list: 纯数字代码列表 (e.g., ["600519", "000001"])
         """
-        return self.get_stock_list()
+        return self.symbol_master.codes()
+
+    def get_market_snapshot(self, symbols: Optional[list] = None, batch_size: int = 80) -> pd.DataFrame:
+        """
+        全市场实时行情快照 (腾讯源)
+        所有批次在同一个事件循环和连接池内并发请求, 合并为一张表
+        
+        Args:
+            symbols: 股票代码列表, 为空时使用全A股代码列表
+            batch_size: 每个请求包含的股票数
+            
+        Returns:
+            pd.DataFrame: 与 get_stock_realtime_batch 相同的列, 另有 '时间' (行情时间戳 YYYYMMDDHHMMSS);
+                attrs['snapshot_time'] 为快照发起时间, attrs['malformed_rows'] 为解析异常的行数
+        """
+        if symbols is None:
+            symbols = self.get_symbol_universe()
+        if not symbols:
+            return pd.DataFrame()
+        
+        prefixed_symbols = list(dict.fromkeys(self._add_market_prefix(s) for s in symbols))
+        snapshot_time = datetime.now()
+        start = time.time()
+        with metrics.timer('fetch.snapshot'):
+            bodies = self.engine.fetch_quote_batches(prefixed_symbols, batch_size=batch_size)
+        
+        df, malformed = SNAPSHOT_PARSER.parse(bodies)
+        if malformed:
+            print(f"腾讯源行情解析: {malformed} 行数据异常已跳过")
+        print(f"全市场快照: {len(df)}/{len(prefixed_symbols)} 只股票, 耗时 {time.time() - start:.2f}s")
+        df.attrs['snapshot_time'] = snapshot_time
+        df.attrs['malformed_rows'] = malformed
+        return df
 
     def get_stock_realtime_batch(self, symbols: list) -> pd.DataFrame:
         """
@@ -158,7 +347,7 @@ class StockDataFetcher:
             symbols: 股票代码列表 (e.g., ["600519", "000001"])
             
         Returns:
-            pd.DataFrame: 实时行情数据
+            pd.DataFrame: 实时行情数据, attrs['malformed_rows'] 为解析异常的行数
         """
         if not symbols:
             return pd.DataFrame()
@@ -166,49 +355,16 @@ class StockDataFetcher:
         # 添加前缀
         prefixed_symbols = [self._add_market_prefix(s) for s in symbols]
         
-        # 分批处理，每批80个
-        batch_size = 80
-        results = []
+        # 分批处理，每批80个，所有批次在同一个事件循环内并发请求
+        with metrics.timer('fetch.realtime_batch'):
+            bodies = self.engine.fetch_quote_batches(prefixed_symbols, batch_size=80)
         
-        for i in range(0, len(prefixed_symbols), batch_size):
-            batch = prefixed_symbols[i:i+batch_size]
-            query_str = ",".join(batch)
-            url = f"http://qt.gtimg.cn/q={query_str}"
-            
-            try:
-                resp = requests.get(url, timeout=5)
-                if resp.status_code == 200:
-                    # 解析数据
-                    lines = resp.text.strip().split(';')
-                    for line in lines:
-                        if not line.strip():
-                            continue
-                        # v_sh600519="1~贵州茅台~600519~..."
-                        try:
-                            content = line.split('="')[1].strip('"')
-                            parts = content.split('~')
-                            if len(parts) > 45:
-                                data = {
-                                    '代码': parts[2],
-                                    '名称': parts[1],
-                                    '最新价': float(parts[3]),
-                                    '涨跌幅': float(parts[32]),
-                                    '成交量': float(parts[6]), # 手
-                                    '成交额': float(parts[37]) * 10000, # 万 -> 元
-                                    '总市值': float(parts[45]) * 100000000, # 亿 -> 元
-                                    '换手率': float(parts[38]) if parts[38] else 0.0,
-                                    '最高': float(parts[33]),
-                                    '最低': float(parts[34]),
-                                    '今开': float(parts[5]),
-                                    '昨收': float(parts[4])
-                                }
-                                results.append(data)
-                        except Exception as e:
-                            continue
-            except Exception as e:
-                print(f"Batch fetch error: {e}")
-                
-        return pd.DataFrame(results)
+        # 整体解析为数值列, 异常行计数而不是静默丢弃
+        df, malformed = parse_quotes(bodies)
+        if malformed:
+            print(f"腾讯源行情解析: {malformed} 行数据异常已跳过")
+        df.attrs['malformed_rows'] = malformed
+        return df
 
     def get_stock_hist(
         self,
@@ -220,7 +376,8 @@ class StockDataFetcher:
     ) -> pd.DataFrame:
         """
         获取个股历史数据
-        优先级: 腾讯 -> 新浪 -> 东方财富
+        不复权日线优先读取本地日线存储, 只从网络补齐缺失的区间;
+        其余情况直接请求网络: 新浪 -> 腾讯
         
         Args:
             symbol: 股票代码
@@ -236,17 +393,181 @@ class StockDataFetcher:
             start_date = (datetime.now() - timedelta(days=365)).strftime("%Y%m%d")
         if not end_date:
             end_date = datetime.now().strftime("%Y%m%d")
+        
+        with metrics.timer('fetch.stock_hist'):
+            # 复权价格会随除权事件整体变化, 只缓存不复权日线
+            if self.bar_store is not None and period == "daily" and not adjust:
+                return self._get_stock_hist_stored(symbol, start_date, end_date)
+            try:
+                return self._fetch_stock_hist(symbol, period, start_date, end_date, adjust)
+            except HistoryFetchError:
+                return pd.DataFrame()
+
+    def _get_stock_hist_stored(self, symbol: str, start_date: str, end_date: str) -> pd.DataFrame:
+        """
+        通过本地日线存储获取不复权日线
+        今天之前的K线写入存储, 今天的K线(可能尚未收盘)每次实时获取且不落盘
+        
+        Args:
+            symbol: 股票代码
+            start_date: 开始日期 格式YYYYMMDD
+            end_date: 结束日期 格式YYYYMMDD
             
+        Returns:
+            pd.DataFrame: 历史数据
+        """
+        store_symbol = self._add_market_prefix(symbol)
+        today = datetime.now().strftime("%Y%m%d")
+        yesterday = (datetime.now() - timedelta(days=1)).strftime("%Y%m%d")
+        settled_end = min(end_date, yesterday)
+        
+        frames = []
+        if start_date <= settled_end:
+            with self.bar_store.lock(store_symbol):
+                missing = self.bar_store.missing_ranges(store_symbol, start_date, settled_end)
+                metrics.incr('cache.bar_store.miss' if missing else 'cache.bar_store.hit')
+                for missing_start, missing_end in missing:
+                    if not self._has_trading_day(missing_start, missing_end):
+                        # 整段都是周末或节假日, 无需请求
+                        self.bar_store.write(store_symbol, pd.DataFrame(), missing_start, missing_end)
+                        continue
+                    try:
+                        df = self._fetch_stock_hist(symbol, "daily", missing_start, missing_end, "")
+                    except HistoryFetchError:
+                        # 请求失败时不扩展覆盖区间, 下次重试
+                        continue
+                    # 请求成功但没有K线 (停牌、上市前) 同样记为已覆盖
+                    self.bar_store.write(store_symbol, df, missing_start, missing_end)
+                # 持锁读取, 避免与其他线程的写入交错
+                frames.append(self.bar_store.read_frame(store_symbol, start_date, settled_end))
+        
+        if end_date >= today:
+            try:
+                df_today = self._fetch_stock_hist(symbol, "daily", max(start_date, today), end_date, "")
+            except HistoryFetchError:
+                df_today = None
+            if df_today is not None and not df_today.empty:
+                frames.append(df_today)
+        
+        frames = [f for f in frames if not f.empty]
+        if not frames:
+            return pd.DataFrame()
+        df = pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+        return df.sort_values('日期').reset_index(drop=True)
+
+    @staticmethod
+    def _has_trading_day(start_date: str, end_date: str) -> bool:
+        """判断 [start_date, end_date] 区间内是否包含交易日 (按交易日历, 日历之外按工作日估算)"""
+        try:
+            return bool(get_trading_calendar().trading_days(start_date, end_date))
+        except ValueError:
+            # 早于交易日历起点, 照常请求
+            return True
+
+    def get_stock_hist_windows(
+        self,
+        symbol: str,
+        windows: List[Tuple[str, str]],
+        period: str = "daily",
+        adjust: str = ""
+    ) -> List[pd.DataFrame]:
+        """
+        获取同一只股票多个日期区间的历史数据
+        有重叠的区间合并为一个更宽的请求, 再按区间截取
+        
+        Args:
+            symbol: 股票代码
+            windows: [(开始日期, 结束日期)] 格式YYYYMMDD
+            period: 周期 daily(日), weekly(周), monthly(月)
+            adjust: 复权类型 qfq(前复权), hfq(后复权), ""(不复权)
+            
+        Returns:
+            list: 与 windows 一一对应的 DataFrame, 无数据时为空 DataFrame
+        """
+        merged = merge_windows(windows)
+        if len(merged) < len(windows):
+            metrics.incr('coalesce.stock_hist.merged', len(windows) - len(merged))
+        frames = {
+            (start, end): self.get_stock_hist(symbol, period, start, end, adjust)
+            for start, end in merged
+        }
+        results = []
+        for start, end in windows:
+            span = next(m for m in merged if m[0] <= start and end <= m[1])
+            results.append(slice_hist(frames[span], start, end))
+        return results
+
+    def _fetch_stock_hist(
+        self,
+        symbol: str,
+        period: str,
+        start_date: str,
+        end_date: str,
+        adjust: str
+    ) -> pd.DataFrame:
+        """
+        从网络获取个股历史数据
+        与进行中的日期区间有重叠的请求合并 (见 HistoryFlights)
+        
+        Args:
+            symbol: 股票代码
+            period: 周期
+            start_date: 开始日期 格式YYYYMMDD
+            end_date: 结束日期 格式YYYYMMDD
+            adjust: 复权类型
+            
+        Returns:
+            pd.DataFrame: 历史数据, 区间内没有K线时为空
+
+        Raises:
+            HistoryFetchError: 所有数据源都请求失败
+        """
+        key = (self._add_market_prefix(symbol), period, adjust)
+        return HISTORY_FLIGHTS.fetch(
+            key, start_date, end_date,
+            lambda start, end: self._download_stock_hist(symbol, period, start, end, adjust)
+        )
+
+    def _download_stock_hist(
+        self,
+        symbol: str,
+        period: str,
+        start_date: str,
+        end_date: str,
+        adjust: str
+    ) -> pd.DataFrame:
+        """
+        从网络获取个股历史数据
+        优先级: 新浪 -> 腾讯
+        
+        Args:
+            symbol: 股票代码
+            period: 周期
+            start_date: 开始日期 格式YYYYMMDD
+            end_date: 结束日期 格式YYYYMMDD
+            adjust: 复权类型
+            
+        Returns:
+            pd.DataFrame: 历史数据, 区间内没有K线时为空
+
+        Raises:
+            HistoryFetchError: 两个数据源都请求失败
+        """
+        # 某个数据源正常返回 (即使为空) 即视为请求成功
+        answered = False
         # 1. 尝试新浪源 (Sina)
         try:
             # print(f"尝试新浪源获取 {symbol}...")
             sina_symbol = self._add_market_prefix(symbol)
-            df = ak.stock_zh_a_daily(
+            # 有腾讯源兜底, 新浪源只重试一次
+            df = limited_call(
+                'sina', ak.stock_zh_a_daily, retries=1,
                 symbol=sina_symbol,
                 start_date=start_date,
                 end_date=end_date,
                 adjust=adjust
             )
+            answered = True
             if df is not None and not df.empty:
                 df = df.rename(columns={
                     'date': '日期',
@@ -269,15 +590,18 @@ class StockDataFetcher:
             print(f"新浪源获取失败: {e}")
 
         # 2. 尝试腾讯源 (Tencent)
+        metrics.incr('retry.stock_hist.tencent')
         try:
             # print(f"尝试腾讯源获取 {symbol}...")
             tx_symbol = self._add_market_prefix(symbol)
-            df = ak.stock_zh_a_hist_tx(
+            df = limited_call(
+                'tencent', ak.stock_zh_a_hist_tx,
                 symbol=tx_symbol,
                 start_date=start_date,
                 end_date=end_date,
                 adjust=adjust
             )
+            answered = True
             if df is not None and not df.empty:
                 # 重命名列
                 # 注意：腾讯源返回的 amount 其实是成交量(手/股)，而不是成交额
@@ -298,18 +622,10 @@ class StockDataFetcher:
         except Exception as e:
             print(f"腾讯源获取失败: {e}")
             
+        if not answered:
+            raise HistoryFetchError(f"历史数据获取失败: {symbol} {start_date}-{end_date}")
         return pd.DataFrame()
     
-    def get_stock_realtime(self) -> pd.DataFrame:
-        """
-        获取A股实时行情
-        优先级: 新浪 -> 东方财富
-        
-        Returns:
-            pd.DataFrame: 实时行情数据
-        """
-        return self.get_stock_list()
-    
     def get_stock_info(self, symbol: str) -> dict:
         """
         获取个股基本信息
@@ -322,7 +638,7 @@ class StockDataFetcher:
         """
         try:
             # 尝试使用巨潮资讯源
-            df = ak.stock_profile_cninfo(symbol=symbol)
+            df = limited_call('cninfo', ak.stock_profile_cninfo, symbol=symbol)
             if df is not None and not df.empty:
                 return df.iloc[0].to_dict()
         except Exception as e:
@@ -348,7 +664,7 @@ class StockDataFetcher:
             # 尝试使用新浪源
             # 注意: 新浪源可能需要股票中文名称作为别名，这里简化处理，如果失败则返回空
             # 实际使用中可能需要先获取股票名称
-            df = ak.stock_financial_report_sina(symbol=symbol, symbol_alias=symbol)
+            df = limited_call('sina', ak.stock_financial_report_sina, symbol=symbol, symbol_alias=symbol)
             return df
         except Exception as e:
             print(f"获取财务报表失败: {e}")
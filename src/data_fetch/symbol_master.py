@@ -0,0 +1,439 @@
+"""
+股票代码主表模块
+
+全A股的代码、交易所前缀、名称和上市信息集中保存在一个 .npz 文件中,
+首次使用时才加载; 按纯代码、带前缀代码和名称查询均为字典 O(1) 查找。
+刷新时按交易所合并: 新上市的代码追加, 改名的股票保留旧名称作为别名,
+不在最新列表中的代码标记为非活跃, 某个交易所拉取失败时保留其原有数据。
+"""
+
+import os
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+from .rate_limit import limited_call
+
+
+DEFAULT_MASTER_PATH = os.path.join(str(Path(__file__).parent.parent.parent), "data", "symbol_master.npz")
+
+PREFIXES = ('sh', 'sz', 'bj')
+
+# (交易所前缀, akshare 函数名, 参数, 代码列, 名称列, 上市日期列)
+LISTING_SOURCES = [
+    ('sh', 'stock_info_sh_name_code', {'symbol': '主板A股'}, '证券代码', '证券简称', '上市日期'),
+    ('sh', 'stock_info_sh_name_code', {'symbol': '科创板'}, '证券代码', '证券简称', '上市日期'),
+    ('sz', 'stock_info_sz_name_code', {'symbol': 'A股列表'}, 'A股代码', 'A股简称', 'A股上市日期'),
+    ('bj', 'stock_info_bj_name_code', {}, '证券代码', '证券简称', '上市日期'),
+]
+
+# 交易所前缀 -> 限流数据源 (见 rate_limit.SOURCE_LIMITS)
+LISTING_HOSTS = {'sh': 'sse', 'sz': 'szse', 'bj': 'bse'}
+
+# 列名 -> 存储类型
+FIELDS = {
+    'code': 'U6',
+    'prefix': 'U2',
+    'name': 'U16',
+    'board': 'U3',
+    'list_date': '<M8[D]',
+    'active': '?',
+}
+
+
+def strip_market_prefix(code) -> str:
+    """
+    去掉市场前缀并补齐6位 (e.g., "sh600519" -> "600519", 1 -> "000001")
+
+    Args:
+        code: 股票代码, 可带 sh/sz/bj 前缀, 也可以是整数
+
+    Returns:
+        str: 6位纯数字代码
+    """
+    code = str(code).strip()
+    if code[:2].lower() in PREFIXES:
+        code = code[2:]
+    return code.zfill(6)
+
+
+def strip_market_prefixes(codes: pd.Series) -> pd.Series:
+    """
+    strip_market_prefix 的向量化版本
+
+    Args:
+        codes: 股票代码序列, 可带 sh/sz/bj 前缀, 也可以是整数
+
+    Returns:
+        pd.Series: 6位纯数字代码
+    """
+    return codes.astype(str).str.strip().str.replace(r'^(?i:sh|sz|bj)', '', regex=True).str.zfill(6)
+
+
+def market_of(code) -> str:
+    """
+    按代码规则推断交易所前缀
+
+    Args:
+        code: 股票代码, 可带前缀
+
+    Returns:
+        str: 'sh' / 'sz' / 'bj', 无法识别时返回空字符串
+    """
+    code = str(code).strip()
+    if code[:2].lower() in PREFIXES:
+        return code[:2].lower()
+    code = code.zfill(6)
+    if code.startswith('6'):
+        return 'sh'
+    if code.startswith(('0', '3')):
+        return 'sz'
+    if code.startswith(('4', '8', '92')):
+        return 'bj'
+    return ''
+
+
+def add_market_prefix(code) -> str:
+    """
+    为股票代码添加市场前缀, 已有前缀或无法识别时原样返回
+
+    Args:
+        code: 股票代码 (e.g., "600519")
+
+    Returns:
+        str: 带前缀的代码 (e.g., "sh600519")
+    """
+    code = str(code).strip()
+    if code[:2].lower() in PREFIXES:
+        return code
+    market = market_of(code)
+    return f"{market}{code.zfill(6)}" if market else code
+
+
+def board_of(code) -> str:
+    """按代码规则推断板块: 主板 / 创业板 / 科创板 / 北交所"""
+    market = market_of(code)
+    code = strip_market_prefix(code)
+    if market == 'bj':
+        return '北交所'
+    if code.startswith('688') or code.startswith('689'):
+        return '科创板'
+    if code.startswith('30'):
+        return '创业板'
+    return '主板'
+
+
+def _name_key(name: str) -> str:
+    """名称查询键: 全角转半角并去掉空白 (e.g., "万  科Ａ" -> "万科A")"""
+    return ''.join(unicodedata.normalize('NFKC', str(name)).split())
+
+
+class SymbolMaster:
+    """
+    股票代码主表
+
+    数据文件为 numpy .npz: 各列为定长数组 (见 FIELDS), 另有改名前的
+    名称别名 alias_name / alias_code 和最近刷新时间 updated。
+    """
+
+    def __init__(self, path: str = DEFAULT_MASTER_PATH, max_age: float = 86400, auto_refresh: bool = True):
+        """
+        初始化 (不读取文件, 首次查询时才加载)
+
+        Args:
+            path: 数据文件路径
+            max_age: 数据有效期(秒), 过期后首次使用时自动刷新
+            auto_refresh: 是否在数据缺失或过期时自动从交易所刷新
+        """
+        self.path = path
+        self.max_age = max_age
+        self.auto_refresh = auto_refresh
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._columns: Dict[str, np.ndarray] = {}
+        self._aliases: Dict[str, str] = {}
+        self._updated = 0.0
+        self._by_code: Dict[str, int] = {}
+        self._by_name: Dict[str, int] = {}
+
+    # ------------------------------------------------------------------
+    # 加载与刷新
+    # ------------------------------------------------------------------
+
+    def _ensure_loaded(self):
+        if self._loaded:
+            return
+        with self._lock:
+            if self._loaded:
+                return
+            self._load()
+            if self.auto_refresh and (not self._by_code or time.time() - self._updated > self.max_age):
+                self._refresh(force=False)
+            # 首次刷新完成后才允许查询跳过锁, 冷启动时并发查询等待刷新而不是查空表
+            self._loaded = True
+
+    def _load(self):
+        self._columns = {col: np.empty(0, dtype=dtype) for col, dtype in FIELDS.items()}
+        self._aliases = {}
+        self._updated = 0.0
+        if os.path.exists(self.path):
+            try:
+                with np.load(self.path) as data:
+                    self._columns = {col: data[col] for col in FIELDS}
+                    self._aliases = dict(zip(data['alias_name'].tolist(), data['alias_code'].tolist()))
+                    self._updated = float(data['updated'])
+            except (OSError, KeyError, ValueError) as e:
+                print(f"读取代码主表失败: {e}")
+        self._build_index()
+
+    def _build_index(self):
+        """由 _columns 重建索引; 先建好新字典再替换, 未持锁的查询看到的始终是完整的索引"""
+        columns = self._columns
+        codes = columns['code'].tolist()
+        by_code = {code: i for i, code in enumerate(codes)}
+        by_name = {}
+        for name, code in self._aliases.items():
+            if code in by_code:
+                by_name[_name_key(name)] = by_code[code]
+        # 活跃股票的现用名优先于别名和已退市股票
+        active = columns['active'].tolist()
+        for i in sorted(range(len(codes)), key=lambda i: active[i]):
+            by_name[_name_key(columns['name'][i])] = i
+        # 刷新只在末尾追加新代码, 旧索引在新列上依然有效
+        self._by_code = by_code
+        self._by_name = by_name
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez_compressed(
+            tmp_path,
+            alias_name=np.array(list(self._aliases.keys()), dtype='U16'),
+            alias_code=np.array(list(self._aliases.values()), dtype='U6'),
+            updated=np.array(self._updated),
+            **self._columns
+        )
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def _fetch_listing(prefix: str, func_name: str, kwargs: dict, code_col: str, name_col: str, date_col: str) -> pd.DataFrame:
+        df = limited_call(LISTING_HOSTS[prefix], getattr(ak, func_name), **kwargs)
+        if df is None or df.empty:
+            return pd.DataFrame()
+        return pd.DataFrame({
+            'code': df[code_col].astype(str).str.zfill(6),
+            'prefix': prefix,
+            'name': df[name_col].astype(str).str.strip(),
+            'list_date': pd.to_datetime(df[date_col], errors='coerce'),
+        })
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        从交易所股票列表增量刷新
+
+        Args:
+            force: 未过期时也刷新
+
+        Returns:
+            int: 新增、改名和状态变化的股票数
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            changes = self._refresh(force)
+            self._loaded = True
+            return changes
+
+    def _refresh(self, force: bool) -> int:
+        """refresh 的实现, 调用方需持有 _lock 且已 _load"""
+        if not force and self._by_code and time.time() - self._updated <= self.max_age:
+            return 0
+
+        listings = []
+        ok_sources = {prefix: True for prefix in PREFIXES}
+        for source in LISTING_SOURCES:
+            try:
+                df = self._fetch_listing(*source)
+                if df.empty:
+                    ok_sources[source[0]] = False
+                listings.append(df)
+            except Exception as e:
+                print(f"获取{source[0]}股票列表失败: {e}")
+                ok_sources[source[0]] = False
+        listings = [df for df in listings if not df.empty]
+        if not listings:
+            return 0
+
+        fresh = pd.concat(listings, ignore_index=True).drop_duplicates('code', keep='last')
+        changes = self._merge(fresh, [prefix for prefix, ok in ok_sources.items() if ok])
+        self._updated = time.time()
+        self._build_index()
+        try:
+            self._save()
+        except OSError as e:
+            print(f"保存代码主表失败: {e}")
+        if changes:
+            print(f"代码主表已刷新: {len(self._by_code)} 只股票, {changes} 处变化")
+        return changes
+
+    def _merge(self, fresh: pd.DataFrame, complete_prefixes: List[str]) -> int:
+        """将最新列表合并到现有数据, 返回变化数"""
+        cols = {col: arr.tolist() for col, arr in self._columns.items()}
+        index = dict(self._by_code)
+        changes = 0
+        seen = set()
+
+        for code, prefix, name, list_date in zip(fresh['code'], fresh['prefix'], fresh['name'], fresh['list_date']):
+            seen.add(code)
+            list_date = np.datetime64(list_date.date(), 'D') if not pd.isna(list_date) else np.datetime64('NaT', 'D')
+            i = index.get(code)
+            if i is None:
+                index[code] = len(cols['code'])
+                for col, value in (('code', code), ('prefix', prefix), ('name', name),
+                                   ('board', board_of(prefix + code)), ('list_date', list_date), ('active', True)):
+                    cols[col].append(value)
+                changes += 1
+                continue
+            if cols['name'][i] != name:
+                self._aliases[cols['name'][i]] = code
+                cols['name'][i] = name
+                changes += 1
+            if not cols['active'][i]:
+                cols['active'][i] = True
+                changes += 1
+            if not np.isnat(list_date):
+                cols['list_date'][i] = list_date
+
+        # 只有整个交易所的列表都拉取成功时, 才把不在列表中的代码标记为非活跃
+        for i, (code, prefix) in enumerate(zip(cols['code'], cols['prefix'])):
+            if prefix in complete_prefixes and code not in seen and cols['active'][i]:
+                cols['active'][i] = False
+                changes += 1
+
+        self._columns = {col: np.array(values, dtype=FIELDS[col]) for col, values in cols.items()}
+        return changes
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def __len__(self):
+        self._ensure_loaded()
+        return len(self._by_code)
+
+    def __contains__(self, code) -> bool:
+        self._ensure_loaded()
+        return strip_market_prefix(code) in self._by_code
+
+    def get(self, code) -> Optional[dict]:
+        """
+        按纯代码或带前缀代码查询
+
+        Returns:
+            dict: {'code', 'prefix', 'symbol', 'name', 'board', 'list_date', 'active'}, 不存在返回None
+        """
+        self._ensure_loaded()
+        i = self._by_code.get(strip_market_prefix(code))
+        return self._row(i) if i is not None else None
+
+    def lookup_name(self, name: str) -> Optional[dict]:
+        """
+        按名称查询 (忽略全半角和空白, 支持改名前的旧名称)
+
+        Returns:
+            dict: 同 get, 不存在返回None
+        """
+        self._ensure_loaded()
+        i = self._by_name.get(_name_key(name))
+        return self._row(i) if i is not None else None
+
+    def _row(self, i: int) -> dict:
+        c = self._columns
+        list_date = c['list_date'][i]
+        return {
+            'code': str(c['code'][i]),
+            'prefix': str(c['prefix'][i]),
+            'symbol': f"{c['prefix'][i]}{c['code'][i]}",
+            'name': str(c['name'][i]),
+            'board': str(c['board'][i]),
+            'list_date': None if np.isnat(list_date) else str(list_date),
+            'active': bool(c['active'][i]),
+        }
+
+    def code_of(self, name: str) -> Optional[str]:
+        """名称 -> 纯代码, 不存在返回None"""
+        row = self.lookup_name(name)
+        return row['code'] if row else None
+
+    def name_of(self, code) -> Optional[str]:
+        """代码 -> 名称, 不存在返回None"""
+        row = self.get(code)
+        return row['name'] if row else None
+
+    def symbol(self, code) -> str:
+        """
+        代码 -> 带前缀代码; 主表中没有的代码按规则推断
+
+        Args:
+            code: 纯代码或带前缀代码
+
+        Returns:
+            str: 带前缀代码
+        """
+        self._ensure_loaded()
+        pure = strip_market_prefix(code)
+        i = self._by_code.get(pure)
+        if i is not None:
+            return f"{self._columns['prefix'][i]}{pure}"
+        return add_market_prefix(code)
+
+    def codes(self, active_only: bool = True) -> List[str]:
+        """
+        全部纯代码列表
+
+        Args:
+            active_only: 是否只返回仍在交易所列表中的股票
+        """
+        self._ensure_loaded()
+        codes = self._columns['code']
+        if active_only:
+            codes = codes[self._columns['active']]
+        return codes.tolist()
+
+    def name_code_map(self, active_only: bool = True) -> Dict[str, str]:
+        """
+        名称 -> 纯代码 映射
+
+        Args:
+            active_only: 是否只包含仍在交易所列表中的股票
+        """
+        self._ensure_loaded()
+        c = self._columns
+        mask = c['active'] if active_only else np.ones(len(c['code']), dtype=bool)
+        return dict(zip(c['name'][mask].tolist(), c['code'][mask].tolist()))
+
+    def to_frame(self) -> pd.DataFrame:
+        """以 DataFrame 形式返回主表"""
+        self._ensure_loaded()
+        df = pd.DataFrame({col: arr for col, arr in self._columns.items()})
+        df['symbol'] = df['prefix'] + df['code']
+        return df
+
+
+_default_master: Optional[SymbolMaster] = None
+_default_lock = threading.Lock()
+
+
+def get_symbol_master() -> SymbolMaster:
+    """获取进程内共享的默认代码主表 (延迟加载)"""
+    global _default_master
+    with _default_lock:
+        if _default_master is None:
+            _default_master = SymbolMaster()
+        return _default_master
@@ -0,0 +1,313 @@
+"""
+A股交易日历模块
+
+交易日列表来自新浪交易日历 (akshare tool_trade_date_hist_sina), 缓存在一个
+.npz 文件中, 首次使用时才加载。加载后按自然日建一张覆盖整个日历区间的
+稠密表 (是否交易日 + 截至当日的累计交易日数), 因此是否交易日、前/后一个
+交易日、N 个交易日前等查询都是 O(1) 的数组下标运算。
+
+日历末尾之后的日期 (以及拉取失败、没有缓存时) 按周一至周五估算, 节假日
+会被当作交易日, 调用方拿到空数据时应照常跳过。
+"""
+
+import os
+import threading
+import time
+from datetime import date, datetime
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import akshare as ak
+import numpy as np
+import pandas as pd
+
+from .rate_limit import limited_call
+
+
+DEFAULT_CALENDAR_PATH = os.path.join(str(Path(__file__).parent.parent.parent), "data", "trading_calendar.npz")
+
+# 日历末尾之后按工作日估算的天数
+WEEKDAY_HORIZON_DAYS = 400
+
+# 没有任何日历数据时, 按工作日估算的起点
+FALLBACK_START = np.datetime64('2000-01-01', 'D')
+
+
+def _to_day(value) -> np.datetime64:
+    """将 'YYYYMMDD' / 'YYYY-MM-DD' / date / datetime / Timestamp 转为 datetime64[D]"""
+    if value is None:
+        return np.datetime64(datetime.now().date(), 'D')
+    if isinstance(value, np.datetime64):
+        return value.astype('datetime64[D]')
+    if isinstance(value, (datetime, date)):
+        return np.datetime64(pd.Timestamp(value).date(), 'D')
+    text = str(value).strip()
+    if len(text) == 8 and text.isdigit():
+        text = f"{text[:4]}-{text[4:6]}-{text[6:]}"
+    return np.datetime64(text[:10], 'D')
+
+
+def _to_str(day: np.datetime64) -> str:
+    return str(day).replace('-', '')
+
+
+class _CalendarIndex(NamedTuple):
+    """
+    覆盖整个日历区间的稠密表: 第 i 个自然日 (从 start 起) 是否交易日,
+    截至该日(含)的交易日数, 以及全部交易日
+    """
+    start: np.datetime64
+    is_open: np.ndarray
+    count: np.ndarray
+    open_days: np.ndarray
+
+    def offset(self, value) -> int:
+        offset = int((_to_day(value) - self.start).astype(int))
+        if offset < 0 or offset >= len(self.is_open):
+            raise ValueError(f"日期超出交易日历范围: {value}")
+        return offset
+
+    def day(self, index: int) -> str:
+        if index < 0 or index >= len(self.open_days):
+            raise ValueError("超出交易日历范围")
+        return _to_str(self.open_days[index])
+
+
+def _build_index(dates: np.ndarray) -> _CalendarIndex:
+    today = _to_day(None)
+    if len(dates):
+        start = dates[0]
+        last_known = dates[-1]
+    else:
+        start = FALLBACK_START
+        last_known = start - 1
+    end = max(last_known, today) + WEEKDAY_HORIZON_DAYS
+    span = int((end - start).astype(int)) + 1
+
+    is_open = np.zeros(span, dtype=bool)
+    is_open[(dates - start).astype(int)] = True
+    # 日历之外按工作日估算 (1970-01-01 为周四)
+    tail = int((last_known - start).astype(int)) + 1
+    days = np.arange(start + tail, end + 1, dtype='datetime64[D]')
+    is_open[tail:] = ((days.astype(int) + 3) % 7) < 5
+
+    open_days = start + np.flatnonzero(is_open).astype('timedelta64[D]')
+    return _CalendarIndex(start, is_open, np.cumsum(is_open), open_days)
+
+
+class TradingCalendar:
+    """
+    A股交易日历
+
+    数据文件为 numpy .npz: dates 为升序的交易日 (datetime64[D]), updated 为最近刷新时间。
+    所有返回日期均为 'YYYYMMDD' 字符串。
+    """
+
+    def __init__(self, path: str = DEFAULT_CALENDAR_PATH, max_age: float = 7 * 86400, auto_refresh: bool = True):
+        """
+        初始化 (不读取文件, 首次查询时才加载)
+
+        Args:
+            path: 数据文件路径
+            max_age: 数据有效期(秒), 过期或不再覆盖今天时首次使用自动刷新
+            auto_refresh: 是否在数据缺失或过期时自动从新浪刷新
+        """
+        self.path = path
+        self.max_age = max_age
+        self.auto_refresh = auto_refresh
+        self._lock = threading.RLock()
+        self._loaded = False
+        self._dates = np.empty(0, dtype='datetime64[D]')
+        self._updated = 0.0
+        # 稠密表 _CalendarIndex, 刷新时整体替换, 查询时只读取一次引用
+        self._index = _build_index(self._dates)
+
+    # ------------------------------------------------------------------
+    # 加载与刷新
+    # ------------------------------------------------------------------
+
+    def _ensure_loaded(self) -> '_CalendarIndex':
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    self._load()
+                    if self.auto_refresh and self._stale():
+                        self._refresh(force=False)
+                    # 刷新完成后才允许查询跳过锁
+                    self._loaded = True
+        return self._index
+
+    def _stale(self) -> bool:
+        if len(self._dates) == 0 or time.time() - self._updated > self.max_age:
+            return True
+        return self._dates[-1] < _to_day(None)
+
+    def _load(self):
+        dates = np.empty(0, dtype='datetime64[D]')
+        updated = 0.0
+        if os.path.exists(self.path):
+            try:
+                with np.load(self.path) as data:
+                    dates = data['dates'].astype('datetime64[D]')
+                    updated = float(data['updated'])
+            except (OSError, KeyError, ValueError) as e:
+                print(f"读取交易日历失败: {e}")
+        self._dates, self._updated = dates, updated
+        self._index = _build_index(dates)
+
+    def _save(self):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez_compressed(tmp_path, dates=self._dates, updated=np.array(self._updated))
+        os.replace(tmp_path, self.path)
+
+    def refresh(self, force: bool = False) -> int:
+        """
+        从新浪交易日历刷新
+
+        Args:
+            force: 未过期时也刷新
+
+        Returns:
+            int: 日历中的交易日数, 拉取失败时返回 0 (保留原有数据)
+        """
+        with self._lock:
+            if not self._loaded:
+                self._load()
+            count = self._refresh(force)
+            self._loaded = True
+            return count
+
+    def _refresh(self, force: bool) -> int:
+        if not force and not self._stale():
+            return 0
+        try:
+            df = limited_call('sina', ak.tool_trade_date_hist_sina)
+        except Exception as e:
+            print(f"获取交易日历失败: {e}")
+            return 0
+        if df is None or df.empty:
+            return 0
+
+        dates = np.unique(pd.to_datetime(df['trade_date']).values.astype('datetime64[D]'))
+        index = _build_index(dates)
+        # 先建好新表再一次性替换, 并发查询要么看到旧表要么看到新表
+        self._dates, self._updated, self._index = dates, time.time(), index
+        try:
+            self._save()
+        except OSError as e:
+            print(f"保存交易日历失败: {e}")
+        return len(dates)
+
+    # ------------------------------------------------------------------
+    # 查询
+    # ------------------------------------------------------------------
+
+    def is_trading_day(self, value=None) -> bool:
+        """
+        是否交易日
+
+        Args:
+            value: 日期, 默认今天
+
+        Returns:
+            bool: 是否交易日
+        """
+        index = self._ensure_loaded()
+        return bool(index.is_open[index.offset(value)])
+
+    def previous_trading_day(self, value=None, inclusive: bool = False) -> str:
+        """
+        上一个交易日
+
+        Args:
+            value: 日期, 默认今天
+            inclusive: 当天是交易日时是否返回当天
+
+        Returns:
+            str: 日期 YYYYMMDD
+        """
+        index = self._ensure_loaded()
+        offset = index.offset(value)
+        # count[offset] - 1 为不晚于当天的最后一个交易日的下标
+        i = index.count[offset] - 1
+        if index.is_open[offset] and not inclusive:
+            i -= 1
+        return index.day(i)
+
+    def next_trading_day(self, value=None, inclusive: bool = False) -> str:
+        """
+        下一个交易日
+
+        Args:
+            value: 日期, 默认今天
+            inclusive: 当天是交易日时是否返回当天
+
+        Returns:
+            str: 日期 YYYYMMDD
+        """
+        index = self._ensure_loaded()
+        offset = index.offset(value)
+        i = index.count[offset]
+        if index.is_open[offset] and inclusive:
+            i -= 1
+        return index.day(i)
+
+    def trading_days_ago(self, n: int, value=None) -> str:
+        """
+        N个交易日前的日期 (以不晚于当天的最后一个交易日为第0个)
+
+        Args:
+            n: 交易日数
+            value: 基准日期, 默认今天
+
+        Returns:
+            str: 日期 YYYYMMDD
+        """
+        index = self._ensure_loaded()
+        return index.day(index.count[index.offset(value)] - 1 - n)
+
+    def recent_trading_days(self, n: int, value=None) -> List[str]:
+        """
+        不晚于基准日期的最近 N 个交易日
+
+        Args:
+            n: 交易日数
+            value: 基准日期, 默认今天
+
+        Returns:
+            List[str]: 日期列表 YYYYMMDD, 由新到旧
+        """
+        index = self._ensure_loaded()
+        end = index.count[index.offset(value)]
+        return [_to_str(d) for d in index.open_days[max(end - n, 0):end][::-1]]
+
+    def trading_days(self, start, end) -> List[str]:
+        """
+        区间内的交易日
+
+        Args:
+            start: 开始日期(含)
+            end: 结束日期(含)
+
+        Returns:
+            List[str]: 日期列表 YYYYMMDD, 由旧到新
+        """
+        index = self._ensure_loaded()
+        start_offset = index.offset(start)
+        first = index.count[start_offset] - index.is_open[start_offset]
+        last = index.count[index.offset(end)]
+        return [_to_str(d) for d in index.open_days[first:last]]
+
+
+_default_calendar: Optional[TradingCalendar] = None
+_default_lock = threading.Lock()
+
+
+def get_trading_calendar() -> TradingCalendar:
+    """获取进程内共享的默认交易日历 (延迟加载)"""
+    global _default_calendar
+    with _default_lock:
+        if _default_calendar is None:
+            _default_calendar = TradingCalendar()
+        return _default_calendar
@@ -75,17 +75,16 @@ def format_date(date_str: str, input_format: str = "%Y%m%d",
 
 def get_trading_days_ago(days: int) -> str:
     """
-    获取N个交易日前的日期
+    获取N个交易日前的日期 (按交易日历, 以最近一个交易日为第0个)
     
     Args:
-        days: 天数
+        days: 交易日数
         
     Returns:
         str: 日期字符串 格式YYYYMMDD
     """
-    from datetime import timedelta
-    date = datetime.now() - timedelta(days=days)
-    return date.strftime("%Y%m%d")
+    from src.data_fetch.trading_calendar import get_trading_calendar
+    return get_trading_calendar().trading_days_ago(days)
 
 
 def get_today() -> str:
@@ -0,0 +1,252 @@
+"""
+运行指标采集
+
+轻量的进程内指标: 阶段计时 (上下文管理器), 计数器 (HTTP 请求数/字节数/重试/缓存命中等),
+按数据源分组的 HTTP 延迟直方图。每个服务在入口调用 start_run(服务名),
+进程退出时把指标写成 JSON, 用于判断一次运行的耗时来自哪个数据源或哪个阶段。
+
+输出目录默认为 <项目根目录>/output/metrics, 可用环境变量 AIQUANT_METRICS_DIR 指定
+(run_full_cycle.py 会把同一轮的各服务指标写到同一目录)。
+"""
+
+import atexit
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Optional
+from urllib.parse import urlsplit
+
+
+ENV_METRICS_DIR = 'AIQUANT_METRICS_DIR'
+DEFAULT_METRICS_DIR = os.path.join(str(Path(__file__).parent.parent.parent), "output", "metrics")
+
+# 延迟直方图的桶上界(秒), 最后一个桶为 +inf
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 域名后缀 -> 数据源名称
+SOURCES = {
+    'gtimg.cn': 'tencent',
+    'qq.com': 'tencent',
+    'sina.com.cn': 'sina',
+    'sinajs.cn': 'sina',
+    'eastmoney.com': 'eastmoney',
+    'szse.cn': 'szse',
+    'sse.com.cn': 'sse',
+    'cninfo.com.cn': 'cninfo',
+}
+
+
+def source_of(url: str) -> str:
+    """URL 对应的数据源名称, 未登记的域名原样返回"""
+    host = urlsplit(url).hostname or ''
+    for suffix, source in SOURCES.items():
+        if host == suffix or host.endswith('.' + suffix):
+            return source
+    return host or 'unknown'
+
+
+class Histogram:
+    """固定分桶的直方图"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        i = 0
+        while i < len(self.buckets) and value > self.buckets[i]:
+            i += 1
+        self.counts[i] += 1
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'total_s': round(self.total, 6),
+            'mean_s': round(self.total / self.count, 6) if self.count else 0.0,
+            'max_s': round(self.max, 6),
+            'buckets': {
+                **{f"le_{b:g}": c for b, c in zip(self.buckets, self.counts)},
+                'inf': self.counts[-1],
+            },
+        }
+
+
+class Metrics:
+    """进程内指标 (线程安全)"""
+
+    def __init__(self, service: Optional[str] = None):
+        """
+        初始化
+
+        Args:
+            service: 服务名, 作为输出文件名
+        """
+        self.service = service
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self._lock = threading.Lock()
+        self.stages: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.latency: Dict[str, Histogram] = {}
+
+    @contextmanager
+    def timer(self, stage: str):
+        """
+        阶段计时, 同名阶段多次进入时累计
+
+        Args:
+            stage: 阶段名 (e.g., "fetch.margin")
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                self.stages.setdefault(stage, Histogram()).observe(elapsed)
+
+    def incr(self, name: str, value: float = 1):
+        """
+        计数器累加
+
+        Args:
+            name: 计数器名 (e.g., "cache.bar_store.hit")
+            value: 增量
+        """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        """记录一次延迟到名为 name 的直方图"""
+        with self._lock:
+            self.latency.setdefault(name, Histogram()).observe(seconds)
+
+    def record_http(self, url: str, status: Optional[int], nbytes: int, seconds: float):
+        """
+        记录一次 HTTP 请求
+
+        Args:
+            url: 请求 URL, 按域名归入数据源
+            status: 状态码, 请求异常时为 None
+            nbytes: 响应字节数
+            seconds: 耗时(秒)
+        """
+        source = source_of(url)
+        with self._lock:
+            self.latency.setdefault(source, Histogram()).observe(seconds)
+            for name, value in ((f"http.{source}.calls", 1), (f"http.{source}.bytes", nbytes)):
+                self.counters[name] = self.counters.get(name, 0) + value
+            if status is None or status >= 400:
+                name = f"http.{source}.errors"
+                self.counters[name] = self.counters.get(name, 0) + 1
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            return {
+                'service': self.service,
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'wall_s': round(time.perf_counter() - self._start, 6),
+                'stages': {name: h.to_dict() for name, h in self.stages.items()},
+                'counters': dict(sorted(self.counters.items())),
+                'http_latency': {name: h.to_dict() for name, h in sorted(self.latency.items())},
+            }
+
+    def write(self, path: Optional[str] = None) -> str:
+        """
+        写出 JSON
+
+        Args:
+            path: 输出文件, 为空时为 <指标目录>/<服务名>.json
+
+        Returns:
+            str: 输出文件路径
+        """
+        if path is None:
+            directory = os.environ.get(ENV_METRICS_DIR, DEFAULT_METRICS_DIR)
+            path = os.path.join(directory, f"{self.service or 'metrics'}.json")
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False, indent=2)
+        return path
+
+
+# ---- 进程内默认实例 ----
+
+METRICS = Metrics()
+
+_ORIGINAL_SEND = None
+
+
+def timer(stage: str):
+    """METRICS.timer 的快捷方式"""
+    return METRICS.timer(stage)
+
+
+def incr(name: str, value: float = 1):
+    """METRICS.incr 的快捷方式"""
+    METRICS.incr(name, value)
+
+
+def record_http(url: str, status: Optional[int], nbytes: int, seconds: float):
+    """METRICS.record_http 的快捷方式"""
+    METRICS.record_http(url, status, nbytes, seconds)
+
+
+def instrument_requests():
+    """
+    统计所有经 requests 发出的请求 (含 akshare 内部请求), 重复调用无副作用
+
+    通过包装 HTTPAdapter.send 实现; 与 replay 模块同时使用时应在其之后调用, 以便统计回放的请求。
+    """
+    global _ORIGINAL_SEND
+    import requests.adapters
+
+    if _ORIGINAL_SEND is not None:
+        return
+    _ORIGINAL_SEND = original = requests.adapters.HTTPAdapter.send
+
+    def send(adapter, request, **kwargs):
+        start = time.perf_counter()
+        try:
+            resp = original(adapter, request, **kwargs)
+        except Exception:
+            record_http(request.url, None, 0, time.perf_counter() - start)
+            raise
+        record_http(request.url, resp.status_code, len(resp.content or b''), time.perf_counter() - start)
+        return resp
+
+    requests.adapters.HTTPAdapter.send = send
+
+
+def start_run(service: str) -> Metrics:
+    """
+    服务入口调用: 设置服务名, 开始统计 HTTP 请求, 进程退出时写出指标 JSON
+
+    Args:
+        service: 服务名
+
+    Returns:
+        Metrics: 进程内默认实例
+    """
+    if METRICS.service is None:
+        atexit.register(_write_at_exit)
+    METRICS.service = service
+    instrument_requests()
+    return METRICS
+
+
+def _write_at_exit():
+    try:
+        print(f"Metrics saved to: {METRICS.write()}")
+    except OSError as e:
+        print(f"Metrics write failed: {e}")